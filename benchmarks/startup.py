@@ -0,0 +1,69 @@
+"""Startup time of a text only pipeline, with the steps loaded lazily and with all of them imported eagerly.
+
+Each measure runs in a new interpreter, so module caches are cold:
+
+    python benchmarks/startup.py --repeat 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+TEXT_PIPELINE = ROOT_DIR / "samples" / "pipelines" / "from_txt.yml"
+
+LOAD_PIPELINE = (
+    "import time\n"
+    "start = time.perf_counter()\n"
+    "{imports}"
+    "from patee import Patee\n"
+    "Patee.load_from(__import__('pathlib').Path({config!r}))\n"
+    "print(time.perf_counter() - start)\n"
+)
+
+EAGER_IMPORTS = "".join(
+    f"import patee.steps.{module}\n" for module in (
+        "text_extractor_step",
+        "docling_extractor_step",
+        "csv_extractor_step",
+        "noop_processor_step",
+        "human_in_the_loop_processor_step",
+        "text_writer_processor_step",
+    ))
+
+
+def measure(code: str, repeat: int) -> list[float]:
+    timings = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        # The output path of the write_to_file step of the pipeline must exist
+        (Path(work_dir) / "outputs").mkdir()
+        for _ in range(repeat):
+            output = subprocess.run(
+                [sys.executable, "-c", code],
+                cwd=work_dir,
+                env={**os.environ, "PYTHONPATH": os.pathsep.join(
+                    filter(None, [str(ROOT_DIR), os.environ.get("PYTHONPATH")]))},
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            timings.append(float(output.stdout.strip().splitlines()[-1]))
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="number of interpreters started per mode")
+    args = parser.parse_args()
+
+    for mode, imports in (("lazy", ""), ("eager", EAGER_IMPORTS)):
+        timings = measure(LOAD_PIPELINE.format(imports=imports, config=str(TEXT_PIPELINE)), args.repeat)
+        print(f"{mode:>5}: median {statistics.median(timings) * 1000:8.1f} ms, "
+              f"min {min(timings) * 1000:8.1f} ms over {len(timings)} runs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,486 @@
+"""Throughput and peak memory of the built-in steps and of the checkpoints of every executor.
+
+The cases run offline on a synthetic parallel corpus and on the files of samples/sources. Each case runs in a new
+interpreter, so its peak memory does not include the other cases:
+
+    python benchmarks/throughput.py --pairs 100000 --repeat 5
+    python benchmarks/throughput.py --save-baseline benchmarks/baselines/reference.json
+    python benchmarks/throughput.py --compare benchmarks/baselines/reference.json --tolerance 0.25
+
+The sentence_segmenter case reports sentences per second, so its target of 1M sentences per minute is about
+16700 sentences/s.
+
+Peak Python memory is measured with tracemalloc while the case runs, and the max RSS includes the interpreter and
+the native allocations. Comparing with a baseline exits with 1 when the throughput of a case drops or its peak
+Python memory grows by more than the tolerance.
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Callable, Union
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+SOURCES_DIR = ROOT_DIR / "samples" / "sources"
+PDF_1_FILE = SOURCES_DIR / "GUIA-PDDD_ES.pdf"
+PDF_2_FILE = SOURCES_DIR / "GUIA-PDDD.pdf"
+# Pages of the sample PDF documents converted by the docling case
+PDF_PAGES = 5
+
+sys.path.insert(0, str(ROOT_DIR))
+
+from patee.core_types import PipelineContext, RunContext, StepContext  # noqa: E402
+from patee.input_types import (  # noqa: E402
+    MonolingualSingleFile,
+    MonolingualSingleFilePair,
+    MultilingualSingleFile,
+    PageInfo,
+)
+from patee.step_types import DocumentContext, DocumentPairContext, DocumentSource, StepMetadata  # noqa: E402
+from patee.steps_executor import _get_peak_rss_bytes  # noqa: E402
+
+CHECKPOINT_FORMATS = ("text", "binary", "mapped_binary")
+
+_WORDS_1 = ("la", "casa", "de", "el", "tiempo", "mano", "un", "agua", "perro", "ciudad", "nuevo", "camino", "y",
+            "que", "documento", "texto", "proceso", "datos", "página", "año", "niño", "información", "según")
+_WORDS_2 = ("la", "casa", "de", "el", "temps", "mà", "un", "aigua", "gos", "ciutat", "nou", "camí", "i",
+            "que", "document", "text", "procés", "dades", "pàgina", "any", "nen", "informació", "segons")
+
+
+@dataclass(frozen=True)
+class CaseResult:
+    case: str
+    unit: str
+    items: int
+    input_bytes: int
+    seconds: float
+    items_per_second: float
+    mb_per_second: float
+    peak_python_bytes: int
+    max_rss_bytes: int
+
+
+@dataclass(frozen=True)
+class PreparedCase:
+    run: Callable[[], object]
+    items: int
+    unit: str
+    input_bytes: int
+
+
+# Cases by name. A case prepares its inputs in the work directory and returns the function to measure
+CASES: dict[str, Callable[[Path], PreparedCase]] = {}
+# Cases that depend on software or models that may not be available, which are skipped when they fail
+OPTIONAL_CASES = {"docling_extractor_pypdfium"}
+
+
+def case(name: str):
+    def register(prepare: Callable[[Path], PreparedCase]) -> Callable[[Path], PreparedCase]:
+        CASES[name] = prepare
+        return prepare
+    return register
+
+
+def generate_corpus(work_dir: Path, pairs: int, seed: int = 0) -> None:
+    """Write a synthetic parallel corpus of sentences as a pair of text files and as a TSV file."""
+    rng = random.Random(seed)
+    with (work_dir / "corpus_es.txt").open("w", encoding="utf-8") as file_1, \
+            (work_dir / "corpus_ca.txt").open("w", encoding="utf-8") as file_2, \
+            (work_dir / "corpus.tsv").open("w", encoding="utf-8") as tsv_file:
+        tsv_file.write("id\tes\tca\n")
+        for idx in range(pairs):
+            word_ids = [rng.randrange(len(_WORDS_1)) for _ in range(rng.randint(4, 30))]
+            sentence_1 = " ".join(_WORDS_1[word_id] for word_id in word_ids).capitalize() + "."
+            sentence_2 = " ".join(_WORDS_2[word_id] for word_id in word_ids).capitalize() + "."
+            file_1.write(sentence_1 + "\n")
+            file_2.write(sentence_2 + "\n")
+            tsv_file.write(f"{idx}\t{sentence_1}\t{sentence_2}\n")
+
+
+def _pipeline_context(work_dir: Path, checkpoint_format: str = "text") -> PipelineContext:
+    return PipelineContext(
+        config_path=work_dir / "pipeline.yml",
+        execution_path=work_dir,
+        checkpoint_format=checkpoint_format,
+    )
+
+
+def _text_pair(work_dir: Path) -> MonolingualSingleFilePair:
+    return MonolingualSingleFilePair(
+        document_1=MonolingualSingleFile(document_path=work_dir / "corpus_es.txt", iso2_language="es"),
+        document_2=MonolingualSingleFile(document_path=work_dir / "corpus_ca.txt", iso2_language="ca"),
+    )
+
+
+def _corpus_context(work_dir: Path) -> DocumentPairContext:
+    source = _text_pair(work_dir)
+    return DocumentPairContext(
+        document_1=DocumentContext(
+            source=DocumentSource.from_monolingual_file(source.document_1),
+            text_blocks=source.document_1.document_path.read_text(encoding="utf-8").splitlines(),
+            extra={},
+        ),
+        document_2=DocumentContext(
+            source=DocumentSource.from_monolingual_file(source.document_2),
+            text_blocks=source.document_2.document_path.read_text(encoding="utf-8").splitlines(),
+            extra={},
+        ),
+    )
+
+
+def _corpus_bytes(work_dir: Path) -> int:
+    return (work_dir / "corpus_es.txt").stat().st_size + (work_dir / "corpus_ca.txt").stat().st_size
+
+
+def _consume(context: DocumentPairContext) -> int:
+    """Access every block, so lazily loaded checkpoints are fully read."""
+    return sum(len(block) for block in context.document_1.text_blocks) + sum(
+        len(block) for block in context.document_2.text_blocks)
+
+
+@case("text_reader_extractor")
+def _prepare_text_reader_extractor(work_dir: Path) -> PreparedCase:
+    from patee.steps.text_extractor_step import TextReaderExtractor
+
+    pipeline_context = _pipeline_context(work_dir)
+    step = TextReaderExtractor("load", pipeline_context)
+    context = StepContext(pipeline_context, RunContext(output_dir=None, source_hash="benchmark"), step_dir=None)
+    source = _text_pair(work_dir)
+
+    return PreparedCase(lambda: step.extract(context, source), items=2, unit="documents",
+                        input_bytes=_corpus_bytes(work_dir))
+
+
+@case("csv_extractor")
+def _prepare_csv_extractor(work_dir: Path) -> PreparedCase:
+    from patee.steps.csv_extractor_step import CsvExtractor
+
+    pipeline_context = _pipeline_context(work_dir)
+    step = CsvExtractor("load", pipeline_context)
+    context = StepContext(pipeline_context, RunContext(output_dir=None, source_hash="benchmark"), step_dir=None)
+    source = MultilingualSingleFile(document_path=work_dir / "corpus.tsv", iso2_languages=["es", "ca"])
+
+    return PreparedCase(lambda: step.extract(context, source), items=_count_lines(work_dir / "corpus_es.txt"),
+                        unit="pairs", input_bytes=source.document_path.stat().st_size)
+
+
+@case("docling_extractor_pypdfium")
+def _prepare_docling_extractor(work_dir: Path) -> PreparedCase:
+    from patee.steps.docling_extractor_step import DoclingExtractor
+
+    pipeline_context = _pipeline_context(work_dir)
+    step = DoclingExtractor("load", pipeline_context, parser="pypdfium", warm_up=True)
+    context = StepContext(pipeline_context, RunContext(output_dir=None, source_hash="benchmark"), step_dir=None)
+    pages = PageInfo(start_page=1, end_page=PDF_PAGES)
+    source = MonolingualSingleFilePair(
+        document_1=MonolingualSingleFile(document_path=PDF_1_FILE, iso2_language="es"),
+        document_2=MonolingualSingleFile(document_path=PDF_2_FILE, iso2_language="ca"),
+        shared_config=pages,
+    )
+
+    return PreparedCase(lambda: step.extract(context, source), items=2 * PDF_PAGES, unit="pages",
+                        input_bytes=PDF_1_FILE.stat().st_size + PDF_2_FILE.stat().st_size)
+
+
+@case("text_writer_processor")
+def _prepare_text_writer(work_dir: Path) -> PreparedCase:
+    from patee.steps.text_writer_processor_step import TextWriterProcessorStep
+
+    output_dir = work_dir / "text_writer"
+    output_dir.mkdir(exist_ok=True)
+    pipeline_context = _pipeline_context(work_dir)
+    step = TextWriterProcessorStep("save", pipeline_context, output_path=str(output_dir))
+    context = StepContext(pipeline_context, RunContext(output_dir=None, source_hash="benchmark"), step_dir=None)
+    source = _corpus_context(work_dir)
+
+    return PreparedCase(lambda: step.process(context, source), items=len(source.document_1.text_blocks),
+                        unit="pairs", input_bytes=_corpus_bytes(work_dir))
+
+
+@case("gale_church_aligner")
+def _prepare_gale_church_aligner(work_dir: Path) -> PreparedCase:
+    from patee.steps.gale_church_aligner_step import GaleChurchAlignerStep
+
+    pipeline_context = _pipeline_context(work_dir)
+    step = GaleChurchAlignerStep("align", pipeline_context)
+    context = StepContext(pipeline_context, RunContext(output_dir=None, source_hash="benchmark"), step_dir=None)
+    source = _corpus_context(work_dir)
+
+    return PreparedCase(lambda: step.process(context, source), items=len(source.document_1.text_blocks),
+                        unit="pairs", input_bytes=_corpus_bytes(work_dir))
+
+
+@case("sentence_segmenter")
+def _prepare_sentence_segmenter(work_dir: Path) -> PreparedCase:
+    from patee.steps.sentence_segmenter_step import SentenceSegmenterStep
+
+    pipeline_context = _pipeline_context(work_dir)
+    step = SentenceSegmenterStep("segment", pipeline_context)
+    context = StepContext(pipeline_context, RunContext(output_dir=None, source_hash="benchmark"), step_dir=None)
+    corpus = _corpus_context(work_dir)
+    # Paragraphs of several sentences, like the blocks of an extracted document
+    source = DocumentPairContext(
+        document_1=DocumentContext(
+            source=corpus.document_1.source,
+            text_blocks=_join_paragraphs(corpus.document_1.text_blocks),
+            extra={},
+        ),
+        document_2=DocumentContext(
+            source=corpus.document_2.source,
+            text_blocks=_join_paragraphs(corpus.document_2.text_blocks),
+            extra={},
+        ),
+    )
+    segmented = step.process(context, source).context
+    sentences = len(segmented.document_1.text_blocks) + len(segmented.document_2.text_blocks)
+
+    return PreparedCase(lambda: step.process(context, source), items=sentences, unit="sentences",
+                        input_bytes=_corpus_bytes(work_dir))
+
+
+@case("minhash_deduplicator")
+def _prepare_minhash_deduplicator(work_dir: Path) -> PreparedCase:
+    from patee.steps.minhash_deduplicator_step import MinHashDeduplicatorStep
+
+    pipeline_context = _pipeline_context(work_dir)
+    # Without index_dir, every run deduplicates against a new index in memory
+    step = MinHashDeduplicatorStep("deduplicate", pipeline_context)
+    context = StepContext(pipeline_context, RunContext(output_dir=None, source_hash="benchmark"), step_dir=None)
+    source = _corpus_context(work_dir)
+
+    return PreparedCase(lambda: step.process(context, source), items=len(source.document_1.text_blocks),
+                        unit="pairs", input_bytes=_corpus_bytes(work_dir))
+
+
+@case("write_to_shards")
+def _prepare_write_to_shards(work_dir: Path) -> PreparedCase:
+    from patee.steps.sharded_writer_step import ShardedWriterStep
+
+    output_dir = work_dir / "shards"
+    output_dir.mkdir(exist_ok=True)
+    pipeline_context = _pipeline_context(work_dir)
+    step = ShardedWriterStep("save", pipeline_context, output_path=str(output_dir))
+    source = _corpus_context(work_dir)
+    runs = itertools.count()
+
+    def run():
+        # Every run is a new source, so its pairs are appended to the shards
+        context = StepContext(pipeline_context, RunContext(output_dir=None, source_hash=f"run_{next(runs)}"),
+                              step_dir=None)
+        return step.process(context, source)
+
+    return PreparedCase(run, items=len(source.document_1.text_blocks), unit="pairs",
+                        input_bytes=_corpus_bytes(work_dir))
+
+
+def _prepare_executor_dump(work_dir: Path, executor_name: str, checkpoint_format: str) -> PreparedCase:
+    from patee import steps_executor
+    from patee.steps.noop_processor_step import NoopProcessorStep
+
+    executor_type = {
+        "non_persistent": steps_executor.NonPersistentStepsExecutor,
+        "persistent": steps_executor.PersistentStepsExecutor,
+        "intelligent_persistence": steps_executor.IntelligentPersistenceStepsExecutor,
+    }[executor_name]
+    pipeline_context = _pipeline_context(work_dir, checkpoint_format)
+    output_dir = None
+    if executor_name != "non_persistent":
+        output_dir = work_dir / f"{executor_name}_{checkpoint_format}"
+        output_dir.mkdir(exist_ok=True)
+
+    step = NoopProcessorStep("process", pipeline_context)
+    metadata = StepMetadata(name="process", type=step.step_type(), idx=1, config_hash="")
+    source = _corpus_context(work_dir)
+    runs = itertools.count()
+
+    def run():
+        # Every run is a new source, so the resumable executor does not skip the steps executed by previous runs
+        executor = executor_type(pipeline_context, RunContext(output_dir=output_dir, source_hash=f"run_{next(runs)}"))
+        try:
+            return executor.execute_step(step, metadata, source)
+        finally:
+            executor.close()
+
+    return PreparedCase(run, items=len(source.document_1.text_blocks), unit="pairs",
+                        input_bytes=_corpus_bytes(work_dir))
+
+
+def _prepare_executor_load(work_dir: Path, checkpoint_format: str) -> PreparedCase:
+    from patee.steps_executor import IntelligentPersistenceStepsExecutor
+    from patee.steps.noop_processor_step import NoopProcessorStep
+
+    pipeline_context = _pipeline_context(work_dir, checkpoint_format)
+    output_dir = work_dir / f"load_{checkpoint_format}"
+    output_dir.mkdir(exist_ok=True)
+
+    executor = IntelligentPersistenceStepsExecutor(
+        pipeline_context, RunContext(output_dir=output_dir, source_hash="benchmark"))
+    step = NoopProcessorStep("process", pipeline_context)
+    metadata = StepMetadata(name="process", type=step.step_type(), idx=1, config_hash="")
+    source = _corpus_context(work_dir)
+    executor.execute_step(step, metadata, source)
+
+    return PreparedCase(lambda: _consume(executor.load_checkpoint(step, metadata, source).context),
+                        items=len(source.document_1.text_blocks), unit="pairs",
+                        input_bytes=_corpus_bytes(work_dir))
+
+
+CASES["executor_non_persistent"] = lambda work_dir: _prepare_executor_dump(work_dir, "non_persistent", "text")
+for _format in CHECKPOINT_FORMATS:
+    for _executor_name in ("persistent", "intelligent_persistence"):
+        CASES[f"executor_{_executor_name}_{_format}_dump"] = (
+            lambda work_dir, executor_name=_executor_name, checkpoint_format=_format:
+            _prepare_executor_dump(work_dir, executor_name, checkpoint_format))
+    CASES[f"executor_intelligent_persistence_{_format}_load"] = (
+        lambda work_dir, checkpoint_format=_format: _prepare_executor_load(work_dir, checkpoint_format))
+
+
+def _join_paragraphs(blocks: list[str], sentences_per_paragraph: int = 10) -> list[str]:
+    return [" ".join(blocks[start:start + sentences_per_paragraph])
+            for start in range(0, len(blocks), sentences_per_paragraph)]
+
+
+def _count_lines(path: Path) -> int:
+    with path.open("rb") as f:
+        return sum(1 for _ in f)
+
+
+def measure_case(name: str, work_dir: Path, repeat: int) -> CaseResult:
+    """Run a case in the current process. The inputs are prepared once and the case is run repeat times."""
+    prepared = CASES[name](work_dir)
+
+    # The first run warms up the caches and the lazy imports of the case
+    prepared.run()
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        prepared.run()
+        timings.append(time.perf_counter() - start)
+
+    # tracemalloc slows down the allocations, so the peak is measured in a run that is not timed
+    tracemalloc.start()
+    prepared.run()
+    _, peak_python_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    seconds = statistics.median(timings)
+    return CaseResult(
+        case=name,
+        unit=prepared.unit,
+        items=prepared.items,
+        input_bytes=prepared.input_bytes,
+        seconds=seconds,
+        items_per_second=prepared.items / seconds if seconds > 0 else 0.0,
+        mb_per_second=prepared.input_bytes / (1024 * 1024) / seconds if seconds > 0 else 0.0,
+        peak_python_bytes=peak_python_bytes,
+        max_rss_bytes=_get_peak_rss_bytes(),
+    )
+
+
+def run_case_in_subprocess(name: str, work_dir: Path, repeat: int) -> Union[CaseResult, str]:
+    """Run a case in a new interpreter. Return its result or the reason it failed."""
+    output = subprocess.run(
+        [sys.executable, __file__, "--run-case", name, "--work-dir", str(work_dir), "--repeat", str(repeat)],
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(ROOT_DIR), os.environ.get("PYTHONPATH")]))},
+        capture_output=True,
+        text=True,
+    )
+    if output.returncode != 0:
+        error_lines = output.stderr.strip().splitlines()
+        return error_lines[-1] if error_lines else f"exit code {output.returncode}"
+
+    return CaseResult(**json.loads(output.stdout.strip().splitlines()[-1]))
+
+
+def compare(results: list[CaseResult], baseline: dict, tolerance: float) -> list[str]:
+    """Return the regressions of the results with respect to the cases of a baseline."""
+    regressions = []
+    baseline_cases = baseline["cases"]
+    for result in results:
+        reference = baseline_cases.get(result.case)
+        if reference is None:
+            continue
+
+        if result.items_per_second < reference["items_per_second"] * (1 - tolerance):
+            regressions.append(f"{result.case}: {result.items_per_second:.1f} {result.unit}/s, "
+                               f"baseline {reference['items_per_second']:.1f} {result.unit}/s")
+        if result.peak_python_bytes > reference["peak_python_bytes"] * (1 + tolerance):
+            regressions.append(f"{result.case}: peak Python memory {result.peak_python_bytes / 2 ** 20:.1f} MB, "
+                               f"baseline {reference['peak_python_bytes'] / 2 ** 20:.1f} MB")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pairs", type=int, default=50_000, help="pairs of sentences of the synthetic corpus")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case")
+    parser.add_argument("--case", action="append", choices=sorted(CASES), default=None,
+                        help="case to run. Can be repeated. Defaults to all")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic corpus")
+    parser.add_argument("--save-baseline", type=Path, default=None, help="write the results to this JSON file")
+    parser.add_argument("--compare", type=Path, default=None, help="compare the results with a baseline JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="relative drop of throughput or growth of memory allowed when comparing")
+    parser.add_argument("--run-case", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--work-dir", type=Path, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.run_case is not None:
+        print(json.dumps(asdict(measure_case(args.run_case, args.work_dir, args.repeat))))
+        return
+
+    results = []
+    failed = False
+    with tempfile.TemporaryDirectory() as work_dir:
+        generate_corpus(Path(work_dir), args.pairs, args.seed)
+        for name in args.case or list(CASES):
+            result = run_case_in_subprocess(name, Path(work_dir), args.repeat)
+            if isinstance(result, str):
+                status = "skipped" if name in OPTIONAL_CASES else "failed"
+                failed = failed or name not in OPTIONAL_CASES
+                print(f"{name:>52}: {status} ({result})")
+                continue
+
+            results.append(result)
+            print(f"{name:>52}: {result.items_per_second:12.1f} {result.unit}/s {result.mb_per_second:8.1f} MB/s, "
+                  f"peak Python {result.peak_python_bytes / 2 ** 20:8.1f} MB, "
+                  f"max RSS {result.max_rss_bytes / 2 ** 20:8.1f} MB")
+
+    if args.save_baseline is not None:
+        args.save_baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.save_baseline.write_text(json.dumps({
+            "pairs": args.pairs,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "cases": {result.case: asdict(result) for result in results},
+        }, indent=2) + "\n", encoding="utf-8")
+
+    if args.compare is not None:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        if baseline.get("pairs") != args.pairs:
+            print(f"baseline measured with {baseline.get('pairs')} pairs, not {args.pairs}", file=sys.stderr)
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"regression: {regression}")
+        failed = failed or bool(regressions)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
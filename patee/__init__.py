@@ -17,16 +17,32 @@ from .step_types import (
     StepResult,
     Step,
     ParallelExtractStep,
-    ParallelExtractStep,
+    ParallelProcessStep,
+    AsyncParallelExtractStep,
+    AsyncParallelProcessStep,
+    StreamingProcessStep,
+    BlockPair,
     StepMetadata,
     StepsBuilder,
 )
+from .checkpoint_formats import (
+    CheckpointFormat,
+    TextCheckpointFormat,
+    BinaryCheckpointFormat,
+    MappedBinaryCheckpointFormat,
+    MappedTextBlocks,
+)
+from .digests import (
+    source_digest,
+)
 from .patee import (
     RunResult,
+    BatchRunResult,
     Patee,
 )
 from .steps_executor import (
     StepsExecutor,
+    StepMetrics,
     NonPersistentStepsExecutor,
     PersistentStepsExecutor,
     IntelligentPersistenceStepsExecutor,
@@ -47,13 +63,25 @@ __all__ = [
     "StepResult",
     "Step",
     "ParallelExtractStep",
-    "ParallelExtractStep",
+    "ParallelProcessStep",
+    "AsyncParallelExtractStep",
+    "AsyncParallelProcessStep",
+    "StreamingProcessStep",
+    "BlockPair",
     "StepMetadata",
     "RunResult",
+    "BatchRunResult",
     "Patee",
     "StepsExecutor",
+    "StepMetrics",
     "NonPersistentStepsExecutor",
     "PersistentStepsExecutor",
     "IntelligentPersistenceStepsExecutor",
     "StepsBuilder",
+    "CheckpointFormat",
+    "TextCheckpointFormat",
+    "BinaryCheckpointFormat",
+    "MappedBinaryCheckpointFormat",
+    "MappedTextBlocks",
+    "source_digest",
 ]
\ No newline at end of file
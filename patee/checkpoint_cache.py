@@ -0,0 +1,151 @@
+"""Evict the least recently used step checkpoints of an output directory beyond a size or age budget.
+
+    python -m patee.checkpoint_cache path/to/out_dir --max-size 50G --max-age 30d
+"""
+import argparse
+import json
+import logging
+import re
+import sys
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Union, Iterable
+
+from .checkpoint_manifest import CheckpointManifest, CheckpointInfo
+
+logger = logging.getLogger(__name__)
+
+
+# Runs older than this are considered dead and do not protect the checkpoints of their source
+DEFAULT_ACTIVE_RUN_TIMEOUT_SECONDS = 24 * 60 * 60
+
+_SIZE_UNITS = {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3, "t": 1024 ** 4}
+_AGE_UNITS = {"": 1, "s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60, "w": 7 * 24 * 60 * 60}
+
+
+@dataclass(frozen=True)
+class CollectionResult:
+    evicted_checkpoints: int
+    freed_bytes: int
+    kept_checkpoints: int
+    kept_bytes: int
+    dry_run: bool = False
+
+
+class CheckpointCache:
+    """LRU cache policy over the checkpoints recorded in the manifest of an output directory.
+
+    The checkpoints older than max_age_seconds are evicted, then the least recently used ones until the size of the
+    checkpoints is within max_bytes. The checkpoints of the sources with an active run are never evicted.
+    """
+
+    def __init__(self, out_dir: Path, max_bytes: Union[int, None] = None, max_age_seconds: Union[float, None] = None,
+                 active_run_timeout_seconds: float = DEFAULT_ACTIVE_RUN_TIMEOUT_SECONDS):
+        if max_bytes is not None and max_bytes < 0:
+            raise ValueError(f"max_bytes must not be negative, got {max_bytes}")
+        if max_age_seconds is not None and max_age_seconds < 0:
+            raise ValueError(f"max_age_seconds must not be negative, got {max_age_seconds}")
+
+        self.out_dir = out_dir
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.active_run_timeout_seconds = active_run_timeout_seconds
+        self._manifest = CheckpointManifest(out_dir)
+
+    def checkpoints(self) -> list[CheckpointInfo]:
+        """Return the checkpoints from the least recently used."""
+        return self._manifest.list_checkpoints()
+
+    def collect(self, protected_sources: Iterable[str] = (), dry_run: bool = False) -> CollectionResult:
+        """Evict the checkpoints beyond the budget, except the ones of protected_sources."""
+        now = time.time()
+        protected_sources = set(protected_sources)
+        checkpoints = self._manifest.list_checkpoints()
+        total_bytes = sum(checkpoint.size_bytes for checkpoint in checkpoints)
+
+        evicted_checkpoints = 0
+        freed_bytes = 0
+        for checkpoint in checkpoints:
+            is_expired = self.max_age_seconds is not None and checkpoint.last_access < now - self.max_age_seconds
+            is_over_budget = self.max_bytes is not None and total_bytes - freed_bytes > self.max_bytes
+            if not is_expired and not is_over_budget:
+                # The checkpoints are sorted by last access, so the rest are not expired either
+                break
+            if checkpoint.source_hash in protected_sources:
+                continue
+
+            if dry_run or self._manifest.evict_checkpoint(checkpoint, now - self.active_run_timeout_seconds):
+                logger.debug("checkpoint of %s step for source %s evicted (%s bytes).",
+                             checkpoint.step_name, checkpoint.source_hash, checkpoint.size_bytes)
+                evicted_checkpoints += 1
+                freed_bytes += checkpoint.size_bytes
+
+        if not dry_run:
+            orphan_bytes = self._manifest.evict_orphan_files()
+            total_bytes += orphan_bytes
+            freed_bytes += orphan_bytes
+
+        result = CollectionResult(
+            evicted_checkpoints=evicted_checkpoints,
+            freed_bytes=freed_bytes,
+            kept_checkpoints=len(checkpoints) - evicted_checkpoints,
+            kept_bytes=total_bytes - freed_bytes,
+            dry_run=dry_run,
+        )
+
+        logger.info("%s checkpoint(s) evicted from %s, %s bytes freed. %s bytes kept.",
+                    result.evicted_checkpoints, self.out_dir, result.freed_bytes, result.kept_bytes)
+
+        return result
+
+
+def parse_size(size: str) -> int:
+    """Parse a size in bytes with an optional K, M, G or T binary unit, like 512M or 10G."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([kmgt]?)i?b?\s*", size, re.IGNORECASE)
+    if match is None:
+        raise ValueError(f"invalid size: {size}")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2).lower()])
+
+
+def parse_age(age: str) -> float:
+    """Parse an age in seconds with an optional s, m, h, d or w unit, like 12h or 30d."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([smhdw]?)\s*", age, re.IGNORECASE)
+    if match is None:
+        raise ValueError(f"invalid age: {age}")
+    return float(match.group(1)) * _AGE_UNITS[match.group(2).lower()]
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("out_dir", type=Path, help="output directory of the runs")
+    parser.add_argument("--max-size", type=parse_size, default=None,
+                        help="size budget of the checkpoints, like 500M or 50G")
+    parser.add_argument("--max-age", type=parse_age, default=None,
+                        help="evict the checkpoints not used for this time, like 12h or 30d")
+    parser.add_argument("--protect", action="append", default=[], metavar="SOURCE_HASH",
+                        help="source whose checkpoints are never evicted. Can be repeated")
+    parser.add_argument("--active-run-timeout", type=parse_age, default=DEFAULT_ACTIVE_RUN_TIMEOUT_SECONDS,
+                        help="age after which a run that did not finish does not protect its checkpoints")
+    parser.add_argument("--dry-run", action="store_true", help="report the checkpoints to evict without evicting")
+
+
+def run_from_arguments(args: argparse.Namespace) -> int:
+    if not args.out_dir.is_dir():
+        print(f"output directory {args.out_dir} does not exist", file=sys.stderr)
+        return 2
+
+    cache = CheckpointCache(args.out_dir, max_bytes=args.max_size, max_age_seconds=args.max_age,
+                            active_run_timeout_seconds=args.active_run_timeout)
+    result = cache.collect(protected_sources=args.protect, dry_run=args.dry_run)
+    print(json.dumps(asdict(result)))
+    return 0
+
+
+def main(argv: Union[list[str], None] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    return run_from_arguments(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
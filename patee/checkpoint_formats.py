@@ -0,0 +1,345 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from abc import ABC, abstractmethod
+from array import array
+from collections.abc import Sequence
+from pathlib import Path
+from typing import BinaryIO, TextIO, Union
+
+from .step_types import DocumentSource, DocumentContext, DocumentPairContext, TEXT_BLOCK_SEPARATOR
+
+
+class CheckpointWriter(ABC):
+    """Base class for the writers of checkpoint files block by block."""
+
+    def __init__(self):
+        self.extra = {}
+
+    @abstractmethod
+    def write_block(self, block: str) -> None:
+        pass
+
+    @abstractmethod
+    def close(self) -> None:
+        pass
+
+    @abstractmethod
+    def abort(self) -> None:
+        pass
+
+    def __enter__(self) -> "CheckpointWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class CheckpointFormat(ABC):
+    """Base class for the formats used to persist the result of the steps."""
+
+    @staticmethod
+    @abstractmethod
+    def format_name() -> str:
+        pass
+
+    @abstractmethod
+    def dump(self, document: DocumentContext, result_dir: Path) -> None:
+        pass
+
+    @abstractmethod
+    def load(self, original_source: DocumentSource, current_dir: Path) -> DocumentContext:
+        pass
+
+    @abstractmethod
+    def open_writer(self, source: DocumentSource, result_dir: Path) -> CheckpointWriter:
+        pass
+
+    @abstractmethod
+    def file_paths(self, source: DocumentSource, result_dir: Path) -> list[Path]:
+        """Return the paths of the files a document may be persisted to."""
+        pass
+
+    def pair_file_paths(self, document_1_source: DocumentSource, document_2_source: DocumentSource,
+                        result_dir: Path) -> list[Path]:
+        return self.file_paths(document_1_source, result_dir) + self.file_paths(document_2_source, result_dir)
+
+    def dump_pair(self, context: DocumentPairContext, out_dir: Path) -> None:
+        if not out_dir.is_dir():
+            raise ValueError(f"out_dit path {out_dir} is not a directory")
+
+        self.dump(context.document_1, out_dir)
+        self.dump(context.document_2, out_dir)
+
+    def load_pair(self, document_1_source: DocumentSource, document_2_source: DocumentSource,
+                  current_dir: Path) -> DocumentPairContext:
+        if not current_dir.is_dir():
+            raise ValueError(f"out_dit path {current_dir} is not a directory")
+
+        return DocumentPairContext(
+            document_1=self.load(document_1_source, current_dir),
+            document_2=self.load(document_2_source, current_dir),
+        )
+
+
+class TextCheckpointFormat(CheckpointFormat):
+    """Human readable format. The text blocks are joined with a separator and extra is stored as json."""
+
+    @staticmethod
+    def format_name() -> str:
+        return "text"
+
+    def dump(self, document: DocumentContext, result_dir: Path) -> None:
+        document.dump_to(result_dir)
+
+    def load(self, original_source: DocumentSource, current_dir: Path) -> DocumentContext:
+        return DocumentContext.load_from(original_source, current_dir)
+
+    def open_writer(self, source: DocumentSource, result_dir: Path) -> CheckpointWriter:
+        return TextCheckpointWriter(result_dir, source.document_path.stem)
+
+    def file_paths(self, source: DocumentSource, result_dir: Path) -> list[Path]:
+        stem = source.document_path.stem
+        return [result_dir / f"{stem}.txt", result_dir / f"{stem}_extra.json"]
+
+
+class TextCheckpointWriter(CheckpointWriter):
+    """Write a text checkpoint file block by block."""
+
+    def __init__(self, result_dir: Path, stem: str):
+        super().__init__()
+        self._file_path = result_dir / f"{stem}.txt"
+        self._extra_path = result_dir / f"{stem}_extra.json"
+        self._file: TextIO = self._file_path.open("w")
+        self._is_first_block = True
+
+    def write_block(self, block: str) -> None:
+        if not self._is_first_block:
+            self._file.write(TEXT_BLOCK_SEPARATOR)
+        self._file.write(block)
+        self._is_first_block = False
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+
+        self._file.close()
+        if len(self.extra) > 0:
+            self._extra_path.write_text(json.dumps(self.extra, ensure_ascii=False, indent=2), encoding="utf-8")
+        else:
+            self._extra_path.unlink(missing_ok=True)
+
+    def abort(self) -> None:
+        if self._file.closed:
+            return
+
+        self._file.close()
+        self._file_path.unlink(missing_ok=True)
+
+
+BINARY_CHECKPOINT_SUFFIX = ".ptc"
+
+_BINARY_MAGIC = b"PATEECK1"
+# Footer: number of blocks, offset of extra, offset of the blocks index and magic
+_BINARY_FOOTER = struct.Struct("<QQQ8s")
+
+
+class BinaryCheckpointFormat(CheckpointFormat):
+    """Compact format. The text blocks are stored as utf-8 bytes followed by extra and an index of offsets.
+
+    A file is read with a single read and the blocks are sliced using the index, so the content of the blocks
+    is never scanned for separators.
+    """
+
+    @staticmethod
+    def format_name() -> str:
+        return "binary"
+
+    def dump(self, document: DocumentContext, result_dir: Path) -> None:
+        with self.open_writer(document.source, result_dir) as writer:
+            if isinstance(document.text_blocks, MappedTextBlocks):
+                # Copy the encoded blocks without decoding them
+                for idx in range(len(document.text_blocks)):
+                    writer.write_encoded_block(document.text_blocks.encoded_block(idx))
+            else:
+                for block in document.text_blocks:
+                    writer.write_block(block)
+            writer.extra = document.extra
+
+    def load(self, original_source: DocumentSource, current_dir: Path) -> DocumentContext:
+        if not current_dir.is_dir():
+            raise ValueError(f"out_dit path {current_dir} is not a directory")
+
+        file_path = current_dir / f"{original_source.document_path.stem}{BINARY_CHECKPOINT_SUFFIX}"
+        data = file_path.read_bytes()
+
+        offsets, extra_offset, index_offset = read_binary_checkpoint_index(data, file_path)
+
+        view = memoryview(data)
+        text_blocks = []
+        start = len(_BINARY_MAGIC)
+        for end in offsets:
+            text_blocks.append(str(view[start:end], "utf-8"))
+            start = end
+
+        extra = json.loads(str(view[extra_offset:index_offset], "utf-8"))
+
+        return DocumentContext(original_source, text_blocks, extra)
+
+    def open_writer(self, source: DocumentSource, result_dir: Path) -> "BinaryCheckpointWriter":
+        return BinaryCheckpointWriter(result_dir / f"{source.document_path.stem}{BINARY_CHECKPOINT_SUFFIX}")
+
+    def file_paths(self, source: DocumentSource, result_dir: Path) -> list[Path]:
+        return [result_dir / f"{source.document_path.stem}{BINARY_CHECKPOINT_SUFFIX}"]
+
+
+class MappedBinaryCheckpointFormat(BinaryCheckpointFormat):
+    """Binary format loaded lazily. The text blocks are decoded on access from a memory map of the file."""
+
+    @staticmethod
+    def format_name() -> str:
+        return "mapped_binary"
+
+    def load(self, original_source: DocumentSource, current_dir: Path) -> DocumentContext:
+        if not current_dir.is_dir():
+            raise ValueError(f"out_dit path {current_dir} is not a directory")
+
+        text_blocks = MappedTextBlocks(current_dir / f"{original_source.document_path.stem}{BINARY_CHECKPOINT_SUFFIX}")
+
+        return DocumentContext(original_source, text_blocks, text_blocks.read_extra())
+
+
+class MappedTextBlocks(Sequence):
+    """Read only sequence of the text blocks of a binary checkpoint file backed by a memory map."""
+
+    def __init__(self, file_path: Path):
+        self.file_path = file_path
+
+        with file_path.open("rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self._offsets, self._extra_offset, self._index_offset = read_binary_checkpoint_index(self._mmap, file_path)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __getitem__(self, idx: Union[int, slice]) -> Union[str, list[str]]:
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+
+        return str(self.encoded_block(idx), "utf-8")
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Sequence) and not isinstance(other, (str, bytes)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"MappedTextBlocks({self.file_path!r}, blocks={len(self)})"
+
+    @property
+    def encoded_size(self) -> int:
+        """Size in utf-8 bytes of all the blocks, read from the index without decoding them."""
+        return self._offsets[-1] - len(_BINARY_MAGIC) if self._offsets else 0
+
+    def encoded_block(self, idx: int) -> bytes:
+        if idx < 0:
+            idx += len(self)
+        if idx < 0 or idx >= len(self):
+            raise IndexError("text block index out of range")
+
+        start = self._offsets[idx - 1] if idx > 0 else len(_BINARY_MAGIC)
+        return self._mmap[start:self._offsets[idx]]
+
+    def read_extra(self) -> dict:
+        return json.loads(str(self._mmap[self._extra_offset:self._index_offset], "utf-8"))
+
+    def close(self) -> None:
+        self._mmap.close()
+
+
+class BinaryCheckpointWriter(CheckpointWriter):
+    """Write a binary checkpoint file block by block.
+
+    The file is written to a temporary path and moved into place when closed, so readers never see a partial
+    file and memory maps of a previous version of the file stay valid.
+    """
+
+    def __init__(self, file_path: Path):
+        super().__init__()
+        self._file_path = file_path
+        self._temp_path = file_path.with_name(f"{file_path.name}.{os.getpid()}.tmp")
+        self._file: BinaryIO = self._temp_path.open("wb")
+        self._file.write(_BINARY_MAGIC)
+        self._position = len(_BINARY_MAGIC)
+        self._offsets = array("Q")
+
+    def write_block(self, block: str) -> None:
+        self.write_encoded_block(block.encode("utf-8"))
+
+    def write_encoded_block(self, data: bytes) -> None:
+        self._file.write(data)
+        self._position += len(data)
+        self._offsets.append(self._position)
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+
+        extra_offset = self._position
+        extra_data = json.dumps(self.extra, ensure_ascii=False).encode("utf-8")
+        self._file.write(extra_data)
+        index_offset = extra_offset + len(extra_data)
+
+        if sys.byteorder == "big":
+            self._offsets.byteswap()
+        self._file.write(self._offsets.tobytes())
+        self._file.write(_BINARY_FOOTER.pack(len(self._offsets), extra_offset, index_offset, _BINARY_MAGIC))
+        self._file.close()
+
+        os.replace(self._temp_path, self._file_path)
+
+    def abort(self) -> None:
+        if self._file.closed:
+            return
+
+        self._file.close()
+        self._temp_path.unlink(missing_ok=True)
+
+
+def read_binary_checkpoint_index(data, file_path: Path) -> (array, int, int):
+    """Read the end offsets of the blocks, the offset of extra and the offset of the index of a binary checkpoint."""
+    if len(data) < len(_BINARY_MAGIC) + _BINARY_FOOTER.size or data[:len(_BINARY_MAGIC)] != _BINARY_MAGIC:
+        raise ValueError(f"{file_path} is not a valid binary checkpoint file")
+
+    block_count, extra_offset, index_offset, magic = _BINARY_FOOTER.unpack_from(data, len(data) - _BINARY_FOOTER.size)
+    if magic != _BINARY_MAGIC:
+        raise ValueError(f"{file_path} is not a valid binary checkpoint file")
+
+    offsets = array("Q")
+    offsets.frombytes(data[index_offset:index_offset + block_count * offsets.itemsize])
+    if sys.byteorder == "big":
+        offsets.byteswap()
+
+    return offsets, extra_offset, index_offset
+
+
+CHECKPOINT_FORMATS: dict[str, type[CheckpointFormat]] = {
+    TextCheckpointFormat.format_name(): TextCheckpointFormat,
+    BinaryCheckpointFormat.format_name(): BinaryCheckpointFormat,
+    MappedBinaryCheckpointFormat.format_name(): MappedBinaryCheckpointFormat,
+}
+
+
+def get_checkpoint_format(format_name: str) -> CheckpointFormat:
+    checkpoint_format = CHECKPOINT_FORMATS.get(format_name)
+    if checkpoint_format is None:
+        raise ValueError(
+            f"Unsupported checkpoint format: {format_name}. Supported formats are {sorted(CHECKPOINT_FORMATS)}.")
+
+    return checkpoint_format()
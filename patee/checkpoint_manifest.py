@@ -0,0 +1,304 @@
+import logging
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Iterable
+
+logger = logging.getLogger(__name__)
+
+
+MANIFEST_FILE_NAME = ".patee.sqlite"
+
+COMPLETED_STATUS = "completed"
+STOPPED_STATUS = "stopped"
+
+DEFAULT_CHECKPOINT_FORMAT = "text"
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS sources (
+        source_hash TEXT PRIMARY KEY,
+        first_seen REAL NOT NULL,
+        last_seen REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS checkpoints (
+        source_hash TEXT NOT NULL,
+        step_name TEXT NOT NULL,
+        step_key TEXT NOT NULL,
+        status TEXT NOT NULL,
+        updated_at REAL NOT NULL,
+        last_access REAL,
+        checkpoint_format TEXT NOT NULL DEFAULT 'text',
+        file_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (source_hash, step_name, step_key)
+    )
+    """,
+    # Files of the checkpoints, owned by the last checkpoint that wrote them
+    """
+    CREATE TABLE IF NOT EXISTS checkpoint_files (
+        path TEXT PRIMARY KEY,
+        source_hash TEXT NOT NULL,
+        step_name TEXT NOT NULL,
+        step_key TEXT NOT NULL,
+        size_bytes INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS checkpoint_files_checkpoint ON checkpoint_files (source_hash, step_name, step_key)
+    """,
+    # Runs using the checkpoints of a source, which must not be evicted while they run
+    """
+    CREATE TABLE IF NOT EXISTS active_runs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        source_hash TEXT NOT NULL,
+        started_at REAL NOT NULL
+    )
+    """,
+)
+
+
+@dataclass(frozen=True)
+class CheckpointInfo:
+    source_hash: str
+    step_name: str
+    step_key: str
+    status: str
+    last_access: float
+    size_bytes: int
+
+
+class CheckpointManifest:
+    """Index of the step checkpoints persisted in an output directory.
+
+    The manifest is a SQLite database in WAL mode, so lookups use the primary key index and
+    concurrent runs sharing the same output directory commit their changes atomically.
+    """
+
+    def __init__(self, out_dir: Path, timeout: float = 60.0):
+        if not out_dir.is_dir():
+            raise ValueError(f"out_dir path {out_dir} is not a directory")
+
+        self.path = out_dir / MANIFEST_FILE_NAME
+        self._timeout = timeout
+
+        with self._transaction() as connection:
+            for statement in _SCHEMA:
+                connection.execute(statement)
+
+            # Manifests created by previous versions do not track the last access of the checkpoints
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(checkpoints)")}
+            if "last_access" not in columns:
+                connection.execute("ALTER TABLE checkpoints ADD COLUMN last_access REAL")
+                connection.execute("UPDATE checkpoints SET last_access = updated_at")
+            # Previous versions only wrote checkpoints in the text format
+            if "checkpoint_format" not in columns:
+                connection.execute(
+                    "ALTER TABLE checkpoints ADD COLUMN checkpoint_format TEXT NOT NULL DEFAULT 'text'")
+            if "file_count" not in columns:
+                connection.execute("ALTER TABLE checkpoints ADD COLUMN file_count INTEGER NOT NULL DEFAULT 0")
+
+    def register_source(self, source_hash: str) -> bool:
+        """Register the execution of a source. Return whether the source has been executed before."""
+        now = time.time()
+        with self._transaction() as connection:
+            row = connection.execute(
+                "SELECT 1 FROM sources WHERE source_hash = ?", (source_hash,)).fetchone()
+            if row is None:
+                connection.execute(
+                    "INSERT INTO sources (source_hash, first_seen, last_seen) VALUES (?, ?, ?)",
+                    (source_hash, now, now))
+            else:
+                connection.execute(
+                    "UPDATE sources SET last_seen = ? WHERE source_hash = ?", (now, source_hash))
+
+        return row is not None
+
+    def has_checkpoint(self, source_hash: str, step_name: str, step_key: str,
+                       status: str = COMPLETED_STATUS, checkpoint_format: str = DEFAULT_CHECKPOINT_FORMAT) -> bool:
+        """Check if there is a checkpoint of the step for the source with the given status, written in the given
+        checkpoint format.
+
+        The files of the checkpoint must still be owned by it and unchanged, other sources with documents of the
+        same name write to the same files of the step.
+        """
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT file_count FROM checkpoints WHERE source_hash = ? AND step_name = ? AND step_key = ? "
+                "AND status = ? AND checkpoint_format = ?",
+                (source_hash, step_name, step_key, status, checkpoint_format)).fetchone()
+            if row is None:
+                return False
+
+            files = connection.execute(
+                "SELECT path, size_bytes, mtime_ns FROM checkpoint_files "
+                "WHERE source_hash = ? AND step_name = ? AND step_key = ?",
+                (source_hash, step_name, step_key)).fetchall()
+
+        # The files written again by other checkpoints are owned by them
+        if len(files) != row[0]:
+            return False
+
+        return all(_is_unchanged(path, size_bytes, mtime_ns) for path, size_bytes, mtime_ns in files)
+
+    def save_checkpoint(self, source_hash: str, step_name: str, step_key: str,
+                        status: str = COMPLETED_STATUS, file_paths: Iterable[Path] = (),
+                        checkpoint_format: str = DEFAULT_CHECKPOINT_FORMAT) -> None:
+        """Save the checkpoint of the step for the source, replacing its previous status.
+
+        The checkpoints of the step for the source with other keys are removed, because the files of the step are
+        written again. The existing files of file_paths are recorded as owned by the checkpoint, so they can be evicted
+        with it.
+        """
+        now = time.time()
+        files = []
+        for file_path in file_paths:
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
+                continue
+            files.append((str(Path(file_path).resolve()), source_hash, step_name, step_key,
+                          stat.st_size, stat.st_mtime_ns))
+
+        with self._transaction() as connection:
+            # The files of the removed checkpoints are left to evict_orphan_files, they may have been written again
+            connection.execute(
+                "DELETE FROM checkpoints WHERE source_hash = ? AND step_name = ? AND step_key != ?",
+                (source_hash, step_name, step_key))
+            connection.execute(
+                "INSERT INTO checkpoints "
+                "(source_hash, step_name, step_key, status, updated_at, last_access, checkpoint_format, file_count) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (source_hash, step_name, step_key) "
+                "DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at, "
+                "last_access = excluded.last_access, checkpoint_format = excluded.checkpoint_format, "
+                "file_count = excluded.file_count",
+                (source_hash, step_name, step_key, status, now, now, checkpoint_format, len(files)))
+            # The files recorded by a previous save of the checkpoint that were not written this time
+            connection.execute(
+                "DELETE FROM checkpoint_files WHERE source_hash = ? AND step_name = ? AND step_key = ?",
+                (source_hash, step_name, step_key))
+            connection.executemany(
+                "INSERT OR REPLACE INTO checkpoint_files (path, source_hash, step_name, step_key, size_bytes, mtime_ns) "
+                "VALUES (?, ?, ?, ?, ?, ?)", files)
+
+    def touch_checkpoint(self, source_hash: str, step_name: str, step_key: str) -> None:
+        """Record an access to the checkpoint of the step for the source."""
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE checkpoints SET last_access = ? WHERE source_hash = ? AND step_name = ? AND step_key = ?",
+                (time.time(), source_hash, step_name, step_key))
+
+    def begin_run(self, source_hash: str) -> int:
+        """Register a run using the checkpoints of the source. Return the id to end it."""
+        with self._transaction() as connection:
+            return connection.execute(
+                "INSERT INTO active_runs (source_hash, started_at) VALUES (?, ?)", (source_hash, time.time())).lastrowid
+
+    def end_run(self, run_id: int) -> None:
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM active_runs WHERE id = ?", (run_id,))
+
+    def list_checkpoints(self) -> list[CheckpointInfo]:
+        """Return the checkpoints with the size of the files they own, from the least recently accessed."""
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT c.source_hash, c.step_name, c.step_key, c.status, c.last_access, "
+                "COALESCE(SUM(f.size_bytes), 0) "
+                "FROM checkpoints c LEFT JOIN checkpoint_files f "
+                "ON f.source_hash = c.source_hash AND f.step_name = c.step_name AND f.step_key = c.step_key "
+                "GROUP BY c.source_hash, c.step_name, c.step_key "
+                "ORDER BY c.last_access").fetchall()
+
+        return [CheckpointInfo(*row) for row in rows]
+
+    def evict_checkpoint(self, checkpoint: CheckpointInfo, active_since: float) -> bool:
+        """Remove the checkpoint and delete its files, unless it has been accessed since it was listed or the source
+        has a run started after active_since. Return whether the checkpoint has been evicted.
+
+        A file is only deleted when it has not been written again since it was recorded.
+        """
+        with self._transaction() as connection:
+            row = connection.execute(
+                "SELECT last_access FROM checkpoints WHERE source_hash = ? AND step_name = ? AND step_key = ?",
+                (checkpoint.source_hash, checkpoint.step_name, checkpoint.step_key)).fetchone()
+            if row is None or row[0] != checkpoint.last_access:
+                return False
+
+            active_run = connection.execute(
+                "SELECT 1 FROM active_runs WHERE source_hash = ? AND started_at >= ?",
+                (checkpoint.source_hash, active_since)).fetchone()
+            if active_run is not None:
+                return False
+
+            files = connection.execute(
+                "SELECT path, mtime_ns FROM checkpoint_files WHERE source_hash = ? AND step_name = ? AND step_key = ?",
+                (checkpoint.source_hash, checkpoint.step_name, checkpoint.step_key)).fetchall()
+            # Deleted while holding the lock of the manifest, so no run records a checkpoint with them meanwhile
+            _delete_unchanged_files(files)
+
+            connection.execute(
+                "DELETE FROM checkpoint_files WHERE source_hash = ? AND step_name = ? AND step_key = ?",
+                (checkpoint.source_hash, checkpoint.step_name, checkpoint.step_key))
+            connection.execute(
+                "DELETE FROM checkpoints WHERE source_hash = ? AND step_name = ? AND step_key = ?",
+                (checkpoint.source_hash, checkpoint.step_name, checkpoint.step_key))
+
+        return True
+
+    def evict_orphan_files(self) -> int:
+        """Delete the files of the checkpoints that have been removed. Return the bytes freed."""
+        with self._transaction() as connection:
+            files = connection.execute(
+                "SELECT f.path, f.mtime_ns, f.size_bytes FROM checkpoint_files f LEFT JOIN checkpoints c "
+                "ON f.source_hash = c.source_hash AND f.step_name = c.step_name AND f.step_key = c.step_key "
+                "WHERE c.source_hash IS NULL").fetchall()
+            _delete_unchanged_files((path, mtime_ns) for path, mtime_ns, _ in files)
+            connection.executemany("DELETE FROM checkpoint_files WHERE path = ?", ((path,) for path, _, _ in files))
+
+        return sum(size_bytes for _, _, size_bytes in files)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # A connection per operation keeps the manifest safe to use after forking worker processes
+        connection = sqlite3.connect(self.path, timeout=self._timeout, isolation_level=None)
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            yield connection
+        finally:
+            connection.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._connect() as connection:
+            # Take the write lock at the start of the transaction to avoid upgrade deadlocks
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+
+def _is_unchanged(path: str, size_bytes: int, mtime_ns: int) -> bool:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return False
+    return stat.st_size == size_bytes and stat.st_mtime_ns == mtime_ns
+
+
+def _delete_unchanged_files(files: Iterable[tuple[str, int]]) -> None:
+    for path, mtime_ns in files:
+        try:
+            if os.stat(path).st_mtime_ns == mtime_ns:
+                os.unlink(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,251 @@
+"""Command line interface of patee.
+
+    patee run pipeline.yml --manifest sources.jsonl --out path/to/dir --workers 8
+    patee gc path/to/dir --max-size 50G --max-age 30d
+
+`run` prints the progress to stderr and a JSON summary to stdout. It exits with 0 when no source failed, 1 when
+some source failed or was not valid, 2 when the batch could not start and 130 when interrupted.
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Iterator, TextIO, Union
+
+from . import checkpoint_cache
+from .corpus_writers import finalize_shards
+from .patee import Patee, RunResult, count_source_pages
+from .source_manifest import iter_source_records, count_source_records, parse_source
+from .input_types import MonolingualSingleFilePair, MultilingualSingleFile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROGRESS_INTERVAL_SECONDS = 10.0
+
+
+@dataclass
+class BatchSummary:
+    total: int
+    processed: int = 0
+    succeeded: int = 0
+    stopped: int = 0
+    failed: int = 0
+    invalid: int = 0
+    processed_pages: int = 0
+    elapsed_seconds: float = 0.0
+    interrupted: bool = False
+    failures: list[dict] = field(default_factory=list)
+
+    @property
+    def sources_per_second(self) -> float:
+        return self.processed / self.elapsed_seconds if self.elapsed_seconds > 0 else 0.0
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.processed_pages / self.elapsed_seconds if self.elapsed_seconds > 0 else 0.0
+
+    @property
+    def eta_seconds(self) -> Union[float, None]:
+        remaining = self.total - self.processed - self.invalid
+        if remaining <= 0:
+            return 0.0
+        return remaining / self.sources_per_second if self.processed > 0 else None
+
+    def add_result(self, line_number: int, result: RunResult, pages: int) -> None:
+        self.processed += 1
+        self.processed_pages += pages
+        if result.status == "succeeded":
+            self.succeeded += 1
+        elif result.status == "stopped":
+            self.stopped += 1
+        else:
+            self.failed += 1
+
+        if result.status != "succeeded":
+            self.failures.append({"line": line_number, "status": result.status, "reason": result.non_succeeded_reason})
+
+    def add_invalid(self, line_number: int, reason: str) -> None:
+        self.invalid += 1
+        self.failures.append({"line": line_number, "status": "invalid", "reason": reason})
+
+    def to_dict(self) -> dict:
+        values = asdict(self)
+        values["sources_per_second"] = self.sources_per_second
+        values["pages_per_second"] = self.pages_per_second
+        return values
+
+
+class ProgressReporter:
+    """Report the progress of a batch, refreshing a single line on terminals and a line per interval otherwise."""
+
+    def __init__(self, stream: TextIO, interval_seconds: float = DEFAULT_PROGRESS_INTERVAL_SECONDS):
+        self._stream = stream
+        self._interactive = stream.isatty()
+        self._interval_seconds = interval_seconds
+        self._last_report = float("-inf")
+
+    def update(self, summary: BatchSummary, force: bool = False) -> None:
+        now = time.monotonic()
+        if not self._interactive and not force and now - self._last_report < self._interval_seconds:
+            return
+        self._last_report = now
+
+        line = format_progress(summary)
+        if self._interactive:
+            self._stream.write(f"\r\033[K{line}")
+        else:
+            self._stream.write(f"{line}\n")
+        self._stream.flush()
+
+    def finish(self, summary: BatchSummary) -> None:
+        self.update(summary, force=True)
+        if self._interactive:
+            self._stream.write("\n")
+            self._stream.flush()
+
+
+def format_progress(summary: BatchSummary) -> str:
+    done = summary.processed + summary.invalid
+    percentage = 100.0 * done / summary.total if summary.total > 0 else 100.0
+    eta = summary.eta_seconds
+
+    line = (f"{done}/{summary.total} ({percentage:.1f}%) | {summary.sources_per_second:.2f} docs/s | "
+            f"{summary.pages_per_second:.2f} pages/s | ETA {_format_duration(eta) if eta is not None else '?'}")
+    if summary.failed or summary.invalid:
+        line += f" | {summary.failed + summary.invalid} failed"
+    return line
+
+
+def run_batch(pipeline: Patee, manifest_path: Path, out_dir: Path, workers: Union[int, None] = None,
+              resume: bool = False, progress: Union[ProgressReporter, None] = None) -> BatchSummary:
+    """Process the sources of a manifest while it is read, and finalize the shards written by the batch."""
+    summary = BatchSummary(total=count_source_records(manifest_path))
+    start = time.perf_counter()
+
+    # Line numbers of the sources, by position in the batch
+    line_numbers: list[int] = []
+    sources = _iter_valid_sources(manifest_path, summary, line_numbers)
+    try:
+        for idx, source, result in pipeline.iter_run_many(sources, out_dir, workers, resume):
+            summary.add_result(line_numbers[idx], result, count_source_pages(source))
+            summary.elapsed_seconds = time.perf_counter() - start
+            if progress is not None:
+                progress.update(summary)
+    except KeyboardInterrupt:
+        summary.interrupted = True
+    finally:
+        summary.elapsed_seconds = time.perf_counter() - start
+        _finalize_shards(pipeline)
+
+    if progress is not None:
+        progress.finish(summary)
+
+    return summary
+
+
+def _iter_valid_sources(manifest_path: Path, summary: BatchSummary, line_numbers: list[int],
+                        ) -> Iterator[Union[MonolingualSingleFilePair, MultilingualSingleFile]]:
+    base_dir = manifest_path.resolve().parent
+    for line_number, record in iter_source_records(manifest_path):
+        try:
+            source = parse_source(record, base_dir)
+        except ValueError as e:
+            logger.error("invalid source in line %s of %s: %s", line_number, manifest_path, e)
+            summary.add_invalid(line_number, str(e))
+            continue
+
+        line_numbers.append(line_number)
+        yield source
+
+
+def _finalize_shards(pipeline: Patee) -> None:
+    # Imported here, so the steps are only imported when used by the pipeline
+    from .steps.sharded_writer_step import ShardedWriterStep
+
+    # The workers close their steps when they exit, and the shards of the workers that crashed are finalized here
+    pipeline.close()
+    for step in pipeline.steps:
+        if isinstance(step, ShardedWriterStep):
+            finalize_shards(step.output_path)
+
+
+def _format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds + 0.5), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+def _parse_workers(workers: str) -> int:
+    try:
+        value = int(workers)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid number of workers: {workers}")
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"number of workers must be at least 1, got {value}")
+    return value
+
+
+def _add_run_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("pipeline", type=Path, help="pipeline configuration file")
+    parser.add_argument("--manifest", type=Path, required=True,
+                        help="JSON lines file with a source per line")
+    parser.add_argument("--out", type=Path, required=True, help="output directory, created if it does not exist")
+    parser.add_argument("--workers", type=_parse_workers, default=None,
+                        help="number of worker processes. Defaults to the number of CPUs")
+    parser.add_argument("--resume", action="store_true",
+                        help="reuse the results persisted by previous runs in the output directory")
+    parser.add_argument("--summary", type=Path, default=None, help="also write the JSON summary to this file")
+    parser.add_argument("--progress-interval", type=float, default=DEFAULT_PROGRESS_INTERVAL_SECONDS,
+                        help="seconds between progress lines when stderr is not a terminal")
+    parser.add_argument("--no-progress", action="store_true", help="do not report the progress")
+
+
+def _run_command(args: argparse.Namespace) -> int:
+    try:
+        if not args.manifest.is_file():
+            raise FileNotFoundError(f"manifest {args.manifest} does not exist")
+        pipeline = Patee.load_from(args.pipeline)
+        args.out.mkdir(parents=True, exist_ok=True)
+    except (OSError, ValueError) as e:
+        print(f"patee: {e}", file=sys.stderr)
+        return 2
+
+    progress = None if args.no_progress else ProgressReporter(sys.stderr, args.progress_interval)
+    summary = run_batch(pipeline, args.manifest, args.out, args.workers, args.resume, progress)
+
+    output = json.dumps(summary.to_dict(), ensure_ascii=False)
+    print(output)
+    if args.summary is not None:
+        args.summary.write_text(output + "\n", encoding="utf-8")
+
+    if summary.interrupted:
+        return 130
+    return 1 if summary.failed or summary.invalid else 0
+
+
+def main(argv: Union[list[str], None] = None) -> int:
+    parser = argparse.ArgumentParser(prog="patee", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log-level", default="WARNING", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="level of the logs written to stderr")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="process the sources of a manifest through a pipeline")
+    _add_run_arguments(run_parser)
+    run_parser.set_defaults(handler=_run_command)
+
+    gc_parser = commands.add_parser("gc", help="evict the checkpoints of an output directory beyond a budget")
+    checkpoint_cache.add_arguments(gc_parser)
+    gc_parser.set_defaults(handler=checkpoint_cache.run_from_arguments)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=args.log_level, stream=sys.stderr)
+
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
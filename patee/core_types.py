@@ -7,6 +7,9 @@ from typing import Union
 class PipelineContext:
     config_path: Path
     execution_path: Path
+    checkpoint_format: str = "text"
+    streaming: bool = False
+    streaming_window: int = 1024
 
 
 @dataclass
@@ -0,0 +1,411 @@
+import gzip
+import io
+import json
+import lzma
+import os
+import secrets
+import socket
+from abc import ABC, abstractmethod
+from pathlib import Path
+from dataclasses import dataclass, field
+from typing import BinaryIO, TextIO, Union, Iterable, Iterator
+from xml.sax.saxutils import escape, quoteattr
+
+from .step_types import DocumentSource, BlockPair
+
+
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+
+# Suffix added to the output files of each compression
+COMPRESSION_SUFFIXES: dict[Union[str, None], str] = {
+    None: "",
+    "gzip": ".gz",
+    "xz": ".xz",
+}
+
+
+def get_compression_suffix(compression: Union[str, None]) -> str:
+    suffix = COMPRESSION_SUFFIXES.get(compression)
+    if suffix is None:
+        supported = sorted(name for name in COMPRESSION_SUFFIXES if name is not None)
+        raise ValueError(f"Unsupported compression: {compression}. Supported compressions are {supported}.")
+    return suffix
+
+
+_TSV_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def open_output(file_path: Path, encoding: str = "utf-8", compression: Union[str, None] = None,
+                buffer_size: int = DEFAULT_BUFFER_SIZE, append: bool = False) -> TextIO:
+    """Open a text file to write with a write buffer of buffer_size bytes, compressed on the fly.
+
+    Compressed files are appended as new gzip members or xz streams, which readers decompress as a single file.
+    """
+    get_compression_suffix(compression)
+
+    mode = "ab" if append else "wb"
+    if compression is None:
+        binary: BinaryIO = file_path.open(mode, buffering=buffer_size)
+    elif compression == "gzip":
+        binary = io.BufferedWriter(gzip.GzipFile(file_path, mode), buffer_size)
+    else:
+        binary = io.BufferedWriter(lzma.LZMAFile(file_path, mode), buffer_size)
+
+    return io.TextIOWrapper(binary, encoding=encoding, newline="")
+
+
+class CorpusWriter(ABC):
+    """Base class for the writers of the pairs of text blocks of a corpus.
+
+    The files are written to temporary paths and moved into place when closed, so readers never see a partial file.
+    """
+
+    def __init__(self, file_paths: list[Path], encoding: str, compression: Union[str, None], buffer_size: int):
+        self.file_paths = file_paths
+        self._temp_paths = [file_path.with_name(f"{file_path.name}.{os.getpid()}.tmp") for file_path in file_paths]
+        self._files: list[TextIO] = []
+        try:
+            for temp_path in self._temp_paths:
+                self._files.append(open_output(temp_path, encoding, compression, buffer_size))
+        except BaseException:
+            self.abort()
+            raise
+
+    @abstractmethod
+    def write_pair(self, block_1: Union[str, None], block_2: Union[str, None]) -> None:
+        pass
+
+    def _write_footer(self) -> None:
+        pass
+
+    def close(self) -> None:
+        if not self._files or self._files[0].closed:
+            return
+
+        self._write_footer()
+        for file in self._files:
+            file.close()
+        for temp_path, file_path in zip(self._temp_paths, self.file_paths):
+            os.replace(temp_path, file_path)
+
+    def abort(self) -> None:
+        for file in self._files:
+            if not file.closed:
+                file.close()
+        for temp_path in self._temp_paths:
+            temp_path.unlink(missing_ok=True)
+
+    def __enter__(self) -> "CorpusWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class TextCorpusWriter(CorpusWriter):
+    """Write the text blocks of each document to its own file, joined by a separator."""
+
+    def __init__(self, file_path_1: Path, file_path_2: Path, blocks_separator: str = "\n", encoding: str = "utf-8",
+                 compression: Union[str, None] = None, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        super().__init__([file_path_1, file_path_2], encoding, compression, buffer_size)
+        self._blocks_separator = blocks_separator
+        self._is_first_block = [True, True]
+
+    def write_pair(self, block_1: Union[str, None], block_2: Union[str, None]) -> None:
+        for idx, block in enumerate((block_1, block_2)):
+            if block is None:
+                continue
+            if not self._is_first_block[idx]:
+                self._files[idx].write(self._blocks_separator)
+            self._files[idx].write(block)
+            self._is_first_block[idx] = False
+
+
+def format_tsv_pair(block_1: Union[str, None], block_2: Union[str, None]) -> str:
+    return f"{(block_1 or '').translate(_TSV_ESCAPES)}\t{(block_2 or '').translate(_TSV_ESCAPES)}\n"
+
+
+def format_jsonl_pair(iso2_language_1: str, iso2_language_2: str,
+                      block_1: Union[str, None], block_2: Union[str, None]) -> str:
+    return json.dumps({iso2_language_1: block_1 or "", iso2_language_2: block_2 or ""}, ensure_ascii=False) + "\n"
+
+
+def format_tmx_header(encoding: str, source_language: str) -> str:
+    return (
+        f'<?xml version="1.0" encoding={quoteattr(encoding)}?>\n'
+        '<tmx version="1.4">\n'
+        f'<header creationtool="patee" creationtoolversion="1" datatype="plaintext" segtype="block" '
+        f'adminlang="en" srclang={quoteattr(source_language)} o-tmf="patee"/>\n'
+        '<body>\n'
+    )
+
+
+def format_tmx_pair(iso2_language_1: str, iso2_language_2: str,
+                    block_1: Union[str, None], block_2: Union[str, None]) -> str:
+    return (
+        f'<tu><tuv xml:lang={quoteattr(iso2_language_1)}><seg>{escape(block_1 or "")}</seg></tuv>'
+        f'<tuv xml:lang={quoteattr(iso2_language_2)}><seg>{escape(block_2 or "")}</seg></tuv></tu>\n'
+    )
+
+
+TMX_FOOTER = "</body>\n</tmx>\n"
+
+
+class TsvCorpusWriter(CorpusWriter):
+    """Write a line per pair with both text blocks separated by a tab. Tabs and line breaks are escaped."""
+
+    def __init__(self, file_path: Path, encoding: str = "utf-8", compression: Union[str, None] = None,
+                 buffer_size: int = DEFAULT_BUFFER_SIZE):
+        super().__init__([file_path], encoding, compression, buffer_size)
+
+    def write_pair(self, block_1: Union[str, None], block_2: Union[str, None]) -> None:
+        self._files[0].write(format_tsv_pair(block_1, block_2))
+
+
+class JsonlCorpusWriter(CorpusWriter):
+    """Write a json object per line with the text blocks of each pair keyed by their language."""
+
+    def __init__(self, file_path: Path, iso2_language_1: str, iso2_language_2: str, encoding: str = "utf-8",
+                 compression: Union[str, None] = None, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        if iso2_language_1 == iso2_language_2:
+            raise ValueError(f"jsonl output needs documents of different languages, got {iso2_language_1} twice")
+        super().__init__([file_path], encoding, compression, buffer_size)
+        self._languages = (iso2_language_1, iso2_language_2)
+
+    def write_pair(self, block_1: Union[str, None], block_2: Union[str, None]) -> None:
+        self._files[0].write(format_jsonl_pair(*self._languages, block_1, block_2))
+
+
+class TmxCorpusWriter(CorpusWriter):
+    """Write a TMX 1.4 translation memory with a translation unit per pair."""
+
+    def __init__(self, file_path: Path, iso2_language_1: str, iso2_language_2: str, encoding: str = "utf-8",
+                 compression: Union[str, None] = None, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        super().__init__([file_path], encoding, compression, buffer_size)
+        self._languages = (iso2_language_1, iso2_language_2)
+        self._files[0].write(format_tmx_header(encoding, iso2_language_1))
+
+    def write_pair(self, block_1: Union[str, None], block_2: Union[str, None]) -> None:
+        self._files[0].write(format_tmx_pair(*self._languages, block_1, block_2))
+
+    def _write_footer(self) -> None:
+        self._files[0].write(TMX_FOOTER)
+
+
+# Suffix of the output files of each format
+CORPUS_FORMATS: dict[str, str] = {
+    "text": ".txt",
+    "tsv": ".tsv",
+    "jsonl": ".jsonl",
+    "tmx": ".tmx",
+}
+
+
+def open_corpus_writer(output_format: str, output_dir: Path, document_1: DocumentSource,
+                       document_2: DocumentSource, blocks_separator: str = "\n", encoding: str = "utf-8",
+                       compression: Union[str, None] = None, buffer_size: int = DEFAULT_BUFFER_SIZE) -> CorpusWriter:
+    """Open the writer of the pairs of text blocks of two documents in output_dir."""
+    suffix = CORPUS_FORMATS.get(output_format)
+    if suffix is None:
+        raise ValueError(f"Unsupported format: {output_format}. Supported formats are {sorted(CORPUS_FORMATS)}.")
+    suffix += get_compression_suffix(compression)
+
+    stem_1 = document_1.document_path.stem
+    stem_2 = document_2.document_path.stem
+    if output_format == "text":
+        if stem_1 == stem_2:
+            # Both languages of a multilingual file, so each one is written to a file named after its language
+            stem_1 = f"{stem_1}_{document_1.iso2_language}"
+            stem_2 = f"{stem_2}_{document_2.iso2_language}"
+        return TextCorpusWriter(output_dir / f"{stem_1}{suffix}", output_dir / f"{stem_2}{suffix}",
+                                blocks_separator, encoding, compression, buffer_size)
+
+    # Both documents are written to the same file, named after both of them
+    file_path = output_dir / (f"{stem_1}{suffix}" if stem_1 == stem_2 else f"{stem_1}-{stem_2}{suffix}")
+    if output_format == "tsv":
+        return TsvCorpusWriter(file_path, encoding, compression, buffer_size)
+    elif output_format == "jsonl":
+        return JsonlCorpusWriter(file_path, document_1.iso2_language, document_2.iso2_language,
+                                 encoding, compression, buffer_size)
+    else:
+        return TmxCorpusWriter(file_path, document_1.iso2_language, document_2.iso2_language,
+                               encoding, compression, buffer_size)
+
+
+DEFAULT_MAX_SHARD_BYTES = 256 * 1024 * 1024
+SHARD_INDEX_FILE_NAME = "shards.jsonl"
+SHARD_FORMATS = ("tsv", "jsonl", "tmx")
+
+# Suffix of the shards that are still being written
+_OPEN_SHARD_SUFFIX = ".open"
+
+
+class ShardedCorpusWriter:
+    """Append the pairs of text blocks of many documents to shard files of a bounded size.
+
+    Every writer appends to its own shards, named after a writer id unique across processes and hosts, so concurrent
+    writers never share a file. A shard is written with an .open suffix and renamed when it is finalized. The
+    documents and the finalized shards are recorded in the shards index, appended with a single write per record.
+    """
+
+    def __init__(self, output_dir: Path, output_format: str = "jsonl",
+                 max_shard_bytes: int = DEFAULT_MAX_SHARD_BYTES, encoding: str = "utf-8",
+                 compression: Union[str, None] = None, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        if output_format not in SHARD_FORMATS:
+            raise ValueError(f"Unsupported shard format: {output_format}. Supported formats are {list(SHARD_FORMATS)}.")
+        if max_shard_bytes < 1:
+            raise ValueError(f"max_shard_bytes must be a positive integer, got {max_shard_bytes}")
+
+        self.output_dir = output_dir
+        self.output_format = output_format
+        self.max_shard_bytes = max_shard_bytes
+        self.encoding = encoding
+        self.compression = compression
+        self.buffer_size = buffer_size
+        self.suffix = CORPUS_FORMATS[output_format] + get_compression_suffix(compression)
+
+        self.writer_id = f"{socket.gethostname()}-{os.getpid()}-{secrets.token_hex(4)}"
+        self._shard_number = 0
+        self._shard_path: Union[Path, None] = None
+
+    @property
+    def shard_path(self) -> Union[Path, None]:
+        """Return the final path of the shard being written, if any."""
+        return self._shard_path
+
+    def write_documents(self, source_id: str, document_1: DocumentSource, document_2: DocumentSource,
+                        blocks: Iterable[BlockPair]) -> Iterator[BlockPair]:
+        """Append the pairs of text blocks of two documents to the current shard while they pass through.
+
+        The pairs of a document that fails are removed from the shard. The shard is rotated after the document
+        when it reaches max_shard_bytes, so the pairs of a document are never split between shards.
+        """
+        if self._shard_path is None:
+            self._start_shard()
+
+        open_path = _get_open_path(self._shard_path)
+        start_size = open_path.stat().st_size
+        pairs = 0
+        try:
+            with open_output(open_path, self.encoding, self.compression, self.buffer_size, append=True) as file:
+                for block_1, block_2 in blocks:
+                    file.write(self._format_pair(document_1, document_2, block_1, block_2))
+                    pairs += 1
+                    yield block_1, block_2
+        except BaseException:
+            os.truncate(open_path, start_size)
+            raise
+
+        _append_index_record(self.output_dir, {
+            "shard": self._shard_path.name,
+            "source": source_id,
+            "document_1": str(document_1.document_path),
+            "document_2": str(document_2.document_path),
+            "pairs": pairs,
+        })
+
+        if open_path.stat().st_size >= self.max_shard_bytes:
+            self.close()
+
+    def close(self) -> None:
+        """Finalize the shard being written, if any."""
+        if self._shard_path is None:
+            return
+
+        finalize_shard(_get_open_path(self._shard_path))
+        self._shard_path = None
+
+    def _start_shard(self) -> None:
+        self._shard_number += 1
+        self._shard_path = self.output_dir / f"shard-{self.writer_id}-{self._shard_number:05d}{self.suffix}"
+
+        with open_output(_get_open_path(self._shard_path), self.encoding, self.compression, self.buffer_size) as file:
+            if self.output_format == "tmx":
+                # The shards mix documents of many languages
+                file.write(format_tmx_header(self.encoding, "*all*"))
+
+    def _format_pair(self, document_1: DocumentSource, document_2: DocumentSource,
+                     block_1: Union[str, None], block_2: Union[str, None]) -> str:
+        if self.output_format == "tsv":
+            return format_tsv_pair(block_1, block_2)
+        elif self.output_format == "jsonl":
+            return format_jsonl_pair(document_1.iso2_language, document_2.iso2_language, block_1, block_2)
+        else:
+            return format_tmx_pair(document_1.iso2_language, document_2.iso2_language, block_1, block_2)
+
+
+@dataclass
+class ShardInfo:
+    name: str
+    finalized: bool = False
+    size_bytes: int = 0
+    pairs: int = 0
+    sources: list[str] = field(default_factory=list)
+
+
+def read_shard_index(output_dir: Path) -> dict[str, ShardInfo]:
+    """Return the shards of the index of a directory by name, with the sources written to each of them."""
+    shards: dict[str, ShardInfo] = {}
+    index_path = output_dir / SHARD_INDEX_FILE_NAME
+    if not index_path.is_file():
+        return shards
+
+    with index_path.open("r", encoding="utf-8") as f:
+        for line in f:
+            # A record that is not complete was being written when the index was read
+            if not line.endswith("\n"):
+                break
+            record = json.loads(line)
+            shard = shards.setdefault(record["shard"], ShardInfo(record["shard"]))
+            if "source" in record:
+                shard.pairs += record["pairs"]
+                shard.sources.append(record["source"])
+            else:
+                shard.finalized = True
+                shard.size_bytes = record["size_bytes"]
+
+    return shards
+
+
+def finalize_shards(output_dir: Path) -> list[Path]:
+    """Finalize the shards left open by writers that were not closed. Return their final paths.
+
+    Must only be called when no writer is writing to the directory.
+    """
+    return [finalize_shard(open_path) for open_path in sorted(output_dir.glob(f"shard-*{_OPEN_SHARD_SUFFIX}"))]
+
+
+def finalize_shard(open_path: Path) -> Path:
+    """Finalize an open shard: close its format, move it to its final path and record it in the index."""
+    shard_path = open_path.with_name(open_path.name[:-len(_OPEN_SHARD_SUFFIX)])
+
+    suffixes = shard_path.suffixes
+    compression = next((name for name, suffix in COMPRESSION_SUFFIXES.items() if suffix and suffix == suffixes[-1]),
+                       None)
+    if (suffixes[-2] if compression else suffixes[-1]) == CORPUS_FORMATS["tmx"]:
+        with open_output(open_path, compression=compression, append=True) as file:
+            file.write(TMX_FOOTER)
+
+    os.replace(open_path, shard_path)
+    _append_index_record(shard_path.parent, {
+        "shard": shard_path.name,
+        "size_bytes": shard_path.stat().st_size,
+    })
+    return shard_path
+
+
+def _get_open_path(shard_path: Path) -> Path:
+    return shard_path.with_name(f"{shard_path.name}{_OPEN_SHARD_SUFFIX}")
+
+
+def _append_index_record(output_dir: Path, record: dict) -> None:
+    # A single write to a file opened in append mode, so the records of concurrent writers are never interleaved
+    data = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+    fd = os.open(output_dir / SHARD_INDEX_FILE_NAME, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
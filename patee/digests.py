@@ -0,0 +1,80 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Union
+
+from .input_types import PageInfo, MonolingualSingleFile, MonolingualSingleFilePair, MultilingualSingleFile
+
+
+DIGEST_SIZE = 16
+_READ_CHUNK_SIZE = 1024 * 1024
+
+# File digests memoized by (device, inode, size, mtime) so unchanged files are read only once per process
+_file_digests: dict[tuple[int, int, int, int], str] = {}
+
+
+def text_digest(text: str) -> str:
+    """Return a process stable digest of a text."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=DIGEST_SIZE).hexdigest()
+
+
+def file_digest(path: Path) -> str:
+    """Return a process stable digest of the content of a file."""
+    stat = os.stat(path)
+    key = (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    digest = _file_digests.get(key)
+    if digest is None:
+        hasher = hashlib.blake2b(digest_size=DIGEST_SIZE)
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(_READ_CHUNK_SIZE), b""):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()
+        _file_digests[key] = digest
+
+    return digest
+
+
+def config_digest(config: dict) -> str:
+    """Return a process stable digest of a step configuration."""
+    return text_digest(json.dumps(config, sort_keys=True, ensure_ascii=True))
+
+
+def source_digest(source: Union[MonolingualSingleFilePair, MultilingualSingleFile]) -> str:
+    """Return a process stable digest of a source based on the content of its files."""
+    if isinstance(source, MonolingualSingleFilePair):
+        description = {
+            "type": "monolingual_pair",
+            "document_1": _describe_monolingual_file(source.document_1),
+            "document_2": _describe_monolingual_file(source.document_2),
+            "shared_config": _describe_page_info(source.shared_config),
+        }
+    elif isinstance(source, MultilingualSingleFile):
+        description = {
+            "type": "multilingual",
+            "name": source.document_path.name,
+            "content": file_digest(source.document_path),
+            "iso2_languages": list(source.iso2_languages),
+            "page_info": _describe_page_info(source.page_info),
+        }
+    else:
+        raise ValueError(f"Unsupported source type: {type(source)}")
+
+    return config_digest(description)
+
+
+def _describe_monolingual_file(file: MonolingualSingleFile) -> dict:
+    # The file name is part of the description because step results are stored by file name
+    return {
+        "name": file.document_path.name,
+        "content": file_digest(file.document_path),
+        "iso2_language": file.iso2_language,
+        "page_info": _describe_page_info(file.page_info),
+    }
+
+
+def _describe_page_info(page_info: Union[PageInfo, None]) -> Union[list, None]:
+    if page_info is None:
+        return None
+    return [page_info.start_page, page_info.end_page, sorted(page_info.pages_to_exclude)]
@@ -1,25 +1,44 @@
-import json
+import asyncio
+import itertools
 import logging
-from dataclasses import dataclass
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, Executor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, replace
+from multiprocessing.util import Finalize
 from pathlib import Path
-from typing import Union, Iterable, cast, FrozenSet
+from typing import Union, Iterable, Iterator, cast, FrozenSet, Tuple
 
 import yaml
 
+from .checkpoint_formats import CHECKPOINT_FORMATS, TextCheckpointFormat
 from .core_types import PipelineContext, RunContext
-from .input_types import MonolingualSingleFilePair, MultilingualSingleFile
+from .digests import config_digest, source_digest
+from .input_types import MonolingualSingleFilePair, MultilingualSingleFile, PageInfo
 from .step_types import (
+    Step,
     ParallelExtractStep,
     ParallelProcessStep,
+    StreamingProcessStep,
     StepMetadata,
+    StepResult,
     DocumentPairContext,
 )
 from .steps_builder.default_steps_builder import StepsBuilder
-from .steps_executor import NonPersistentStepsExecutor, PersistentStepsExecutor
+from .steps_executor import (
+    StepsExecutor,
+    NonPersistentStepsExecutor,
+    PersistentStepsExecutor,
+    IntelligentPersistenceStepsExecutor,
+    StepMetrics,
+)
 from .steps_builder.default_steps_builder import DefaultStepsBuilder
 
 logger = logging.getLogger(__name__)
 
+_QUEUED_SOURCES_PER_WORKER = 4
+
 
 @dataclass(frozen=True)
 class RunResult:
@@ -27,6 +46,22 @@ class RunResult:
     executed_steps: FrozenSet[str]
     skipped_steps: FrozenSet[str]
     non_succeeded_reason: str = None
+    step_metrics: Tuple[StepMetrics, ...] = ()
+
+
+@dataclass(frozen=True)
+class BatchRunResult:
+    results: Tuple[RunResult, ...]
+    elapsed_seconds: float
+    processed_pages: int
+
+    @property
+    def sources_per_second(self) -> float:
+        return len(self.results) / self.elapsed_seconds if self.elapsed_seconds > 0 else 0.0
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.processed_pages / self.elapsed_seconds if self.elapsed_seconds > 0 else 0.0
 
 
 class Patee:
@@ -37,6 +72,11 @@ class Patee:
         self._steps_builder = steps_builder
         self._steps = []
 
+    @property
+    def steps(self) -> Iterable[Step]:
+        """Return the steps."""
+        return [step for step, _ in self._steps]
+
     @property
     def step_names(self) -> Iterable[str]:
         """Return the name of the steps."""
@@ -49,14 +89,28 @@ class Patee:
         if not config_path.exists():
             raise FileNotFoundError(f"Configuration file {config_path} does not exist.")
 
+        logger.debug("reading configuration file from %s ...", config_path)
+        config = yaml.safe_load(config_path.read_text(encoding="utf-8"))
+
+        checkpoint_format = config.get("checkpoint_format", TextCheckpointFormat.format_name())
+        if checkpoint_format not in CHECKPOINT_FORMATS:
+            raise ValueError(
+                f"Unsupported checkpoint format: {checkpoint_format}. "
+                f"Supported formats are {sorted(CHECKPOINT_FORMATS)}.")
+
+        streaming = bool(config.get("streaming", False))
+        streaming_window = config.get("streaming_window", 1024)
+        if not isinstance(streaming_window, int) or streaming_window < 1:
+            raise ValueError(f"streaming_window must be a positive integer, got {streaming_window}")
+
         pipeline_context = PipelineContext(
             config_path=config_path,
             execution_path=Path.cwd(),
+            checkpoint_format=checkpoint_format,
+            streaming=streaming,
+            streaming_window=streaming_window,
         )
 
-        logger.debug("reading configuration file from %s ...", config_path)
-        config = yaml.safe_load(config_path.read_text(encoding="utf-8"))
-
         if not steps_builder:
             logger.debug("no steps builder provided. Using default steps builder.")
             steps_builder = DefaultStepsBuilder()
@@ -91,7 +145,7 @@ class Patee:
                 type=step_type,
                 name=step_idx_name,
                 idx=step_idx,
-                config_hash=hash(json.dumps(step_config, sort_keys=True, ensure_ascii=True)),
+                config_hash=config_digest(step_config),
             )
             step_instance = instance._steps_builder.build(step_type, step_idx_name, pipeline_context, **step_config)
 
@@ -102,6 +156,8 @@ class Patee:
 
             step_idx += 1
 
+        instance._chain_step_keys()
+
         logger.info("pipeline created successfully. Found %s step(s).", len(unique_step_names))
 
         return instance
@@ -109,15 +165,179 @@ class Patee:
     def remove_step(self, step_name: str) -> None:
         """Remove a step from the pipeline by name."""
         self._steps = [(step, metadata) for step, metadata in self._steps if step.name != step_name]
+        self._chain_step_keys()
+
+    def close(self) -> None:
+        """Release the resources held by the steps. They are acquired again if the pipeline runs after closing it."""
+        for step in self.steps:
+            step.close()
+
+    def _chain_step_keys(self) -> None:
+        """Chain the key of every step to the keys of the steps before it, so a change in a step invalidates the
+        checkpoints of the steps after it and only them."""
+        upstream_key = ""
+        chained_steps = []
+        for step, metadata in self._steps:
+            metadata = replace(metadata, upstream_key=upstream_key)
+            upstream_key = metadata.digest()
+            chained_steps.append((step, metadata))
+
+        self._steps = chained_steps
 
     def run(self, source: Union[MonolingualSingleFilePair, MultilingualSingleFile],
-            out_dir: Union[Path, None] = None) -> RunResult:
+            out_dir: Union[Path, None] = None, resume: bool = False) -> RunResult:
         """Process source through the complete pipeline."""
+        executor, step_result, pending_steps, resumed_steps = self._start_run(source, out_dir, resume)
+
+        try:
+            for segment in self._split_in_segments(pending_steps):
+                step, metadata = segment[0]
+                if step_result is None:
+                    step_result = executor.execute_step(cast(ParallelExtractStep, step), metadata, source)
+                elif self._context.streaming and isinstance(step, StreamingProcessStep):
+                    step_result = executor.execute_streaming_steps(
+                        cast(list[tuple[StreamingProcessStep, StepMetadata]], segment), step_result.context)
+                else:
+                    step_result = executor.execute_step(cast(ParallelProcessStep, step), metadata, step_result.context)
+
+                if step_result.should_stop_pipeline:
+                    logger.warning("pipeline stopped at step %s with name %s.", metadata.type, metadata.name)
+                    break
+        finally:
+            executor.close()
+
+        return self._create_run_result(executor, step_result, resumed_steps)
+
+    async def arun(self, source: Union[MonolingualSingleFilePair, MultilingualSingleFile],
+                   out_dir: Union[Path, None] = None, resume: bool = False,
+                   blocking_executor: Union[Executor, None] = None) -> RunResult:
+        """Process source through the complete pipeline without blocking the event loop.
+
+        Async steps are awaited in the event loop. Sync steps and checkpoints run in blocking_executor, the
+        default executor of the loop when not provided.
+        """
+        loop = asyncio.get_running_loop()
+
+        executor, step_result, pending_steps, resumed_steps = await loop.run_in_executor(
+            blocking_executor, self._start_run, source, out_dir, resume)
+
+        try:
+            for segment in self._split_in_segments(pending_steps):
+                step, metadata = segment[0]
+                if step_result is None:
+                    step_result = await executor.aexecute_step(
+                        cast(ParallelExtractStep, step), metadata, source, blocking_executor)
+                elif self._context.streaming and isinstance(step, StreamingProcessStep):
+                    step_result = await loop.run_in_executor(
+                        blocking_executor, executor.execute_streaming_steps,
+                        cast(list[tuple[StreamingProcessStep, StepMetadata]], segment), step_result.context)
+                else:
+                    step_result = await executor.aexecute_step(
+                        cast(ParallelProcessStep, step), metadata, step_result.context, blocking_executor)
+
+                if step_result.should_stop_pipeline:
+                    logger.warning("pipeline stopped at step %s with name %s.", metadata.type, metadata.name)
+                    break
+        finally:
+            await loop.run_in_executor(blocking_executor, executor.close)
+
+        return self._create_run_result(executor, step_result, resumed_steps)
+
+    def run_many(self, sources: Iterable[Union[MonolingualSingleFilePair, MultilingualSingleFile]],
+                 out_dir: Union[Path, None] = None, workers: Union[int, None] = None,
+                 resume: bool = False) -> BatchRunResult:
+        """Process many sources through the pipeline using a pool of worker processes."""
+
+        sources = list(sources)
+        logger.info("start processing %s source(s) ...", len(sources))
+
+        if len(sources) <= 1 and (workers is None or workers >= 1):
+            # Starting a pool of workers is slower than running a single source
+            workers = 1
+
+        start = time.perf_counter()
+        results: list[Union[RunResult, None]] = [None] * len(sources)
+        for idx, _, result in self.iter_run_many(sources, out_dir, workers, resume):
+            results[idx] = result
+        elapsed_seconds = time.perf_counter() - start
+
+        batch_result = BatchRunResult(
+            results=tuple(results),
+            elapsed_seconds=elapsed_seconds,
+            processed_pages=sum(count_source_pages(source) for source in sources),
+        )
+
+        logger.info(
+            "%s source(s) processed in %.2f seconds (%.2f sources/s, %.2f pages/s).",
+            len(batch_result.results), elapsed_seconds,
+            batch_result.sources_per_second, batch_result.pages_per_second)
+
+        return batch_result
+
+    def iter_run_many(self, sources: Iterable[Union[MonolingualSingleFilePair, MultilingualSingleFile]],
+                      out_dir: Union[Path, None] = None, workers: Union[int, None] = None,
+                      resume: bool = False,
+                      ) -> Iterator[tuple[int, Union[MonolingualSingleFilePair, MultilingualSingleFile], RunResult]]:
+        """Process many sources using a pool of worker processes. Yield the position of every source, the source
+        and its result as soon as it finishes.
+
+        The sources are consumed while the runs finish, so they can be read from a stream of any size.
+        """
+
+        self._validate_steps_for_process()
+
+        if out_dir is not None and not out_dir.exists():
+            raise FileNotFoundError(f"Output directory {out_dir} does not exist.")
+
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers < 1:
+            raise ValueError(f"workers must be at least 1, got {workers}")
+
+        logger.info("start processing sources with %s worker(s) ...", workers)
+
+        indexed_sources = enumerate(sources)
+        try:
+            if workers == 1:
+                for idx, source in indexed_sources:
+                    yield idx, source, _run_guarded(self, source, out_dir, resume)
+                return
+
+            # Every worker builds the steps from the configuration file only once
+            with ProcessPoolExecutor(
+                    max_workers=workers,
+                    initializer=_initialize_worker,
+                    initargs=(self._context.config_path, self._steps_builder, self.step_names),
+            ) as pool:
+                # A few sources per worker are queued, so the workers never wait and the sources are not read ahead
+                pending = {}
+                for idx, source in itertools.islice(indexed_sources, workers * _QUEUED_SOURCES_PER_WORKER):
+                    pending[pool.submit(_run_in_worker, source, out_dir, resume)] = idx, source
+
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        idx, source = pending.pop(future)
+                        yield idx, source, future.result()
+
+                    for idx, source in itertools.islice(indexed_sources, len(done)):
+                        pending[pool.submit(_run_in_worker, source, out_dir, resume)] = idx, source
+        finally:
+            self.close()
+
+    def _start_run(self, source: Union[MonolingualSingleFilePair, MultilingualSingleFile],
+                   out_dir: Union[Path, None], resume: bool,
+                   ) -> (StepsExecutor, Union[StepResult, None], list[tuple[Step, StepMetadata]], FrozenSet[str]):
+        """Create the executor of a run and load the last checkpoint when resuming. Return the executor, the
+        result to start from, the steps pending to execute and the resumed steps."""
 
         # Validate state of the pipeline is correct to start processing the source
         self._validate_steps_for_process()
 
-        source_hash = str(hash(source))
+        if resume and out_dir is None:
+            raise ValueError("An output directory is required to resume the pipeline.")
+
+        source_hash = source_digest(source)
 
         run_context = RunContext(
             source_hash=source_hash,
@@ -134,28 +354,72 @@ class Patee:
             if not out_dir.exists():
                 raise FileNotFoundError(f"Output directory {out_dir} does not exist.")
 
-            logger.debug(" output directory provided: %s. Creating a PersistentStepsExecutor steps executor.", out_dir)
-            executor = PersistentStepsExecutor(self._context, run_context)
-
-
-        extract_step, extract_metadata = self._steps[0]
-        extract_result = executor.execute_step(cast(ParallelExtractStep ,extract_step), extract_metadata, source)
-
-        step_result = extract_result
-        for step, metadata in self._steps[1:]:
-            step_result = executor.execute_step(cast(ParallelProcessStep ,step), metadata, step_result.context)
-
-            if step_result.should_stop_pipeline:
-                logger.warning("pipeline stopped at step %s with name %s.", metadata.type, metadata.name)
-                break
-
+            if resume:
+                logger.debug(
+                    " output directory provided: %s. Creating a IntelligentPersistenceStepsExecutor steps executor.",
+                    out_dir)
+                executor = IntelligentPersistenceStepsExecutor(self._context, run_context)
+            else:
+                logger.debug(
+                    " output directory provided: %s. Creating a PersistentStepsExecutor steps executor.", out_dir)
+                executor = PersistentStepsExecutor(self._context, run_context)
+
+        step_result = None
+        pending_steps = self._steps
+        resumed_steps = frozenset()
+
+        if resume:
+            try:
+                checkpoint_idx = self._find_last_checkpoint(cast(IntelligentPersistenceStepsExecutor, executor))
+                if checkpoint_idx is not None:
+                    checkpoint_step, checkpoint_metadata = self._steps[checkpoint_idx]
+                    logger.info("resuming pipeline from step %s with name %s.",
+                                checkpoint_metadata.type, checkpoint_metadata.name)
+
+                    step_result = cast(IntelligentPersistenceStepsExecutor, executor).load_checkpoint(
+                        checkpoint_step, checkpoint_metadata, source)
+                    pending_steps = self._steps[checkpoint_idx + 1:]
+                    resumed_steps = frozenset(step.name for step, _ in self._steps[:checkpoint_idx])
+            except BaseException:
+                executor.close()
+                raise
+
+        return executor, step_result, pending_steps, resumed_steps
+
+    @staticmethod
+    def _create_run_result(executor: StepsExecutor, step_result: StepResult,
+                           resumed_steps: FrozenSet[str]) -> RunResult:
         return RunResult(
             status="stopped" if step_result.should_stop_pipeline else "succeeded",
             non_succeeded_reason="Pipeline stopped by human in the loop step" if step_result.should_stop_pipeline else None,
-            executed_steps=frozenset(),
-            skipped_steps=frozenset(),
+            executed_steps=frozenset(metrics.name for metrics in executor.step_metrics if not metrics.skipped),
+            skipped_steps=resumed_steps.union(
+                metrics.name for metrics in executor.step_metrics if metrics.skipped),
+            step_metrics=tuple(executor.step_metrics),
         )
 
+    def _split_in_segments(self, steps: list[tuple[Step, StepMetadata]]) -> list[list[tuple[Step, StepMetadata]]]:
+        """Split the steps in segments executed together. In streaming mode, consecutive streaming steps are
+        executed as a single stream."""
+        segments = []
+        for step, metadata in steps:
+            if (self._context.streaming and isinstance(step, StreamingProcessStep)
+                    and segments and isinstance(segments[-1][-1][0], StreamingProcessStep)):
+                segments[-1].append((step, metadata))
+            else:
+                segments.append([(step, metadata)])
+
+        return segments
+
+    def _find_last_checkpoint(self, executor: IntelligentPersistenceStepsExecutor) -> Union[int, None]:
+        """Find the index of the last step with a persisted result, working backwards from the last step."""
+        for step_idx in range(len(self._steps) - 1, -1, -1):
+            step, metadata = self._steps[step_idx]
+            if executor.has_checkpoint(step, metadata):
+                return step_idx
+
+        return None
+
     def _validate_steps_for_process(self):
         """Validate the steps in the pipeline."""
         if not self._steps:
@@ -172,6 +436,76 @@ class Patee:
                 raise ValueError(f"All steps must be instances of ParallelTextStep, got {type(step)} instead.")
 
 
+_worker_pipeline: Union[Patee, None] = None
+
+
+def _initialize_worker(config_path: Path, steps_builder: StepsBuilder, step_names: list[str]) -> None:
+    global _worker_pipeline
+
+    pipeline = Patee.load_from(config_path, steps_builder)
+    for step_name in list(pipeline.step_names):
+        if step_name not in step_names:
+            pipeline.remove_step(step_name)
+
+    # Also run when the worker exits, unlike atexit handlers
+    Finalize(pipeline, pipeline.close, exitpriority=10)
+    _worker_pipeline = pipeline
+
 
+def _run_in_worker(source: Union[MonolingualSingleFilePair, MultilingualSingleFile],
+                   out_dir: Union[Path, None], resume: bool) -> RunResult:
+    return _run_guarded(_worker_pipeline, source, out_dir, resume)
+
+
+def _run_guarded(pipeline: Patee, source: Union[MonolingualSingleFilePair, MultilingualSingleFile],
+                 out_dir: Union[Path, None], resume: bool) -> RunResult:
+    try:
+        return pipeline.run(source, out_dir, resume)
+    except Exception as e:
+        logger.exception("failed processing source %s.", source)
+        return RunResult(
+            status="failed",
+            non_succeeded_reason=f"{type(e).__name__}: {e}",
+            executed_steps=frozenset(),
+            skipped_steps=frozenset(),
+        )
 
 
+def count_source_pages(source: Union[MonolingualSingleFilePair, MultilingualSingleFile]) -> int:
+    """Count the pages requested by the source. Open ended page ranges of PDF documents are counted up to their last
+    page, and documents in other formats without an explicit page range have no pages."""
+    if isinstance(source, MonolingualSingleFilePair):
+        return (_count_document_pages(source.document_1.document_path,
+                                      source.shared_config or source.document_1.page_info)
+                + _count_document_pages(source.document_2.document_path,
+                                        source.shared_config or source.document_2.page_info))
+    elif isinstance(source, MultilingualSingleFile):
+        return _count_document_pages(source.document_path, source.page_info)
+    else:
+        return 0
+
+
+def _count_document_pages(document_path: Path, page_info: Union[PageInfo, None]) -> int:
+    if page_info is None:
+        page_info = PageInfo()
+
+    end_page = page_info.end_page
+    if end_page == sys.maxsize:
+        if document_path.suffix.lower() != ".pdf":
+            return 0
+        end_page = _count_pdf_pages(document_path)
+
+    excluded_pages = sum(1 for page in page_info.pages_to_exclude if page <= end_page)
+    return max(end_page - page_info.start_page + 1 - excluded_pages, 0)
+
+
+def _count_pdf_pages(document_path: Path) -> int:
+    # Imported here, so pypdfium2 is only loaded when counting the pages of PDF documents
+    import pypdfium2
+    from .pdf_pages import count_pdf_pages
+
+    try:
+        return count_pdf_pages(document_path)
+    except (OSError, pypdfium2.PdfiumError) as e:
+        logger.debug("pages of %s not counted: %s", document_path, e)
+        return 0
@@ -0,0 +1,12 @@
+from pathlib import Path
+
+import pypdfium2
+
+
+def count_pdf_pages(document_path: Path) -> int:
+    """Count the pages of a PDF document. Raise OSError or pypdfium2.PdfiumError if it cannot be read."""
+    pdf = pypdfium2.PdfDocument(document_path)
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
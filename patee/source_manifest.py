@@ -0,0 +1,84 @@
+"""Sources of a batch run, one JSON object per line.
+
+A pair of monolingual files:
+
+    {"document_1": {"document_path": "es.pdf", "iso2_language": "es"},
+     "document_2": {"document_path": "ca.pdf", "iso2_language": "ca"},
+     "shared_config": {"start_page": 4, "end_page": 5}}
+
+A multilingual file:
+
+    {"document_path": "sentences.tsv", "iso2_languages": ["es", "ca"]}
+
+Relative document paths are relative to the directory of the manifest.
+"""
+import json
+from pathlib import Path
+from typing import Iterator, Union
+
+from .input_types import PageInfo, MonolingualSingleFile, MonolingualSingleFilePair, MultilingualSingleFile
+
+
+def iter_source_records(manifest_path: Path) -> Iterator[tuple[int, str]]:
+    """Yield the number and the content of the lines of a manifest with a source."""
+    with manifest_path.open("r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if line.strip():
+                yield line_number, line
+
+
+def count_source_records(manifest_path: Path) -> int:
+    """Count the sources of a manifest without parsing them."""
+    return sum(1 for _ in iter_source_records(manifest_path))
+
+
+def parse_source(record: str, base_dir: Path) -> Union[MonolingualSingleFilePair, MultilingualSingleFile]:
+    """Create the source described by a line of a manifest. Raise ValueError if it is not valid."""
+    try:
+        values = json.loads(record)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"invalid JSON: {e}") from e
+
+    if not isinstance(values, dict):
+        raise ValueError("a source must be a JSON object")
+
+    try:
+        if "document_1" in values or "document_2" in values:
+            return MonolingualSingleFilePair(
+                document_1=_parse_monolingual_file(values["document_1"], base_dir),
+                document_2=_parse_monolingual_file(values["document_2"], base_dir),
+                shared_config=_parse_page_info(values.get("shared_config")),
+            )
+
+        return MultilingualSingleFile(
+            document_path=_resolve_path(values["document_path"], base_dir),
+            iso2_languages=values["iso2_languages"],
+            page_info=_parse_page_info(values.get("page_info")),
+        )
+    except KeyError as e:
+        raise ValueError(f"missing field {e}") from e
+    except TypeError as e:
+        raise ValueError(str(e)) from e
+
+
+def _parse_monolingual_file(values: dict, base_dir: Path) -> MonolingualSingleFile:
+    return MonolingualSingleFile(
+        document_path=_resolve_path(values["document_path"], base_dir),
+        iso2_language=values["iso2_language"],
+        page_info=_parse_page_info(values.get("page_info")),
+    )
+
+
+def _parse_page_info(values: Union[dict, None]) -> Union[PageInfo, None]:
+    if values is None:
+        return None
+
+    values = dict(values)
+    if "pages_to_exclude" in values:
+        values["pages_to_exclude"] = set(values["pages_to_exclude"])
+    return PageInfo(**values)
+
+
+def _resolve_path(document_path: str, base_dir: Path) -> Path:
+    path = Path(document_path)
+    return path if path.is_absolute() else base_dir / path
@@ -1,15 +1,22 @@
+import asyncio
 import json
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from itertools import zip_longest, islice
 from pathlib import Path
-from typing import Union
+from typing import Union, Sequence, Iterable, Iterator
 
 from .core_types import StepContext, PipelineContext
+from .digests import text_digest
 from .input_types import MonolingualSingleFile, MultilingualSingleFile, MonolingualSingleFilePair
 
 
 TEXT_BLOCK_SEPARATOR = "\n\n---- patee_block_separator ------------------------------- \n\n"
 
+# Pair of text blocks at the same position of each document. A side is None when its document has fewer blocks
+BlockPair = tuple[Union[str, None], Union[str, None]]
+
 
 @dataclass(frozen=True)
 class DocumentSource:
@@ -31,16 +38,19 @@ class DocumentSource:
 @dataclass(frozen=True)
 class DocumentContext:
     source: DocumentSource
-    text_blocks: list[str]
+    text_blocks: Sequence[str]
     extra: dict
 
     def dump_to(self, result_dir: Path):
         file_path = result_dir / f"{self.source.document_path.stem}.txt"
         file_path.write_text(TEXT_BLOCK_SEPARATOR.join(self.text_blocks))
 
+        # The extra file of a previous dump without extra is removed, so it is not loaded with this one
+        extra_path = result_dir / f"{self.source.document_path.stem}_extra.json"
         if len(self.extra) > 0:
-            extra_path = result_dir / f"{self.source.document_path.stem}_extra.json"
             extra_path.write_text(json.dumps(self.extra, ensure_ascii=False, indent=2), encoding="utf-8")
+        else:
+            extra_path.unlink(missing_ok=True)
 
     @staticmethod
     def load_from(original_source: "DocumentSource", current_dir: Path) -> "DocumentContext":
@@ -48,7 +58,9 @@ class DocumentContext:
             raise ValueError(f"out_dit path {current_dir} is not a directory")
 
         text = (current_dir / f"{original_source.document_path.stem}.txt").read_text()
-        extra = {}
+
+        extra_path = current_dir / f"{original_source.document_path.stem}_extra.json"
+        extra = json.loads(extra_path.read_text(encoding="utf-8")) if extra_path.exists() else {}
 
         return DocumentContext(original_source, text.split(TEXT_BLOCK_SEPARATOR), extra)
 
@@ -75,6 +87,25 @@ class DocumentPairContext:
 
         return DocumentPairContext(document_1, document_2)
 
+    def iter_block_pairs(self) -> Iterator[BlockPair]:
+        return zip_longest(self.document_1.text_blocks, self.document_2.text_blocks)
+
+    @staticmethod
+    def from_block_pairs(document_1_source: DocumentSource, document_2_source: DocumentSource,
+                         blocks: Iterable[BlockPair]) -> "DocumentPairContext":
+        document_1_blocks = []
+        document_2_blocks = []
+        for block_1, block_2 in blocks:
+            if block_1 is not None:
+                document_1_blocks.append(block_1)
+            if block_2 is not None:
+                document_2_blocks.append(block_2)
+
+        return DocumentPairContext(
+            document_1=DocumentContext(document_1_source, document_1_blocks, {}),
+            document_2=DocumentContext(document_2_source, document_2_blocks, {}),
+        )
+
 
 @dataclass(frozen=True)
 class StepResult:
@@ -97,6 +128,10 @@ class Step(ABC):
         self.name = name
         self._pipeline_context = pipeline_context
 
+    def close(self) -> None:
+        """Release the resources held by the step, like pools of worker processes. The step can still be used."""
+        pass
+
 
 class ParallelExtractStep(Step):
     """Base class for all extraction steps."""
@@ -121,15 +156,99 @@ class ParallelProcessStep(Step):
                 source: DocumentPairContext) -> StepResult:
         pass
 
+
+class AsyncParallelExtractStep(ParallelExtractStep):
+    """Base class for extraction steps that await I/O natively when the pipeline runs in an event loop."""
+
+    def __init__(self, name: str, pipeline_context: PipelineContext):
+        super().__init__(name, pipeline_context)
+
+    @abstractmethod
+    async def aextract(self, context: StepContext,
+                       source: Union[MonolingualSingleFilePair, MultilingualSingleFile]) -> StepResult:
+        pass
+
+    def extract(self, context: StepContext,
+                source: Union[MonolingualSingleFilePair, MultilingualSingleFile]) -> StepResult:
+        return _run_coroutine(self.aextract(context, source))
+
+
+class AsyncParallelProcessStep(ParallelProcessStep):
+    """Base class for processing steps that await I/O natively when the pipeline runs in an event loop."""
+
+    def __init__(self, name: str, pipeline_context: PipelineContext):
+        super().__init__(name, pipeline_context)
+
+    @abstractmethod
+    async def aprocess(self, context: StepContext, source: DocumentPairContext) -> StepResult:
+        pass
+
+    def process(self, context: StepContext, source: DocumentPairContext) -> StepResult:
+        return _run_coroutine(self.aprocess(context, source))
+
+
+def _run_coroutine(coroutine):
+    """Run a coroutine to completion from sync code, also when called from a running event loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+
+    # asyncio.run cannot be called from a running event loop, so the coroutine runs in a new one in another thread
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
+
+class StreamingProcessStep(ParallelProcessStep):
+    """Base class for processing steps that can transform the pairs of text blocks as a stream."""
+
+    def __init__(self, name: str, pipeline_context: PipelineContext):
+        super().__init__(name, pipeline_context)
+
+    @abstractmethod
+    def process_blocks(self, context: StepContext, document_1: DocumentSource, document_2: DocumentSource,
+                       blocks: Iterator[BlockPair]) -> Iterator[BlockPair]:
+        pass
+
+    def process(self, context: StepContext, source: DocumentPairContext) -> StepResult:
+        document_1 = source.document_1.source
+        document_2 = source.document_2.source
+        blocks = self.process_blocks(context, document_1, document_2, source.iter_block_pairs())
+
+        return StepResult(
+            context=DocumentPairContext.from_block_pairs(document_1, document_2, blocks),
+        )
+
+
+def iter_windows(blocks: Iterable[BlockPair], window_size: int) -> Iterator[list[BlockPair]]:
+    """Group the pairs of text blocks in lists of at most window_size pairs."""
+    iterator = iter(blocks)
+    while True:
+        window = list(islice(iterator, window_size))
+        if not window:
+            return
+        yield window
+
+
 @dataclass(frozen=True)
 class StepMetadata:
     name: str
     type: str
     idx: int
-    config_hash: int
+    config_hash: str
+    # Digest of the metadata of the previous step of the pipeline, which chains the digests of all the previous steps
+    upstream_key: str = ""
 
     def __key(self):
-        return self.name, self.type, self.idx, self.config_hash
+        return self.name, self.type, self.idx, self.config_hash, self.upstream_key
+
+    def digest(self) -> str:
+        """Return a process stable digest of the step metadata and the metadata of the steps before it."""
+        digest = f"{self.name}|{self.type}|{self.idx}|{self.config_hash}"
+        # The first step keeps the digest it had before the steps were chained, so its checkpoints are still valid
+        if self.upstream_key:
+            digest = f"{self.upstream_key}|{digest}"
+        return text_digest(digest)
 
     def __hash__(self):
         return hash(self.__key())
@@ -1,12 +1,41 @@
-from .text_extractor_step import  TextReaderExtractor
-from .docling_extractor_step import DoclingExtractor
-from .noop_processor_step import NoopProcessorStep
-from .human_in_the_loop_processor_step import HumanInTheLoopProcessorStep
+import importlib
+
+# The steps are imported on first access, so importing a step module does not import the dependencies of the others
+_STEP_MODULES = {
+    "TextReaderExtractor": ".text_extractor_step",
+    "DoclingExtractor": ".docling_extractor_step",
+    "CsvExtractor": ".csv_extractor_step",
+    "NoopProcessorStep": ".noop_processor_step",
+    "HumanInTheLoopProcessorStep": ".human_in_the_loop_processor_step",
+    "SentenceSegmenterStep": ".sentence_segmenter_step",
+    "GaleChurchAlignerStep": ".gale_church_aligner_step",
+    "MinHashDeduplicatorStep": ".minhash_deduplicator_step",
+    "TextWriterProcessorStep": ".text_writer_processor_step",
+    "ShardedWriterStep": ".sharded_writer_step",
+}
+
+
+def __getattr__(name: str):
+    module_name = _STEP_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    return getattr(importlib.import_module(module_name, __name__), name)
+
+
+def __dir__() -> list[str]:
+    return sorted(list(globals()) + __all__)
 
 
 __all__ = [
     "TextReaderExtractor",
     "DoclingExtractor",
+    "CsvExtractor",
     "NoopProcessorStep",
-    "HumanInTheLoopProcessorStep"
-]
\ No newline at end of file
+    "HumanInTheLoopProcessorStep",
+    "SentenceSegmenterStep",
+    "GaleChurchAlignerStep",
+    "MinHashDeduplicatorStep",
+    "TextWriterProcessorStep",
+    "ShardedWriterStep",
+]
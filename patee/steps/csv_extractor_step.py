@@ -1,5 +1,5 @@
 import logging
-from typing import Union
+from typing import Union, Iterable
 
 import pandas as pd
 
@@ -18,10 +18,39 @@ from patee.step_types import (
 logger = logging.getLogger(__name__)
 
 
+TAB_SEPARATED_SUFFIXES = {".tsv", ".tab"}
+
+
 class CsvExtractor(ParallelExtractStep):
     def __init__(self, name: str, pipeline_context: PipelineContext, **kwargs):
         super().__init__(name, pipeline_context)
 
+        # Inferred from the file suffix when not provided
+        self.delimiter = kwargs.get("delimiter", None)
+
+        self.header = bool(kwargs.get("header", True))
+
+        # Column names (or positions without header) of the first and second language.
+        # When not provided, the columns named as the languages codes or the first two columns are used
+        columns = kwargs.get("columns", None)
+        if columns is not None:
+            if isinstance(columns, str) or not isinstance(columns, Iterable) or len(list(columns)) != 2:
+                raise ValueError(f"columns must contain exactly two column names, got {columns}")
+            self.columns = list(columns)
+            if self.header and any(isinstance(column, int) for column in self.columns):
+                raise ValueError(f"columns must be column names when the file has a header, got {columns}")
+        else:
+            self.columns = None
+
+        # Rows read at a time, so only a chunk of the file is held in a DataFrame. Read at once when not provided
+        self.chunksize = kwargs.get("chunksize", None)
+        if self.chunksize is not None and (not isinstance(self.chunksize, int) or self.chunksize < 1):
+            raise ValueError(f"chunksize must be a positive integer, got {self.chunksize}")
+
+        self.encoding = kwargs.get("encoding", None)
+        if self.encoding is None:
+            self.encoding = "utf-8"
+
     @staticmethod
     def step_type() -> str:
         return "csv_extractor"
@@ -39,14 +68,31 @@ class CsvExtractor(ParallelExtractStep):
         raise NotImplementedError("Multi file extraction is not implemented yet.")
 
     def _extract_single_file(self, source: MultilingualSingleFile) -> StepResult:
-        df = pd.read_csv(source.document_path)
+        delimiter = self._get_delimiter(source)
+        language_1_column, language_2_column = self._get_columns(source, delimiter)
 
-        language_1_blocks = []
-        language_2_blocks = []
+        logger.debug("reading columns %s and %s from %s ...", language_1_column, language_2_column, source.document_path)
 
-        for index, row in df.iterrows():
-            language_1_blocks.append(row[0])
-            language_2_blocks.append(row[1])
+        read_options = dict(
+            sep=delimiter,
+            header=0 if self.header else None,
+            usecols=[language_1_column, language_2_column],
+            dtype=str,
+            keep_default_na=False,
+            encoding=self.encoding,
+        )
+
+        if self.chunksize is None:
+            df = pd.read_csv(source.document_path, **read_options)
+            language_1_blocks = df[language_1_column].tolist()
+            language_2_blocks = df[language_2_column].tolist()
+        else:
+            language_1_blocks = []
+            language_2_blocks = []
+            with pd.read_csv(source.document_path, chunksize=self.chunksize, **read_options) as reader:
+                for chunk in reader:
+                    language_1_blocks.extend(chunk[language_1_column].tolist())
+                    language_2_blocks.extend(chunk[language_2_column].tolist())
 
         context = DocumentPairContext(
             document_1=DocumentContext(
@@ -64,6 +110,30 @@ class CsvExtractor(ParallelExtractStep):
             context=context,
         )
 
-        logger.debug("monolingual single file pairs read successfully.")
+        logger.debug("multilingual single file read successfully.")
+
+        return result
+
+    def _get_delimiter(self, source: MultilingualSingleFile) -> str:
+        if self.delimiter is not None:
+            return self.delimiter
+
+        return "\t" if source.document_path.suffix.lower() in TAB_SEPARATED_SUFFIXES else ","
+
+    def _get_columns(self, source: MultilingualSingleFile, delimiter: str) -> (Union[str, int], Union[str, int]):
+        if self.columns is not None:
+            return self.columns[0], self.columns[1]
+
+        if not self.header:
+            return 0, 1
+
+        header_columns = pd.read_csv(
+            source.document_path, sep=delimiter, nrows=0, encoding=self.encoding).columns.tolist()
+
+        if all(language in header_columns for language in source.iso2_languages):
+            return source.iso2_languages[0], source.iso2_languages[1]
+
+        if len(header_columns) < 2:
+            raise ValueError(f"{source.document_path} must contain at least two columns")
 
-        return result
\ No newline at end of file
+        return header_columns[0], header_columns[1]
\ No newline at end of file
@@ -1,6 +1,11 @@
+import json
 import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, Future
 from dataclasses import dataclass
-from typing import Union, Iterable
+from pathlib import Path
+from typing import Union, Iterable, Optional, Callable
 
 from docling.backend.pypdfium2_backend import PyPdfiumDocumentBackend
 from docling.datamodel.base_models import InputFormat, ConversionStatus
@@ -10,12 +15,14 @@ from docling.document_converter import DocumentConverter, PdfFormatOption
 from docling_core.types.doc import NodeItem, DocItemLabel
 
 from patee.core_types import PipelineContext
+from patee.digests import config_digest, file_digest
 from patee.input_types import (
     MonolingualSingleFile,
     MonolingualSingleFilePair,
     MultilingualSingleFile,
     PageInfo,
 )
+from patee.pdf_pages import count_pdf_pages
 from patee.step_types import (
     ParallelExtractStep,
     StepResult,
@@ -28,11 +35,21 @@ from patee.step_types import (
 logger = logging.getLogger(__name__)
 
 
+DEFAULT_PAGES_PER_CHUNK = 10
+
+
+@dataclass
+class _DoclingElement:
+    page: int
+    label: str
+    text: str
+
+
 @dataclass
 class _DoclingExtractionResult:
     extracted_text: Iterable[NodeItem]
     excluded_text: Iterable[NodeItem]
-    seen_labels: set[DocItemLabel]
+    seen_labels: set[str]
 
 
 class DoclingExtractor(ParallelExtractStep):
@@ -51,35 +68,61 @@ class DoclingExtractor(ParallelExtractStep):
         else:
             self.labels_to_extract = {str(DocItemLabel.TEXT)}
 
-        pipeline_options = PdfPipelineOptions()
-        pipeline_options.do_ocr = False
-
         parser = kwargs.get("parser", None)
         if parser is None or parser == "docling":
             self.parser = "docling"
-            self._converter = DocumentConverter(
-                format_options={
-                    InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)
-                }
-            )
         elif parser == "pypdfium":
             self.parser = "pypdfium"
-            self._converter = DocumentConverter(
-                format_options={
-                    InputFormat.PDF: PdfFormatOption(
-                        pipeline_options=pipeline_options, backend=PyPdfiumDocumentBackend
-                    )
-                }
-            )
         else:
             raise ValueError(f"Unsupported parser: {parser}. Supported parsers are 'docling' and 'pypdfium'.")
 
+        # Convert both documents of a pair at the same time, the second one in a worker process
+        self.concurrent = bool(kwargs.get("concurrent", False))
+        self._pool: Union[ProcessPoolExecutor, None] = None
+
+        # Split the pages of PDF documents in chunks converted in a pool of worker processes
+        self.page_workers = kwargs.get("page_workers", 1)
+        if not isinstance(self.page_workers, int) or self.page_workers < 1:
+            raise ValueError(f"page_workers must be a positive integer, got {self.page_workers}")
+
+        self.pages_per_chunk = kwargs.get("pages_per_chunk", DEFAULT_PAGES_PER_CHUNK)
+        if not isinstance(self.pages_per_chunk, int) or self.pages_per_chunk < 1:
+            raise ValueError(f"pages_per_chunk must be a positive integer, got {self.pages_per_chunk}")
+
+        self.do_ocr = bool(kwargs.get("do_ocr", False))
+
+        # Keep the converted documents on disk, so changing the labels to extract does not convert them again
+        conversion_cache_dir = kwargs.get("conversion_cache_dir", None)
+        if conversion_cache_dir is not None:
+            conversion_cache_path = Path(conversion_cache_dir)
+            if not conversion_cache_path.is_absolute():
+                conversion_cache_path = self._pipeline_context.execution_path / conversion_cache_path
+            self.conversion_cache: Union[DoclingConversionCache, None] = DoclingConversionCache(conversion_cache_path)
+        else:
+            self.conversion_cache = None
+
+        # The converter is shared by every extractor of the process with the same parser and options
+        self._converter = get_converter(self.parser, self.do_ocr)
+
+        # Load the models of the converter now instead of on the first converted document
+        if bool(kwargs.get("warm_up", False)):
+            self.warm_up()
+
         logger.info("DocumentConverter supported formats: %s", [f.name for f in self._converter.allowed_formats])
 
     @staticmethod
     def step_type() -> str:
         return "docling_extractor"
 
+    def warm_up(self) -> None:
+        warm_up_converter(self.parser, self.do_ocr)
+
+    def close(self) -> None:
+        """Shut down the worker processes converting the documents."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
     def extract(self, context: StepContext,
                 source: Union[MonolingualSingleFilePair, MultilingualSingleFile]) -> StepResult:
         if isinstance(source, MonolingualSingleFilePair):
@@ -91,12 +134,19 @@ class DoclingExtractor(ParallelExtractStep):
 
 
     def _extract_file_pair(self, source: MonolingualSingleFilePair) -> StepResult:
-        logger.debug("converting document 1 from %s ...", source.document_1.document_path)
-        document_1_result = self._convert_file(source.document_1, source.shared_config)
-        logger.info("document 1 seen labels: %s", [str(label) for label in document_1_result.seen_labels])
+        if self.page_workers > 1:
+            logger.debug("converting documents in chunks of %s pages with %s workers ...",
+                         self.pages_per_chunk, self.page_workers)
 
-        logger.debug("converting document 2 from %s ...",  source.document_2.document_path)
-        document_2_result = self._convert_file(source.document_2, source.shared_config)
+        # Start both conversions before waiting, so the workers never wait between documents
+        document_1_conversion = self._start_conversion(source.document_1, source.shared_config)
+        document_2_conversion = self._start_conversion(source.document_2, source.shared_config,
+                                                       in_worker=self.concurrent)
+
+        document_1_result = self._filter_elements(source.document_1, source.shared_config, document_1_conversion())
+        document_2_result = self._filter_elements(source.document_2, source.shared_config, document_2_conversion())
+
+        logger.info("document 1 seen labels: %s", [str(label) for label in document_1_result.seen_labels])
         logger.info("document 2 seen labels: %s", [str(label) for label in document_2_result.seen_labels])
 
         context = DocumentPairContext(
@@ -128,45 +178,245 @@ class DoclingExtractor(ParallelExtractStep):
     def _extract_single_file(self, source: MultilingualSingleFile) -> StepResult:
         raise NotImplementedError("Single file extraction is not implemented yet.")
 
-    def _convert_file(self, file: MonolingualSingleFile, shared_page_info: PageInfo) -> _DoclingExtractionResult:
-        page_range = [shared_page_info.start_page, shared_page_info.end_page] if shared_page_info \
-            else [file.page_info.start_page, file.page_info.end_page] if file.page_info \
-            else None
-        excluded_pages = shared_page_info.pages_to_exclude if shared_page_info \
-            else file.page_info.pages_to_exclude if file.page_info \
-            else None
+    def _start_conversion(self, file: MonolingualSingleFile, shared_page_info: PageInfo,
+                          in_worker: bool = False) -> Callable[[], list[_DoclingElement]]:
+        """Start the conversion of a file. Return a function that waits for the converted elements."""
+        page_info = _get_page_info(file, shared_page_info)
+
+        cache_key = None
+        if self.conversion_cache is not None:
+            cache_key = self.conversion_cache.get_key(file.document_path, page_info, self.parser, self.do_ocr)
+            cached_elements = self.conversion_cache.load(cache_key)
+            if cached_elements is not None:
+                logger.debug("using the cached conversion of %s ...", file.document_path)
+                return lambda: cached_elements
+
+        # The excluded pages are never converted
+        page_ranges = _get_page_ranges(file.document_path, page_info)
 
-        result: ConversionResult
+        if self.page_workers > 1:
+            page_ranges = _split_page_ranges(file.document_path, page_ranges, self.pages_per_chunk)
+            logger.debug("converting %s in %s chunks ...", file.document_path, len(page_ranges))
 
-        if page_range is None:
-            result = self._converter.convert(file.document_path)
+        if self.page_workers > 1 or in_worker:
+            logger.debug("converting %s in worker processes ...", file.document_path)
+            chunks = [self._get_pool().submit(_convert_elements_in_worker, file.document_path, page_range)
+                      for page_range in page_ranges]
+            # The chunks are merged in page order
+            convert = lambda: [element for chunk in chunks for element in chunk.result()]
         else:
-            result = self._converter.convert(
-                file.document_path,
-                page_range=page_range)
-
-        if result.status != ConversionStatus.SUCCESS:
-            raise ValueError(f"Conversion failed for file {file.document_path}: {result.status}")
-
-        extracted_text: list[(str, str)] = []
-        excluded_text: list[(str, str)] = []
-        seen_labels: set[DocItemLabel] = set()
-
-        for element in result.assembled.body:
-            if element.page_no + 1 not in excluded_pages:
-                label = element.label
-                text = element.text
-                seen_labels.add(label)
-
-                if label in self.labels_to_extract:
-                    extracted_text.append((label, text))
-                else:
-                    excluded_text.append((label, text))
-
-        return _DoclingExtractionResult(
-            extracted_text=extracted_text,
-            excluded_text=excluded_text,
-            seen_labels=seen_labels
+            convert = lambda: self._convert_elements(file.document_path, page_ranges)
+
+        def wait_for_elements() -> list[_DoclingElement]:
+            elements = convert()
+            if cache_key is not None:
+                self.conversion_cache.save(cache_key, elements)
+            return elements
+
+        return wait_for_elements
+
+    def _convert_elements(self, document_path: Path,
+                          page_ranges: list[Optional[tuple[int, int]]]) -> list[_DoclingElement]:
+        logger.debug("converting %s ...", document_path)
+        return [element for page_range in page_ranges
+                for element in _convert_elements(self._converter, document_path, page_range)]
+
+    def _filter_elements(self, file: MonolingualSingleFile, shared_page_info: PageInfo,
+                         elements: list[_DoclingElement]) -> _DoclingExtractionResult:
+        page_info = _get_page_info(file, shared_page_info)
+        excluded_pages = page_info.pages_to_exclude if page_info else set()
+
+        return _filter_elements(elements, self.labels_to_extract, excluded_pages)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.page_workers,
+                initializer=_initialize_worker,
+                initargs=(self.parser, self.do_ocr),
+            )
+        return self._pool
+
+
+class DoclingConversionCache:
+    """On disk cache of the elements of the converted documents, before filtering them by label."""
+
+    def __init__(self, cache_dir: Path):
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def get_key(document_path: Path, page_info: Union[PageInfo, None], parser: str, do_ocr: bool) -> str:
+        return config_digest({
+            "content": file_digest(document_path),
+            "page_ranges": _get_page_ranges(document_path, page_info),
+            "parser": parser,
+            "do_ocr": do_ocr,
+        })
+
+    def load(self, key: str) -> Union[list[_DoclingElement], None]:
+        file_path = self.cache_dir / f"{key}.json"
+        if not file_path.is_file():
+            return None
+
+        with file_path.open("r", encoding="utf-8") as f:
+            return [_DoclingElement(page=page, label=label, text=text) for page, label, text in json.load(f)]
+
+    def save(self, key: str, elements: list[_DoclingElement]) -> None:
+        file_path = self.cache_dir / f"{key}.json"
+        # Written to a temporary file first, so concurrent runs never read a partial file
+        temp_path = file_path.with_name(f"{file_path.name}.{os.getpid()}.tmp")
+        with temp_path.open("w", encoding="utf-8") as f:
+            json.dump([[element.page, element.label, element.text] for element in elements], f, ensure_ascii=False)
+        os.replace(temp_path, file_path)
+
+
+# Converters shared by all the extractors of the process, keyed by parser and pipeline options
+_converters: dict[tuple[str, bool], DocumentConverter] = {}
+_warm_converters: set[tuple[str, bool]] = set()
+_converters_lock = threading.Lock()
+
+
+def get_converter(parser: str, do_ocr: bool = False) -> DocumentConverter:
+    """Return the converter of the process for the parser and options, creating it on first use."""
+    key = (parser, do_ocr)
+    with _converters_lock:
+        converter = _converters.get(key)
+        if converter is None:
+            logger.debug("creating %s document converter ...", parser)
+            converter = _create_converter(parser, do_ocr)
+            _converters[key] = converter
+
+    return converter
+
+
+def warm_up_converter(parser: str, do_ocr: bool = False) -> DocumentConverter:
+    """Return the converter of the process for the parser and options with its models already loaded."""
+    key = (parser, do_ocr)
+    converter = get_converter(parser, do_ocr)
+    with _converters_lock:
+        if key not in _warm_converters:
+            logger.debug("loading %s document converter models ...", parser)
+            converter.initialize_pipeline(InputFormat.PDF)
+            _warm_converters.add(key)
+
+    return converter
+
+
+def _create_converter(parser: str, do_ocr: bool) -> DocumentConverter:
+    pipeline_options = PdfPipelineOptions()
+    pipeline_options.do_ocr = do_ocr
+
+    if parser == "docling":
+        return DocumentConverter(
+            format_options={
+                InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)
+            }
+        )
+    elif parser == "pypdfium":
+        return DocumentConverter(
+            format_options={
+                InputFormat.PDF: PdfFormatOption(
+                    pipeline_options=pipeline_options, backend=PyPdfiumDocumentBackend
+                )
+            }
         )
+    else:
+        raise ValueError(f"Unsupported parser: {parser}. Supported parsers are 'docling' and 'pypdfium'.")
+
+
+_worker_converter: Union[DocumentConverter, None] = None
+
+
+def _initialize_worker(parser: str, do_ocr: bool) -> None:
+    global _worker_converter
+    _worker_converter = warm_up_converter(parser, do_ocr)
+
+
+def _convert_elements_in_worker(document_path: Path,
+                                page_range: Optional[tuple[int, int]]) -> list[_DoclingElement]:
+    return _convert_elements(_worker_converter, document_path, page_range)
+
+
+def _convert_elements(converter: DocumentConverter, document_path: Path,
+                      page_range: Optional[tuple[int, int]]) -> list[_DoclingElement]:
+    result: ConversionResult
+
+    if page_range is None:
+        result = converter.convert(document_path)
+    else:
+        result = converter.convert(
+            document_path,
+            page_range=page_range)
+
+    if result.status != ConversionStatus.SUCCESS:
+        raise ValueError(f"Conversion failed for file {document_path}: {result.status}")
+
+    return [_DoclingElement(page=element.page_no + 1, label=str(element.label), text=element.text)
+            for element in result.assembled.body]
+
+
+def _filter_elements(elements: Iterable[_DoclingElement], labels_to_extract: set[str],
+                     excluded_pages: set[int]) -> _DoclingExtractionResult:
+    extracted_text: list[(str, str)] = []
+    excluded_text: list[(str, str)] = []
+    seen_labels: set[str] = set()
+
+    for element in elements:
+        if element.page not in excluded_pages:
+            seen_labels.add(element.label)
+
+            if element.label in labels_to_extract:
+                extracted_text.append((element.label, element.text))
+            else:
+                excluded_text.append((element.label, element.text))
+
+    return _DoclingExtractionResult(
+        extracted_text=extracted_text,
+        excluded_text=excluded_text,
+        seen_labels=seen_labels
+    )
+
+
+def _get_page_info(file: MonolingualSingleFile, shared_page_info: PageInfo) -> Union[PageInfo, None]:
+    return shared_page_info if shared_page_info else file.page_info
+
+
+def _get_page_ranges(document_path: Path, page_info: Union[PageInfo, None]) -> list[Optional[tuple[int, int]]]:
+    """Return the minimal list of contiguous page ranges that cover the pages to convert of a document."""
+    if page_info is None:
+        return [None]
+
+    # Only PDF documents can be converted by page ranges, the excluded pages of other documents are filtered
+    if document_path.suffix.lower() != ".pdf":
+        return [(page_info.start_page, page_info.end_page)]
+
+    page_ranges = []
+    range_start = page_info.start_page
+    for excluded_page in sorted(page_info.pages_to_exclude):
+        if excluded_page > range_start:
+            page_ranges.append((range_start, excluded_page - 1))
+        range_start = excluded_page + 1
+
+    if range_start <= page_info.end_page:
+        page_ranges.append((range_start, page_info.end_page))
+
+    return page_ranges
+
+
+def _split_page_ranges(document_path: Path, page_ranges: list[Optional[tuple[int, int]]],
+                       pages_per_chunk: int) -> list[Optional[tuple[int, int]]]:
+    """Split the page ranges of a document in ranges of at most pages_per_chunk pages."""
+    if document_path.suffix.lower() != ".pdf":
+        return page_ranges
+
+    page_count = count_pdf_pages(document_path)
 
+    chunks = []
+    for page_range in page_ranges:
+        start_page, end_page = page_range if page_range is not None else (1, page_count)
+        end_page = min(end_page, page_count)
+        chunks.extend((chunk_start, min(chunk_start + pages_per_chunk - 1, end_page))
+                      for chunk_start in range(start_page, end_page + 1, pages_per_chunk))
 
+    return chunks
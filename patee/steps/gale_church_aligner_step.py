@@ -0,0 +1,255 @@
+import logging
+import math
+from collections import Counter
+
+import numpy as np
+
+from patee.core_types import PipelineContext
+from patee.step_types import (
+    ParallelProcessStep,
+    StepResult,
+    DocumentContext,
+    StepContext,
+    DocumentPairContext,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# Number of blocks of each document in a bead and its prior probability, from Gale & Church (1993)
+BEAD_PRIORS: dict[tuple[int, int], float] = {
+    (1, 1): 0.89,
+    (1, 0): 0.0099,
+    (0, 1): 0.0099,
+    (2, 1): 0.089,
+    (1, 2): 0.089,
+}
+
+DEFAULT_VARIANCE = 6.8
+DEFAULT_BAND_WIDTH = 100
+
+# Bead codes stored by the dynamic programming to trace back the alignment. 0 is the start of the alignment
+_BEAD_CODES = {bead: code for code, bead in enumerate(BEAD_PRIORS, start=1)}
+_BEADS_BY_CODE = {code: bead for bead, code in _BEAD_CODES.items()}
+
+
+class GaleChurchAlignerStep(ParallelProcessStep):
+    """Align the text blocks of both documents by their length, so the resulting blocks correspond one to one."""
+
+    def __init__(self, name: str, pipeline_context: PipelineContext, **kwargs):
+        super().__init__(name, pipeline_context)
+
+        # Maximum distance, in blocks, of an alignment from the diagonal of both documents
+        self.band_width = kwargs.get("band_width", DEFAULT_BAND_WIDTH)
+        if not isinstance(self.band_width, int) or self.band_width < 2:
+            raise ValueError(f"band_width must be an integer greater than 1, got {self.band_width}")
+
+        # Expected characters of document 2 per character of document 1. Estimated from the documents if not provided
+        self.length_ratio = kwargs.get("length_ratio", None)
+        if self.length_ratio is not None and self.length_ratio <= 0:
+            raise ValueError(f"length_ratio must be positive, got {self.length_ratio}")
+
+        self.variance = kwargs.get("variance", DEFAULT_VARIANCE)
+        if self.variance <= 0:
+            raise ValueError(f"variance must be positive, got {self.variance}")
+
+        # Blocks without a translation are dropped unless kept paired with an empty block
+        self.keep_unaligned = bool(kwargs.get("keep_unaligned", False))
+
+        self.blocks_separator = kwargs.get("blocks_separator", None)
+        if self.blocks_separator is None:
+            self.blocks_separator = " "
+
+    @staticmethod
+    def step_type() -> str:
+        return "gale_church_aligner"
+
+    def process(self, context: StepContext, source: DocumentPairContext) -> StepResult:
+        blocks_1 = list(source.document_1.text_blocks)
+        blocks_2 = list(source.document_2.text_blocks)
+
+        logger.debug("aligning %s blocks with %s blocks ...", len(blocks_1), len(blocks_2))
+
+        beads = align_block_lengths(
+            [len(block) for block in blocks_1],
+            [len(block) for block in blocks_2],
+            band_width=self.band_width,
+            length_ratio=self.length_ratio,
+            variance=self.variance,
+        )
+
+        aligned_blocks_1: list[str] = []
+        aligned_blocks_2: list[str] = []
+        idx_1 = 0
+        idx_2 = 0
+        for blocks_from_1, blocks_from_2 in beads:
+            block_1 = self.blocks_separator.join(blocks_1[idx_1:idx_1 + blocks_from_1])
+            block_2 = self.blocks_separator.join(blocks_2[idx_2:idx_2 + blocks_from_2])
+            idx_1 += blocks_from_1
+            idx_2 += blocks_from_2
+
+            if (blocks_from_1 == 0 or blocks_from_2 == 0) and not self.keep_unaligned:
+                continue
+
+            aligned_blocks_1.append(block_1)
+            aligned_blocks_2.append(block_2)
+
+        bead_counts = Counter(f"{blocks_from_1}-{blocks_from_2}" for blocks_from_1, blocks_from_2 in beads)
+
+        logger.debug("aligned %s pairs of blocks. beads: %s", len(aligned_blocks_1), dict(bead_counts))
+
+        context = DocumentPairContext(
+            document_1=DocumentContext(
+                source=source.document_1.source,
+                text_blocks=aligned_blocks_1,
+                extra={"beads": dict(bead_counts)},
+            ),
+            document_2=DocumentContext(
+                source=source.document_2.source,
+                text_blocks=aligned_blocks_2,
+                extra={"beads": dict(bead_counts)},
+            ),
+        )
+        return StepResult(
+            context=context,
+        )
+
+
+def align_block_lengths(lengths_1: list[int], lengths_2: list[int], band_width: int = DEFAULT_BAND_WIDTH,
+                        length_ratio: float = None, variance: float = DEFAULT_VARIANCE) -> list[tuple[int, int]]:
+    """Align two sequences of block lengths. Return the beads as the number of blocks of each sequence they take.
+
+    The dynamic programming is restricted to a band around the diagonal, so time and memory are linear in the
+    number of blocks. The costs of the beads are computed for many rows of the band at once.
+    """
+    n_1 = len(lengths_1)
+    n_2 = len(lengths_2)
+
+    # The band is centered on the diagonal, which does not exist when a sequence has no blocks
+    if n_1 == 0 or n_2 == 0:
+        return [(1, 0)] * n_1 + [(0, 1)] * n_2
+
+    cumulative_1 = np.concatenate(([0.0], np.cumsum(lengths_1, dtype=np.float64)))
+    cumulative_2 = np.concatenate(([0.0], np.cumsum(lengths_2, dtype=np.float64)))
+
+    if length_ratio is None:
+        length_ratio = cumulative_2[-1] / cumulative_1[-1] if cumulative_1[-1] > 0 and cumulative_2[-1] > 0 else 1.0
+
+    # Row i of the band holds the columns starts[i] .. starts[i] + width - 1, centered on the diagonal
+    width = 2 * band_width + 1
+    rows = np.arange(n_1 + 1)
+    centers = np.rint(rows * (n_2 / n_1)).astype(np.int64)
+    starts = centers - band_width
+
+    codes = np.zeros((n_1 + 1, width), dtype=np.int8)
+    previous_costs: list[np.ndarray] = []
+    bead_costs: dict[tuple[int, int], np.ndarray] = {}
+    chunk_start = 0
+
+    for i in range(n_1 + 1):
+        chunk_row = i - chunk_start
+        if i == 0 or chunk_row == _ROWS_PER_CHUNK:
+            chunk_start = i
+            chunk_row = 0
+            bead_costs = _band_bead_costs(cumulative_1, cumulative_2, starts, i, min(i + _ROWS_PER_CHUNK, n_1 + 1),
+                                          width, length_ratio, variance)
+
+        # Beads that take blocks of the first sequence come from previous rows
+        candidates = np.full((len(_FROM_PREVIOUS_ROWS) + 1, width), np.inf)
+        if i == 0:
+            candidates[0, starts[0] + np.arange(width) == 0] = 0.0
+        for idx, bead in enumerate(_FROM_PREVIOUS_ROWS, start=1):
+            blocks_from_1, blocks_from_2 = bead
+            if i < blocks_from_1:
+                continue
+            offset = starts[i] - blocks_from_2 - starts[i - blocks_from_1]
+            _shift_into(candidates[idx], previous_costs[-blocks_from_1], offset)
+            candidates[idx] += bead_costs[bead][chunk_row]
+
+        best = np.argmin(candidates, axis=0)
+        costs = candidates[best, np.arange(width)]
+        row_codes = _CANDIDATE_CODES[best]
+
+        # 0-1 beads come from the same row: cost[j] = min(cost[j], cost[j - 1] + c[j]) is solved as a prefix scan
+        prefix = np.cumsum(bead_costs[(0, 1)][chunk_row])
+        relative_costs = costs - prefix
+        best_relative_costs = np.minimum.accumulate(relative_costs)
+        from_left = best_relative_costs < relative_costs
+        row_codes[from_left] = _BEAD_CODES[(0, 1)]
+        costs = np.where(from_left, prefix + best_relative_costs, costs)
+
+        codes[i] = row_codes
+        previous_costs = (previous_costs + [costs])[-2:]
+
+    beads: list[tuple[int, int]] = []
+    i, j = n_1, n_2
+    while i > 0 or j > 0:
+        code = codes[i, j - starts[i]]
+        if code == 0:
+            raise ValueError("blocks cannot be aligned within the band. Increase band_width.")
+        bead = _BEADS_BY_CODE[int(code)]
+        beads.append(bead)
+        i -= bead[0]
+        j -= bead[1]
+
+    beads.reverse()
+    return beads
+
+
+_ROWS_PER_CHUNK = 512
+_FROM_PREVIOUS_ROWS = ((1, 1), (1, 0), (2, 1), (1, 2))
+# Code of each row of the candidates. The first row holds the start of the alignment
+_CANDIDATE_CODES = np.array([0] + [_BEAD_CODES[bead] for bead in _FROM_PREVIOUS_ROWS], dtype=np.int8)
+
+
+def _band_bead_costs(cumulative_1: np.ndarray, cumulative_2: np.ndarray, starts: np.ndarray, first_row: int,
+                     end_row: int, width: int, length_ratio: float,
+                     variance: float) -> dict[tuple[int, int], np.ndarray]:
+    """Return the cost of each bead ending at each cell of the band rows first_row .. end_row - 1."""
+    n_1 = len(cumulative_1) - 1
+    n_2 = len(cumulative_2) - 1
+    rows = np.arange(first_row, end_row)
+    columns = starts[first_row:end_row, None] + np.arange(width)
+    in_band = (columns >= 0) & (columns <= n_2)
+    clipped_columns = np.clip(columns, 0, n_2)
+
+    costs = {}
+    for bead, prior in BEAD_PRIORS.items():
+        blocks_from_1, blocks_from_2 = bead
+        length_1 = cumulative_1[rows] - cumulative_1[np.clip(rows - blocks_from_1, 0, n_1)]
+        length_2 = cumulative_2[clipped_columns] - cumulative_2[np.clip(clipped_columns - blocks_from_2, 0, n_2)]
+        valid = in_band & (rows[:, None] >= blocks_from_1) & (columns - blocks_from_2 >= 0)
+        bead_costs = _length_costs(length_1[:, None], length_2, length_ratio, variance) - math.log(prior)
+        costs[bead] = np.where(valid, bead_costs, np.inf)
+
+    # The costs of 0-1 beads are accumulated along the rows, so they must be finite. The cells without a valid
+    # left cell are the first column of the sequence or out of it, and their cost is infinite anyway
+    costs[(0, 1)][~np.isfinite(costs[(0, 1)])] = 0.0
+    costs[(0, 1)][:, 0] = 0.0
+    return costs
+
+
+def _shift_into(target: np.ndarray, values: np.ndarray, offset: int) -> None:
+    """Set target[k] = values[k + offset] for the positions of both arrays."""
+    width = len(target)
+    if offset >= 0:
+        if offset < width:
+            target[:width - offset] = values[offset:]
+    elif -offset < width:
+        target[-offset:] = values[:width + offset]
+
+
+def _length_costs(length_1, length_2: np.ndarray, length_ratio: float, variance: float) -> np.ndarray:
+    """Return -log of the probability of the length difference of aligned text, as in Gale & Church (1993)."""
+    length_2 = np.asarray(length_2, dtype=np.float64)
+    mean = (length_1 + length_2 / length_ratio) / 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        delta = np.where(mean > 0, (length_2 - length_1 * length_ratio) / np.sqrt(mean * variance), 0.0)
+
+    # -log(2 * (1 - Phi(|delta|))) = -log(erfc(|delta| / sqrt(2))), with the Chebyshev approximation of erfc
+    z = np.abs(delta) / math.sqrt(2)
+    t = 1.0 / (1.0 + 0.5 * z)
+    polynomial = -1.26551223 + t * (1.00002368 + t * (0.37409196 + t * (0.09678418 + t * (
+        -0.18628806 + t * (0.27886807 + t * (-1.13520398 + t * (1.48851587 + t * (
+            -0.82215223 + t * 0.17087277))))))))
+    return -(np.log(t) - z * z + polynomial)
@@ -0,0 +1,333 @@
+import logging
+import sqlite3
+from pathlib import Path
+from typing import Iterator, Iterable, Union
+
+import numpy as np
+
+from patee.core_types import PipelineContext
+from patee.digests import config_digest
+from patee.step_types import (
+    StreamingProcessStep,
+    DocumentSource,
+    StepContext,
+    BlockPair,
+    iter_windows,
+)
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_NUM_PERM = 128
+DEFAULT_SHINGLE_SIZE = 5
+DEFAULT_BATCH_SIZE = 1024
+
+INDEX_FILE_NAME = "minhash_lsh.sqlite3"
+
+# Separates both sides of a pair, so the shingles of the end of a block never match the start of the other
+_PAIR_SEPARATOR = "\x1f"
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_HIGH_BITS = np.uint64(32)
+# Permutations hashed at a time, so the memory of a batch does not grow with num_perm
+_PERMUTATIONS_PER_CHUNK = 16
+# Parameters per SQLite query, below the limit of old SQLite versions
+_QUERY_CHUNK_SIZE = 500
+
+
+class MinHashDeduplicatorStep(StreamingProcessStep):
+    """Remove the pairs of text blocks that are near duplicates of a previous pair of the same or other sources.
+
+    The pairs are compared by the MinHash signatures of their character shingles, and only the pairs that share a
+    band of their signatures in a LSH index are compared, so the cost does not grow with the square of the pairs.
+    """
+
+    def __init__(self, name: str, pipeline_context: PipelineContext, **kwargs):
+        super().__init__(name, pipeline_context)
+
+        # Minimum estimated Jaccard similarity of two pairs to consider them duplicates
+        self.threshold = kwargs.get("threshold", DEFAULT_THRESHOLD)
+        if not isinstance(self.threshold, (int, float)) or not 0 < self.threshold <= 1:
+            raise ValueError(f"threshold must be a number in (0, 1], got {self.threshold}")
+
+        self.num_perm = kwargs.get("num_perm", DEFAULT_NUM_PERM)
+        if not isinstance(self.num_perm, int) or self.num_perm < 2:
+            raise ValueError(f"num_perm must be an integer greater than 1, got {self.num_perm}")
+
+        # Bands of the LSH index. Chosen from the threshold when not provided
+        self.bands = kwargs.get("bands", None)
+        if self.bands is None:
+            self.bands = optimal_bands(self.threshold, self.num_perm)
+        elif not isinstance(self.bands, int) or self.bands < 1 or self.num_perm % self.bands != 0:
+            raise ValueError(f"bands must be a positive divisor of num_perm, got {self.bands}")
+
+        # Characters per shingle. Texts are shingled as UTF-8 bytes, so at most 8
+        self.shingle_size = kwargs.get("shingle_size", DEFAULT_SHINGLE_SIZE)
+        if not isinstance(self.shingle_size, int) or not 1 <= self.shingle_size <= 8:
+            raise ValueError(f"shingle_size must be an integer between 1 and 8, got {self.shingle_size}")
+
+        self.batch_size = kwargs.get("batch_size", DEFAULT_BATCH_SIZE)
+        if not isinstance(self.batch_size, int) or self.batch_size < 1:
+            raise ValueError(f"batch_size must be a positive integer, got {self.batch_size}")
+
+        self.seed = kwargs.get("seed", 1)
+
+        # Directory of the index shared by the runs. Without it, the pairs are only compared inside each source
+        index_dir = kwargs.get("index_dir", None)
+        if index_dir is not None:
+            index_path = Path(index_dir)
+            if not index_path.is_absolute():
+                index_path = self._pipeline_context.execution_path / index_path
+            index_path.mkdir(parents=True, exist_ok=True)
+            self.index_path: Union[Path, None] = index_path / INDEX_FILE_NAME
+        else:
+            self.index_path = None
+
+        self.hasher = MinHasher(self.num_perm, self.bands, self.shingle_size, self.seed)
+
+    @staticmethod
+    def step_type() -> str:
+        return "minhash_deduplicator"
+
+    def process_blocks(self, context: StepContext, document_1: DocumentSource, document_2: DocumentSource,
+                       blocks: Iterator[BlockPair]) -> Iterator[BlockPair]:
+        source = context.run_context.source_hash
+        index = MinHashLshIndex(self.index_path, self.hasher.description())
+        try:
+            # The pairs of a previous run of the same source are replaced, so a rerun does not remove them all
+            index.remove_source(source)
+
+            total = 0
+            duplicates = 0
+            for window in iter_windows(blocks, self.batch_size):
+                kept = self._deduplicate_window(index, source, window)
+                total += len(window)
+                duplicates += len(window) - len(kept)
+                yield from kept
+
+            logger.debug("%s near duplicate pairs removed of %s pairs of %s and %s.",
+                         duplicates, total, document_1.document_path, document_2.document_path)
+        finally:
+            index.close()
+
+    def _deduplicate_window(self, index: "MinHashLshIndex", source: str, window: list[BlockPair]) -> list[BlockPair]:
+        signatures = self.hasher.signatures([_pair_text(block_1, block_2) for block_1, block_2 in window])
+        keys = self.hasher.band_keys(signatures)
+
+        indexed_ids, indexed_signatures = index.query_candidates(np.unique(keys).tolist())
+
+        # Positions of the pairs of the window that are kept, by band key
+        window_positions: dict[int, list[int]] = {}
+        kept_positions = []
+        for position, row_keys in enumerate(keys.tolist()):
+            signature = signatures[position]
+            candidates = set()
+            window_candidates = set()
+            for key in row_keys:
+                candidates.update(indexed_ids.get(key, ()))
+                window_candidates.update(window_positions.get(key, ()))
+
+            if any(self._is_duplicate(signature, indexed_signatures[idx]) for idx in candidates) or \
+                    any(self._is_duplicate(signature, signatures[other]) for other in window_candidates):
+                continue
+
+            kept_positions.append(position)
+            for key in row_keys:
+                window_positions.setdefault(key, []).append(position)
+
+        index.add(source, signatures[kept_positions], keys[kept_positions])
+        return [window[position] for position in kept_positions]
+
+    def _is_duplicate(self, signature: np.ndarray, other: np.ndarray) -> bool:
+        return np.count_nonzero(signature == other) >= self.threshold * self.num_perm
+
+
+class MinHasher:
+    """Compute the MinHash signatures of texts and the keys of their LSH bands, stable across processes."""
+
+    def __init__(self, num_perm: int, bands: int, shingle_size: int, seed: int = 1):
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.seed = seed
+
+        # Permutations as multiply-shift hashes: the high 32 bits of a * x + b, with odd a, modulo 2^64
+        generator = np.random.default_rng(seed)
+        self._a = generator.integers(0, 1 << 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = generator.integers(0, 1 << 63, size=num_perm, dtype=np.uint64)
+        self._shingle_weights = np.uint64(256) ** np.arange(shingle_size, dtype=np.uint64)
+
+    def description(self) -> str:
+        """Return a digest of the parameters. Signatures are only comparable between equal descriptions."""
+        return config_digest({
+            "num_perm": self.num_perm,
+            "bands": self.bands,
+            "shingle_size": self.shingle_size,
+            "seed": self.seed,
+        })
+
+    def signatures(self, texts: list[str]) -> np.ndarray:
+        """Return the signatures of the texts, as an array of shape (len(texts), num_perm)."""
+        if not texts:
+            return np.empty((0, self.num_perm), dtype=np.uint32)
+
+        shingles, starts = self._shingle_hashes(texts)
+
+        signatures = np.empty((self.num_perm, len(texts)), dtype=np.uint64)
+        for first in range(0, self.num_perm, _PERMUTATIONS_PER_CHUNK):
+            last = min(first + _PERMUTATIONS_PER_CHUNK, self.num_perm)
+            permuted = shingles[None, :] * self._a[first:last, None]
+            permuted += self._b[first:last, None]
+            permuted >>= _HIGH_BITS
+            signatures[first:last] = np.minimum.reduceat(permuted, starts, axis=1)
+
+        return signatures.T.astype(np.uint32)
+
+    def band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        """Return the key of each band of the signatures, as an array of shape (len(signatures), bands)."""
+        rows = signatures.reshape(len(signatures), self.bands, self.rows).astype(np.uint64)
+
+        # FNV-1a like folding of the rows of each band, starting from a value that depends on the band
+        keys = np.broadcast_to(np.arange(self.bands, dtype=np.uint64) + np.uint64(0xCBF29CE484222325),
+                               (len(signatures), self.bands)).copy()
+        for row in range(self.rows):
+            keys ^= rows[:, :, row]
+            keys *= np.uint64(0x100000001B3)
+
+        return keys.view(np.int64)
+
+    def _shingle_hashes(self, texts: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        """Return the 32-bit hashes of the shingles of all the texts and the position of the first one of each text."""
+        size = self.shingle_size
+        # Texts shorter than a shingle are padded, so every text has at least one shingle
+        encoded = [text.encode("utf-8").ljust(size, b"\0") for text in texts]
+        lengths = np.array([len(text) for text in encoded], dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+        buffer = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        windows = np.lib.stride_tricks.sliding_window_view(buffer, size)
+
+        # Only the windows that start and end inside the same text are shingles
+        counts = lengths - size + 1
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        positions = np.arange(counts.sum()) + np.repeat(offsets - starts, counts)
+
+        packed = windows[positions].astype(np.uint64) @ self._shingle_weights
+        packed *= np.uint64(0x9E3779B97F4A7C15)
+        packed ^= packed >> _HIGH_BITS
+        return packed & _MAX_HASH, starts
+
+
+class MinHashLshIndex:
+    """LSH index of MinHash signatures stored in a SQLite database, so it can be shared by runs and processes.
+
+    Without a path, the index is kept in memory and lost when closed.
+    """
+
+    def __init__(self, path: Union[Path, None], hasher_description: str):
+        self.path = path
+        self._connection = sqlite3.connect(str(path) if path is not None else ":memory:", timeout=60)
+        if path is not None:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+
+        with self._connection:
+            self._connection.execute("CREATE TABLE IF NOT EXISTS settings (name TEXT PRIMARY KEY, value TEXT)")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS signatures (id INTEGER PRIMARY KEY, source TEXT, signature BLOB)")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS signatures_source ON signatures (source)")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS band_keys (key INTEGER, id INTEGER)")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS band_keys_key ON band_keys (key)")
+            self._connection.execute(
+                "INSERT OR IGNORE INTO settings (name, value) VALUES ('hasher', ?)", (hasher_description,))
+
+        stored_description = self._connection.execute(
+            "SELECT value FROM settings WHERE name = 'hasher'").fetchone()[0]
+        if stored_description != hasher_description:
+            self.close()
+            raise ValueError(f"index {path} was built with other num_perm, bands, shingle_size or seed")
+
+    def remove_source(self, source: str) -> None:
+        with self._connection:
+            self._connection.execute(
+                "DELETE FROM band_keys WHERE id IN (SELECT id FROM signatures WHERE source = ?)", (source,))
+            self._connection.execute("DELETE FROM signatures WHERE source = ?", (source,))
+
+    def query(self, keys: list[int]) -> dict[int, list[int]]:
+        """Return the ids of the signatures indexed with each of the keys."""
+        ids: dict[int, list[int]] = {}
+        for chunk in _iter_chunks(keys):
+            rows = self._connection.execute(
+                f"SELECT key, id FROM band_keys WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+            for key, idx in rows:
+                ids.setdefault(key, []).append(idx)
+        return ids
+
+    def query_candidates(self, keys: list[int]) -> tuple[dict[int, list[int]], dict[int, np.ndarray]]:
+        """Return the ids of the signatures indexed with each of the keys and their signatures.
+
+        Both are read in the same transaction, so the signatures of a source removed by another process in between
+        are not missing.
+        """
+        self._connection.execute("BEGIN")
+        try:
+            ids = self.query(keys)
+            signatures = self.get_signatures({idx for key_ids in ids.values() for idx in key_ids})
+        finally:
+            self._connection.commit()
+        return ids, signatures
+
+    def get_signatures(self, ids: Iterable[int]) -> dict[int, np.ndarray]:
+        signatures = {}
+        for chunk in _iter_chunks(list(ids)):
+            rows = self._connection.execute(
+                f"SELECT id, signature FROM signatures WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+            for idx, signature in rows:
+                signatures[idx] = np.frombuffer(signature, dtype=np.uint32)
+        return signatures
+
+    def add(self, source: str, signatures: np.ndarray, keys: np.ndarray) -> None:
+        band_keys = []
+        with self._connection:
+            for signature, row_keys in zip(signatures, keys.tolist()):
+                idx = self._connection.execute(
+                    "INSERT INTO signatures (source, signature) VALUES (?, ?)",
+                    (source, signature.astype(np.uint32).tobytes())).lastrowid
+                band_keys.extend((key, idx) for key in row_keys)
+            self._connection.executemany("INSERT INTO band_keys (key, id) VALUES (?, ?)", band_keys)
+
+    def __len__(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+def optimal_bands(threshold: float, num_perm: int) -> int:
+    """Return the bands, a divisor of num_perm, that best split the pairs by the threshold.
+
+    The false positives below the threshold and the false negatives above it are weighted equally.
+    """
+    similarities = np.linspace(0.0, 1.0, 1001)
+    best_bands = 1
+    best_error = np.inf
+    for bands in range(1, num_perm + 1):
+        if num_perm % bands != 0:
+            continue
+        rows = num_perm // bands
+        probabilities = 1.0 - (1.0 - similarities ** rows) ** bands
+        error = np.mean(np.where(similarities < threshold, probabilities, 1.0 - probabilities))
+        if error < best_error:
+            best_bands = bands
+            best_error = error
+    return best_bands
+
+
+def _pair_text(block_1: Union[str, None], block_2: Union[str, None]) -> str:
+    # Case and whitespace differences do not make pairs different
+    return " ".join((block_1 or "").lower().split()) + _PAIR_SEPARATOR + " ".join((block_2 or "").lower().split())
+
+
+def _iter_chunks(values: list) -> Iterator[list]:
+    for start in range(0, len(values), _QUERY_CHUNK_SIZE):
+        yield values[start:start + _QUERY_CHUNK_SIZE]
@@ -1,19 +1,22 @@
 import logging
+from typing import Iterator
 
 from patee.core_types import PipelineContext
 from patee.step_types import (
-    ParallelProcessStep,
+    StreamingProcessStep,
     StepResult,
     DocumentContext,
+    DocumentSource,
     StepContext,
     DocumentPairContext,
+    BlockPair,
 )
 
 
 logger = logging.getLogger(__name__)
 
 
-class NoopProcessorStep(ParallelProcessStep):
+class NoopProcessorStep(StreamingProcessStep):
     def __init__(self, name: str, pipeline_context: PipelineContext, **kwargs):
         super().__init__(name, pipeline_context)
 
@@ -36,4 +39,8 @@ class NoopProcessorStep(ParallelProcessStep):
         )
         return StepResult(
             context=context,
-        )
\ No newline at end of file
+        )
+
+    def process_blocks(self, context: StepContext, document_1: DocumentSource, document_2: DocumentSource,
+                       blocks: Iterator[BlockPair]) -> Iterator[BlockPair]:
+        return blocks
@@ -0,0 +1,193 @@
+import logging
+import re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Iterable, Union
+
+from patee.core_types import PipelineContext
+from patee.step_types import (
+    ParallelProcessStep,
+    StepResult,
+    DocumentContext,
+    StepContext,
+    DocumentPairContext,
+    iter_windows,
+)
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_BATCH_SIZE = 1024
+
+# Abbreviations, lowercase and without their final period, that do not end a sentence
+_COMMON_ABBREVIATIONS = {
+    "etc", "vs", "e.g", "i.e", "cf", "approx", "fig", "figs", "pp", "vol", "ed", "eds", "art", "arts", "op",
+    "cit", "ibid",
+}
+
+ABBREVIATIONS: dict[str, set[str]] = {
+    "en": _COMMON_ABBREVIATIONS | {
+        "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "mt", "co", "corp", "inc", "ltd", "dept", "univ",
+        "jan", "feb", "mar", "apr", "jun", "jul", "aug", "sep", "sept", "oct", "nov", "dec",
+        "a.m", "p.m", "u.s", "u.k", "gen", "gov", "sen", "rep", "rev", "est", "no", "nos", "approx",
+    },
+    "es": _COMMON_ABBREVIATIONS | {
+        "sr", "sra", "sres", "srta", "dr", "dra", "dres", "lic", "ing", "arq", "prof", "profa", "d", "dña",
+        "ud", "uds", "vd", "vds", "núm", "pág", "págs", "aprox", "admón", "avda", "av", "c", "cía", "dpto",
+        "ee", "uu", "ej", "gral", "ntra", "ntro", "sto", "sta", "s.a", "s.l", "tel", "tfno", "ss", "vid", "cp", "dcha",
+        "izq", "izda", "máx", "mín", "ene", "feb", "mar", "abr", "may", "jun", "jul", "ago", "sept", "oct",
+        "nov", "dic", "a.c", "d.c",
+    },
+    "ca": _COMMON_ABBREVIATIONS | {
+        "sr", "sra", "srs", "srta", "dr", "dra", "drs", "prof", "profa", "lic", "ing", "arq", "núm", "pàg",
+        "pàgs", "aprox", "av", "avda", "c", "cia", "dpt", "dept", "ex", "p.ex", "tel", "ss", "vid", "màx",
+        "mín", "gen", "febr", "març", "abr", "jul", "ag", "set", "oct", "nov", "des", "aC", "dC", "a.c", "d.c",
+    },
+    "fr": _COMMON_ABBREVIATIONS | {
+        "m", "mm", "mme", "mmes", "mlle", "mlles", "dr", "pr", "me", "st", "ste", "av", "bd", "chap", "env",
+        "ex", "janv", "févr", "avr", "juil", "sept", "oct", "nov", "déc", "tél", "p.ex", "c.-à-d", "cie",
+    },
+    "de": _COMMON_ABBREVIATIONS | {
+        "hr", "hrn", "fr", "frl", "dr", "prof", "str", "nr", "bzw", "ca", "usw", "vgl", "z.b", "d.h", "u.a",
+        "s.o", "s.u", "evtl", "ggf", "inkl", "jan", "feb", "mär", "apr", "jun", "jul", "aug", "sep", "okt",
+        "nov", "dez", "bd", "hrsg", "abs", "abb", "tel",
+    },
+    "it": _COMMON_ABBREVIATIONS | {
+        "sig", "sigg", "sig.ra", "dott", "dott.ssa", "prof", "ing", "avv", "arch", "geom", "rag", "sg", "pag",
+        "pagg", "tel", "ecc", "es", "gen", "febbr", "apr", "giu", "lug", "ago", "sett", "ott", "nov", "dic",
+    },
+    "pt": _COMMON_ABBREVIATIONS | {
+        "sr", "sra", "srs", "sras", "dr", "dra", "prof", "profa", "eng", "av", "pág", "págs", "tel", "ex",
+        "jan", "fev", "mar", "abr", "mai", "jun", "jul", "ago", "set", "out", "nov", "dez", "lda", "cia",
+    },
+}
+
+# Candidate boundary: the token before the punctuation, the punctuation, closing quotes and whitespace
+_BOUNDARY_PATTERN = re.compile(r"(\S*?)([.!?…]+)([\"'»”’)\]]*)\s+")
+_PARAGRAPH_PATTERN = re.compile(r"\n\s*\n")
+
+
+_abbreviations: dict[str, frozenset[str]] = {}
+
+
+def get_abbreviations(iso2_language: str) -> frozenset[str]:
+    """Return the abbreviations of a language, prepared on first use. Unknown languages use the common ones."""
+    abbreviations = _abbreviations.get(iso2_language)
+    if abbreviations is None:
+        abbreviations = frozenset(
+            abbreviation.lower() for abbreviation in ABBREVIATIONS.get(iso2_language, _COMMON_ABBREVIATIONS))
+        _abbreviations[iso2_language] = abbreviations
+    return abbreviations
+
+
+def segment_text(text: str, iso2_language: str, normalize_whitespace: bool = True) -> list[str]:
+    """Split a text in sentences using the rules of its language."""
+    abbreviations = get_abbreviations(iso2_language)
+
+    sentences = []
+    for paragraph in _PARAGRAPH_PATTERN.split(text):
+        start = 0
+        for match in _BOUNDARY_PATTERN.finditer(paragraph):
+            end = match.end()
+            if end >= len(paragraph):
+                break
+
+            # A sentence does not start with a lowercase letter
+            if paragraph[end].islower():
+                continue
+
+            if match.group(2) == ".":
+                token = match.group(1).lstrip("\"'«“‘([¿¡").lower()
+                # Abbreviations and initials, like "J." or "U.S."
+                if token in abbreviations or (len(token) == 1 and token.isalpha()):
+                    continue
+
+            sentences.append(paragraph[start:match.start(3) + len(match.group(3))])
+            start = end
+
+        sentences.append(paragraph[start:])
+
+    if normalize_whitespace:
+        return [" ".join(sentence.split()) for sentence in sentences if sentence and not sentence.isspace()]
+    return [sentence.strip() for sentence in sentences if sentence and not sentence.isspace()]
+
+
+def segment_blocks(blocks: Iterable[str], iso2_language: str, normalize_whitespace: bool = True) -> list[str]:
+    """Split the text blocks in sentences using the rules of their language."""
+    sentences = []
+    for block in blocks:
+        sentences.extend(segment_text(block, iso2_language, normalize_whitespace))
+    return sentences
+
+
+class SentenceSegmenterStep(ParallelProcessStep):
+    """Split the text blocks of both documents in sentences using the rules of the language of each document."""
+
+    def __init__(self, name: str, pipeline_context: PipelineContext, **kwargs):
+        super().__init__(name, pipeline_context)
+
+        self.batch_size = kwargs.get("batch_size", DEFAULT_BATCH_SIZE)
+        if not isinstance(self.batch_size, int) or self.batch_size < 1:
+            raise ValueError(f"batch_size must be a positive integer, got {self.batch_size}")
+
+        # Segment the batches in a pool of worker processes when greater than 1
+        self.workers = kwargs.get("workers", 1)
+        if not isinstance(self.workers, int) or self.workers < 1:
+            raise ValueError(f"workers must be a positive integer, got {self.workers}")
+
+        self.normalize_whitespace = bool(kwargs.get("normalize_whitespace", True))
+
+        self._pool: Union[ProcessPoolExecutor, None] = None
+
+    @staticmethod
+    def step_type() -> str:
+        return "sentence_segmenter"
+
+    def process(self, context: StepContext, source: DocumentPairContext) -> StepResult:
+        context = DocumentPairContext(
+            document_1=DocumentContext(
+                source=source.document_1.source,
+                text_blocks=self._segment_document(source.document_1),
+                extra={},
+            ),
+            document_2=DocumentContext(
+                source=source.document_2.source,
+                text_blocks=self._segment_document(source.document_2),
+                extra={},
+            ),
+        )
+        return StepResult(
+            context=context,
+        )
+
+    def close(self) -> None:
+        """Shut down the worker processes segmenting the batches."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _segment_document(self, document: DocumentContext) -> list[str]:
+        iso2_language = document.source.iso2_language
+        batches = iter_windows(document.text_blocks, self.batch_size)
+
+        logger.debug("segmenting %s blocks of %s in %s ...",
+                     len(document.text_blocks), document.source.document_path, iso2_language)
+
+        if self.workers > 1:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            segmented_batches = self._pool.map(
+                segment_blocks, batches,
+                repeat(iso2_language), repeat(self.normalize_whitespace))
+        else:
+            segmented_batches = (
+                segment_blocks(batch, iso2_language, self.normalize_whitespace) for batch in batches)
+
+        sentences = []
+        for segmented_batch in segmented_batches:
+            sentences.extend(segmented_batch)
+
+        logger.debug("%s blocks segmented in %s sentences.", len(document.text_blocks), len(sentences))
+
+        return sentences
+
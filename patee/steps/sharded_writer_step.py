@@ -0,0 +1,120 @@
+import logging
+import os
+from multiprocessing.util import Finalize
+from pathlib import Path
+from typing import Iterator, Union
+
+from patee.core_types import PipelineContext
+from patee.corpus_writers import (
+    ShardedCorpusWriter,
+    get_compression_suffix,
+    SHARD_FORMATS,
+    DEFAULT_BUFFER_SIZE,
+    DEFAULT_MAX_SHARD_BYTES,
+)
+from patee.step_types import (
+    StreamingProcessStep,
+    StepResult,
+    StepContext,
+    DocumentPairContext,
+    DocumentSource,
+    BlockPair,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ShardedWriterStep(StreamingProcessStep):
+    """Append the pairs of text blocks of every source to size bounded shards shared by the runs of the process."""
+
+    def __init__(self, name: str, pipeline_context: PipelineContext, **kwargs):
+        super().__init__(name, pipeline_context)
+
+        # Mandatory configuration
+        output_path = kwargs.get("output_path")
+        if output_path is None:
+            output_path = self._pipeline_context.execution_path
+
+        provided_output_path = Path(output_path)
+        if not provided_output_path.is_absolute():
+            self._output_path = self._pipeline_context.execution_path / provided_output_path
+        else:
+            self._output_path = provided_output_path
+
+        if not self._output_path.exists():
+            raise ValueError(f"output_path does not exist: {self._output_path}")
+
+        if not self._output_path.is_dir():
+            raise ValueError(f"output_path must be a directory: {self._output_path}")
+
+        # Safe defaults
+        self._format = kwargs.get("format")
+        if self._format is None:
+            self._format = "jsonl"
+        if self._format not in SHARD_FORMATS:
+            raise ValueError(f"Unsupported shard format: {self._format}. Supported formats are {list(SHARD_FORMATS)}.")
+
+        self._max_shard_bytes = kwargs.get("max_shard_bytes", DEFAULT_MAX_SHARD_BYTES)
+        if not isinstance(self._max_shard_bytes, int) or self._max_shard_bytes < 1:
+            raise ValueError(f"max_shard_bytes must be a positive integer, got {self._max_shard_bytes}")
+
+        self._encoding = kwargs.get("encoding")
+        if self._encoding is None:
+            self._encoding = "utf-8"
+
+        self._compression = kwargs.get("compression")
+        get_compression_suffix(self._compression)
+
+        self._buffer_size = kwargs.get("buffer_size", DEFAULT_BUFFER_SIZE)
+        if not isinstance(self._buffer_size, int) or self._buffer_size < 1:
+            raise ValueError(f"buffer_size must be a positive integer, got {self._buffer_size}")
+
+        # Created on first use in every process, so forked workers never share the shards of their parent
+        self._writer: Union[ShardedCorpusWriter, None] = None
+        self._writer_pid: Union[int, None] = None
+
+    @staticmethod
+    def step_type() -> str:
+        return "write_to_shards"
+
+    @property
+    def output_path(self) -> Path:
+        return self._output_path
+
+    def process(self, context: StepContext, source: DocumentPairContext) -> StepResult:
+        for _ in self.process_blocks(context, source.document_1.source, source.document_2.source,
+                                     source.iter_block_pairs()):
+            pass
+
+        return StepResult(
+            context=source,
+        )
+
+    def process_blocks(self, context: StepContext, document_1: DocumentSource, document_2: DocumentSource,
+                       blocks: Iterator[BlockPair]) -> Iterator[BlockPair]:
+        writer = self._get_writer()
+        yield from writer.write_documents(context.run_context.source_hash, document_1, document_2, blocks)
+
+        logger.debug("%s and %s appended to %s", document_1.document_path, document_2.document_path,
+                     writer.shard_path or "a finalized shard")
+
+    def close(self) -> None:
+        """Finalize the shard being written by the process."""
+        if self._writer is not None and self._writer_pid == os.getpid():
+            self._writer.close()
+        self._writer = None
+
+    def _get_writer(self) -> ShardedCorpusWriter:
+        if self._writer is None or self._writer_pid != os.getpid():
+            self._writer = ShardedCorpusWriter(
+                self._output_path,
+                output_format=self._format,
+                max_shard_bytes=self._max_shard_bytes,
+                encoding=self._encoding,
+                compression=self._compression,
+                buffer_size=self._buffer_size,
+            )
+            self._writer_pid = os.getpid()
+            # Also run when the worker processes of a batch exit, unlike atexit handlers
+            Finalize(self._writer, self._writer.close, exitpriority=10)
+        return self._writer
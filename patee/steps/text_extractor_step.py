@@ -1,4 +1,5 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Union
 
 from patee.core_types import PipelineContext
@@ -20,6 +21,9 @@ class TextReaderExtractor(ParallelExtractStep):
     def __init__(self, name: str, pipeline_context: PipelineContext, **kwargs):
         super().__init__(name, pipeline_context)
 
+        # Read both documents of a pair at the same time
+        self.concurrent = bool(kwargs.get("concurrent", False))
+
     @staticmethod
     def step_type() -> str:
         return "text_extractor"
@@ -34,11 +38,20 @@ class TextReaderExtractor(ParallelExtractStep):
             raise ValueError(f"Unsupported source type: {type(source)}")
 
     def _extract_file_pair(self, source: MonolingualSingleFilePair) -> StepResult:
-        logger.debug("reading document 1 from %s ...", source.document_1.document_path)
-        document_1_text = source.document_1.document_path.read_text(encoding="utf-8")
+        if self.concurrent:
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                logger.debug("reading document 2 from %s in a worker thread ...", source.document_2.document_path)
+                document_2_future = pool.submit(source.document_2.document_path.read_text, encoding="utf-8")
+
+                logger.debug("reading document 1 from %s ...", source.document_1.document_path)
+                document_1_text = source.document_1.document_path.read_text(encoding="utf-8")
+                document_2_text = document_2_future.result()
+        else:
+            logger.debug("reading document 1 from %s ...", source.document_1.document_path)
+            document_1_text = source.document_1.document_path.read_text(encoding="utf-8")
 
-        logger.debug("reading document 2 from %s ...", source.document_2.document_path)
-        document_2_text = source.document_2.document_path.read_text(encoding="utf-8")
+            logger.debug("reading document 2 from %s ...", source.document_2.document_path)
+            document_2_text = source.document_2.document_path.read_text(encoding="utf-8")
 
         context = DocumentPairContext(
             document_1=DocumentContext(
@@ -1,18 +1,22 @@
 import logging
 from pathlib import Path
+from typing import Iterator
 
 from patee.core_types import PipelineContext
+from patee.corpus_writers import open_corpus_writer, get_compression_suffix, CORPUS_FORMATS, DEFAULT_BUFFER_SIZE
 from patee.step_types import (
-    ParallelProcessStep,
+    StreamingProcessStep,
     StepResult,
     StepContext,
     DocumentPairContext,
+    DocumentSource,
+    BlockPair,
 )
 
 logger = logging.getLogger(__name__)
 
 
-class TextWriterProcessorStep(ParallelProcessStep):
+class TextWriterProcessorStep(StreamingProcessStep):
     def __init__(self, name: str, pipeline_context: PipelineContext, **kwargs):
         super().__init__(name, pipeline_context)
 
@@ -34,35 +38,52 @@ class TextWriterProcessorStep(ParallelProcessStep):
             raise ValueError(f"output_path must be a directory: {self._output_path}")
 
         # Safe defaults
-        self._block_separator = kwargs.get("block_separator")
-        if self._block_separator is None:
-            self._block_separator = "\n"
+        self._format = kwargs.get("format")
+        if self._format is None:
+            self._format = "text"
+        if self._format not in CORPUS_FORMATS:
+            raise ValueError(f"Unsupported format: {self._format}. Supported formats are {sorted(CORPUS_FORMATS)}.")
+
+        # block_separator is the name used by previous versions
+        self._blocks_separator = kwargs.get("blocks_separator", kwargs.get("block_separator"))
+        if self._blocks_separator is None:
+            self._blocks_separator = "\n"
 
         self._encoding = kwargs.get("encoding")
         if self._encoding is None:
             self._encoding = "utf-8"
 
+        # gzip or xz, applied while the files are written
+        self._compression = kwargs.get("compression")
+        get_compression_suffix(self._compression)
+
+        self._buffer_size = kwargs.get("buffer_size", DEFAULT_BUFFER_SIZE)
+        if not isinstance(self._buffer_size, int) or self._buffer_size < 1:
+            raise ValueError(f"buffer_size must be a positive integer, got {self._buffer_size}")
 
     @staticmethod
     def step_type() -> str:
         return "write_to_file"
 
     def process(self, context: StepContext, source: DocumentPairContext) -> StepResult:
-        document_1_path = self._output_path / f"{source.document_1.source.document_path.stem}.txt"
-        document_2_path = self._output_path / f"{source.document_2.source.document_path.stem}.txt"
-
-        document_1_path.write_text(
-            data=self._block_separator.join(source.document_1.text_blocks),
-            encoding=self._encoding,
-        )
-        logger.debug(f"Document 1 written to {document_1_path}")
-
-        document_2_path.write_text(
-            data=self._block_separator.join(source.document_2.text_blocks),
-            encoding=self._encoding,
-        )
-        logger.debug(f"Document 2 written to {document_2_path}")
+        for _ in self.process_blocks(context, source.document_1.source, source.document_2.source,
+                                     source.iter_block_pairs()):
+            pass
 
         return StepResult(
             context=source,
-        )
\ No newline at end of file
+        )
+
+    def process_blocks(self, context: StepContext, document_1: DocumentSource, document_2: DocumentSource,
+                       blocks: Iterator[BlockPair]) -> Iterator[BlockPair]:
+        # The pairs are written while they pass through, so the documents are never joined in memory
+        with open_corpus_writer(self._format, self._output_path, document_1, document_2,
+                                blocks_separator=self._blocks_separator,
+                                encoding=self._encoding,
+                                compression=self._compression,
+                                buffer_size=self._buffer_size) as writer:
+            for block_1, block_2 in blocks:
+                writer.write_pair(block_1, block_2)
+                yield block_1, block_2
+
+        logger.debug(f"Documents written to {', '.join(str(file_path) for file_path in writer.file_paths)}")
@@ -1,46 +1,80 @@
+import importlib
+import logging
+from importlib.metadata import entry_points, EntryPoint
+from typing import Union
+
 from patee.step_types import StepsBuilder, Step
 from patee.core_types import PipelineContext
-from patee.steps.text_extractor_step import TextReaderExtractor
-from patee.steps.docling_extractor_step import DoclingExtractor
-from patee.steps.csv_extractor_step import CsvExtractor
-from patee.steps.noop_processor_step import NoopProcessorStep
-from patee.steps.human_in_the_loop_processor_step import HumanInTheLoopProcessorStep
-from patee.steps.text_writer_processor_step import TextWriterProcessorStep
+
+logger = logging.getLogger(__name__)
+
+
+STEPS_ENTRY_POINT_GROUP = "patee.steps"
+
+# Step types mapped to the path of their classes, so a step module is only imported when the step is built
+DEFAULT_STEPS: dict[str, str] = {
+    # Extractors
+    "text_extractor": "patee.steps.text_extractor_step:TextReaderExtractor",
+    "docling_extractor": "patee.steps.docling_extractor_step:DoclingExtractor",
+    "csv_extractor": "patee.steps.csv_extractor_step:CsvExtractor",
+    # Processors
+    "noop": "patee.steps.noop_processor_step:NoopProcessorStep",
+    "human_in_the_loop": "patee.steps.human_in_the_loop_processor_step:HumanInTheLoopProcessorStep",
+    "sentence_segmenter": "patee.steps.sentence_segmenter_step:SentenceSegmenterStep",
+    "gale_church_aligner": "patee.steps.gale_church_aligner_step:GaleChurchAlignerStep",
+    "minhash_deduplicator": "patee.steps.minhash_deduplicator_step:MinHashDeduplicatorStep",
+    # Persisters
+    "write_to_file": "patee.steps.text_writer_processor_step:TextWriterProcessorStep",
+    "write_to_shards": "patee.steps.sharded_writer_step:ShardedWriterStep",
+}
 
 
 class DefaultStepsBuilder(StepsBuilder):
+    """Build the default steps and the steps registered by other packages in the patee.steps entry point group.
+
+    The step classes are imported on their first build.
+    """
+
     def __init__(self):
         super().__init__()
-        self._supported_steps: set[str] = {
-            # Extractors
-            TextReaderExtractor.step_type(),
-            DoclingExtractor.step_type(),
-            CsvExtractor.step_type(),
-            # Processors
-            NoopProcessorStep.step_type(),
-            HumanInTheLoopProcessorStep.step_type(),
-            # Persisters
-            TextWriterProcessorStep.step_type(),
-        }
+        self._step_paths: dict[str, str] = dict(DEFAULT_STEPS)
+        self._entry_points: Union[dict[str, EntryPoint], None] = None
+        self._step_classes: dict[str, type[Step]] = {}
 
     def get_supported_step_types(self) -> set[str]:
-        return self._supported_steps
+        return set(self._step_paths).union(self._get_entry_points())
 
     def build(self, step_type: str, step_name: str, pipeline_contex: PipelineContext, **kwargs) -> Step:
-        # Extractors
-        if step_type == TextReaderExtractor.step_type():
-            return TextReaderExtractor(step_name, pipeline_contex, **kwargs)
-        elif step_type == DoclingExtractor.step_type():
-            return DoclingExtractor(step_name, pipeline_contex, **kwargs)
-        elif step_type == CsvExtractor.step_type():
-            return CsvExtractor(step_name, pipeline_contex, **kwargs)
-        # Processors
-        elif step_type == NoopProcessorStep.step_type():
-            return NoopProcessorStep(step_name, pipeline_contex, **kwargs)
-        elif step_type == HumanInTheLoopProcessorStep.step_type():
-            return HumanInTheLoopProcessorStep(step_name, pipeline_contex, **kwargs)
-        # Persisters
-        elif step_type == TextWriterProcessorStep.step_type():
-            return TextWriterProcessorStep(step_name, pipeline_contex, **kwargs)
+        step_class = self._get_step_class(step_type)
+        return step_class(step_name, pipeline_contex, **kwargs)
+
+    def _get_step_class(self, step_type: str) -> type[Step]:
+        step_class = self._step_classes.get(step_type)
+        if step_class is not None:
+            return step_class
+
+        step_path = self._step_paths.get(step_type)
+        if step_path is not None:
+            logger.debug("importing step %s from %s ...", step_type, step_path)
+            module_name, class_name = step_path.split(":")
+            step_class = getattr(importlib.import_module(module_name), class_name)
         else:
-            raise ValueError(f"Unsupported step: {step_type}")
+            entry_point = self._get_entry_points().get(step_type)
+            if entry_point is None:
+                raise ValueError(f"Unsupported step: {step_type}")
+
+            logger.debug("importing step %s from entry point %s ...", step_type, entry_point.value)
+            step_class = entry_point.load()
+
+        self._step_classes[step_type] = step_class
+        return step_class
+
+    def _get_entry_points(self) -> dict[str, EntryPoint]:
+        # The installed packages are only scanned when a step is not a default one
+        if self._entry_points is None:
+            self._entry_points = {
+                entry_point.name: entry_point
+                for entry_point in entry_points(group=STEPS_ENTRY_POINT_GROUP)
+                if entry_point.name not in self._step_paths
+            }
+        return self._entry_points
@@ -1,12 +1,29 @@
+import asyncio
 import logging
+import sys
+import time
 from abc import abstractmethod, ABC
+from concurrent.futures import Executor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Union
+from typing import Union, Iterator
 
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+from .checkpoint_formats import CheckpointFormat, MappedTextBlocks, get_checkpoint_format
+from .checkpoint_manifest import CheckpointManifest, COMPLETED_STATUS, STOPPED_STATUS
 from .core_types import PipelineContext, RunContext
 from .step_types import (
     ParallelExtractStep,
     ParallelProcessStep,
+    AsyncParallelExtractStep,
+    AsyncParallelProcessStep,
+    StreamingProcessStep,
+    BlockPair,
+    iter_windows,
     StepContext,
     StepMetadata,
     DocumentPairContext,
@@ -19,134 +36,348 @@ from .input_types import MonolingualSingleFilePair, MultilingualSingleFile
 logger = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True)
+class StepMetrics:
+    name: str
+    type: str
+    skipped: bool
+    wall_time_seconds: float
+    cpu_time_seconds: float
+    peak_rss_delta_bytes: int
+    input_blocks: int
+    # Size of the text blocks in UTF-8 bytes
+    input_bytes: int
+    output_blocks: int
+    output_bytes: int
+
+
 class StepsExecutor(ABC):
-    @abstractmethod
+    def __init__(self, pipeline_context: PipelineContext, run_context: RunContext):
+        self._pipeline_context = pipeline_context
+        self._run_context = run_context
+        self.step_metrics: list[StepMetrics] = []
+
     def execute_step(self, step: Union[ParallelExtractStep, ParallelProcessStep], metadata: StepMetadata,
                      source: Union[MonolingualSingleFilePair, MultilingualSingleFile, DocumentPairContext]) -> StepResult:
+        meter = _StepMeter()
+
+        result = self._load_previous_result(step, metadata, source)
+        if result is None:
+            logger.info("start executing %s step in %s mode...", step.name, self._mode_name())
+
+            context = self._create_step_context(step)
+            result = self._run_step(step, context, source)
+            self._save_result(step, metadata, result)
+
+        metrics = self._record_metrics(meter, metadata, source, result)
+
+        logger.info("%s step executed in %.3f seconds.", step.name, metrics.wall_time_seconds)
+
+        return result
+
+    async def aexecute_step(self, step: Union[ParallelExtractStep, ParallelProcessStep], metadata: StepMetadata,
+                            source: Union[MonolingualSingleFilePair, MultilingualSingleFile, DocumentPairContext],
+                            blocking_executor: Union[Executor, None] = None) -> StepResult:
+        """Execute the step without blocking the event loop. Sync steps and checkpoints run in blocking_executor,
+        the default executor of the loop when not provided."""
+        loop = asyncio.get_running_loop()
+
+        if not isinstance(step, (AsyncParallelExtractStep, AsyncParallelProcessStep)):
+            return await loop.run_in_executor(blocking_executor, self.execute_step, step, metadata, source)
+
+        meter = _StepMeter()
+
+        result = await loop.run_in_executor(blocking_executor, self._load_previous_result, step, metadata, source)
+        if result is None:
+            logger.info("start executing %s async step in %s mode...", step.name, self._mode_name())
+
+            context = await loop.run_in_executor(blocking_executor, self._create_step_context, step)
+            result = await self._arun_step(step, context, source)
+            await loop.run_in_executor(blocking_executor, self._save_result, step, metadata, result)
+
+        metrics = self._record_metrics(meter, metadata, source, result)
+
+        logger.info("%s async step executed in %.3f seconds.", step.name, metrics.wall_time_seconds)
+
+        return result
+
+    @staticmethod
+    @abstractmethod
+    def _mode_name() -> str:
+        pass
+
+    def close(self) -> None:
+        """Release the resources of the run."""
         pass
 
+    def _load_previous_result(self, step: Union[ParallelExtractStep, ParallelProcessStep], metadata: StepMetadata,
+                              source: Union[MonolingualSingleFilePair, MultilingualSingleFile, DocumentPairContext],
+                              ) -> Union[StepResult, None]:
+        """Return the result of a previous execution of the step to reuse, if any."""
+        return None
+
+    @abstractmethod
+    def _create_step_context(self, step: Union[ParallelExtractStep, ParallelProcessStep]) -> StepContext:
+        pass
+
+    @abstractmethod
+    def _save_result(self, step: Union[ParallelExtractStep, ParallelProcessStep], metadata: StepMetadata,
+                     result: StepResult) -> None:
+        pass
+
+    @abstractmethod
+    def execute_streaming_steps(self, steps: list[tuple[StreamingProcessStep, StepMetadata]],
+                                source: DocumentPairContext) -> StepResult:
+        pass
+
+    @staticmethod
+    def _run_step(step: Union[ParallelExtractStep, ParallelProcessStep], context: StepContext,
+                  source: Union[MonolingualSingleFilePair, MultilingualSingleFile, DocumentPairContext]) -> StepResult:
+        if isinstance(step, ParallelExtractStep) and not isinstance(source, DocumentPairContext):
+            return step.extract(context, source)
+        elif isinstance(step, ParallelProcessStep) and isinstance(source, DocumentPairContext):
+            return step.process(context, source)
+        else:
+            raise ValueError("step must be a subclass of either ParallelExtractStep or ParallelProcessStep")
+
+    @staticmethod
+    async def _arun_step(step: Union[AsyncParallelExtractStep, AsyncParallelProcessStep], context: StepContext,
+                         source: Union[MonolingualSingleFilePair, MultilingualSingleFile, DocumentPairContext],
+                         ) -> StepResult:
+        if isinstance(step, AsyncParallelExtractStep) and not isinstance(source, DocumentPairContext):
+            return await step.aextract(context, source)
+        elif isinstance(step, AsyncParallelProcessStep) and isinstance(source, DocumentPairContext):
+            return await step.aprocess(context, source)
+        else:
+            raise ValueError("step must be a subclass of either AsyncParallelExtractStep or AsyncParallelProcessStep")
+
+    def _record_metrics(self, meter: "_StepMeter", metadata: StepMetadata,
+                        source: Union[MonolingualSingleFilePair, MultilingualSingleFile, DocumentPairContext],
+                        result: StepResult) -> StepMetrics:
+        metrics = meter.finish(metadata, source, result)
+        self.step_metrics.append(metrics)
+        return metrics
+
+    def _stream_steps(self, steps: list[tuple[StreamingProcessStep, StepMetadata]], source: DocumentPairContext,
+                      step_dirs: list[Union[Path, None]],
+                      checkpoint_format: Union[CheckpointFormat, None]) -> StepResult:
+        """Chain the streaming steps and consume the resulting pairs of text blocks window by window."""
+        document_1 = source.document_1.source
+        document_2 = source.document_2.source
+        step_names = ", ".join(step.name for step, _ in steps)
+
+        logger.info("start executing %s steps as a stream...", step_names)
+
+        start_wall_time = time.perf_counter()
+        start_peak_rss = _get_peak_rss_bytes()
+
+        # Every step pulls the pairs of text blocks from the previous one
+        meters = [_BlockStreamMeter(source.iter_block_pairs())]
+        for (step, _), step_dir in zip(steps, step_dirs):
+            context = StepContext(
+                pipeline_context=self._pipeline_context,
+                run_context=self._run_context,
+                step_dir=step_dir,
+            )
+            meters.append(_BlockStreamMeter(step.process_blocks(context, document_1, document_2, iter(meters[-1]))))
+
+        if checkpoint_format is None:
+            result_context = DocumentPairContext.from_block_pairs(document_1, document_2, meters[-1])
+        else:
+            last_step_dir = step_dirs[-1]
+            with checkpoint_format.open_writer(document_1, last_step_dir) as writer_1, \
+                    checkpoint_format.open_writer(document_2, last_step_dir) as writer_2:
+                for window in iter_windows(meters[-1], self._pipeline_context.streaming_window):
+                    for block_1, block_2 in window:
+                        if block_1 is not None:
+                            writer_1.write_block(block_1)
+                        if block_2 is not None:
+                            writer_2.write_block(block_2)
+
+            result_context = checkpoint_format.load_pair(document_1, document_2, last_step_dir)
+
+        # The time spent consuming the stream is accounted to the last step
+        consumer_wall_time = time.perf_counter() - start_wall_time - meters[-1].wall_time_seconds
+        for idx, (step, metadata) in enumerate(steps):
+            input_meter = meters[idx]
+            output_meter = meters[idx + 1]
+            is_last_step = idx == len(steps) - 1
+            self.step_metrics.append(StepMetrics(
+                name=metadata.name,
+                type=metadata.type,
+                skipped=False,
+                wall_time_seconds=output_meter.wall_time_seconds - input_meter.wall_time_seconds
+                                  + (consumer_wall_time if is_last_step else 0),
+                cpu_time_seconds=output_meter.cpu_time_seconds - input_meter.cpu_time_seconds,
+                peak_rss_delta_bytes=_get_peak_rss_bytes() - start_peak_rss if is_last_step else 0,
+                input_blocks=input_meter.blocks,
+                input_bytes=input_meter.bytes,
+                output_blocks=output_meter.blocks,
+                output_bytes=output_meter.bytes,
+            ))
+
+        logger.info("%s steps executed as a stream in %.3f seconds.",
+                    step_names, time.perf_counter() - start_wall_time)
+
+        return StepResult(context=result_context)
+
 
 class NonPersistentStepsExecutor(StepsExecutor):
     def __init__(self, pipeline_context: PipelineContext, run_context: RunContext):
-        self._pipeline_context = pipeline_context
-        self._run_context = run_context
+        super().__init__(pipeline_context, run_context)
 
-    def execute_step(self, step: Union[ParallelExtractStep, ParallelProcessStep], metadata: StepMetadata,
-                     source: Union[MonolingualSingleFilePair, MultilingualSingleFile, DocumentPairContext]) -> StepResult:
-        logger.info("start executing %s step in non persistent mode...", step.name)
+    @staticmethod
+    def _mode_name() -> str:
+        return "non persistent"
 
-        context = StepContext(
+    def _create_step_context(self, step: Union[ParallelExtractStep, ParallelProcessStep]) -> StepContext:
+        return StepContext(
             pipeline_context=self._pipeline_context,
             run_context=self._run_context,
             step_dir=None
         )
 
-        if isinstance(step, ParallelExtractStep) and not isinstance(source, DocumentPairContext):
-            result = step.extract(context, source)
-        elif isinstance(step, ParallelProcessStep) and isinstance(source, DocumentPairContext):
-            result = step.process(context, source)
-        else:
-            raise ValueError("step must be a subclass of either ParallelExtractStep or ParallelProcessStep")
+    def _save_result(self, step: Union[ParallelExtractStep, ParallelProcessStep], metadata: StepMetadata,
+                     result: StepResult) -> None:
+        pass
 
-        logger.info("%s step executed in %s seconds.", step.name, 0)
-        return result
+    def execute_streaming_steps(self, steps: list[tuple[StreamingProcessStep, StepMetadata]],
+                                source: DocumentPairContext) -> StepResult:
+        return self._stream_steps(steps, source, [None] * len(steps), None)
 
 
 class PersistentStepsExecutor(StepsExecutor):
     def __init__(self, pipeline_context: PipelineContext, run_context: RunContext):
-        self._pipeline_context = pipeline_context
-        self._run_context = run_context
+        super().__init__(pipeline_context, run_context)
+        self._checkpoint_format = get_checkpoint_format(pipeline_context.checkpoint_format)
 
-    def execute_step(self, step: Union[ParallelExtractStep, ParallelProcessStep], metadata: StepMetadata,
-                     source: Union[MonolingualSingleFilePair, MultilingualSingleFile, DocumentPairContext]) -> StepResult:
+        # The checkpoints and their files are recorded in the manifest, so they can be reused by resumable runs and
+        # evicted by the checkpoint cache. The run protects the checkpoints of the source from eviction until closed
+        self._manifest = CheckpointManifest(self._run_context.output_dir)
+        self._run_id: Union[int, None] = self._manifest.begin_run(self._run_context.source_hash)
+
+    @staticmethod
+    def _mode_name() -> str:
+        return "persistent"
+
+    def close(self) -> None:
+        if self._run_id is not None:
+            self._manifest.end_run(self._run_id)
+            self._run_id = None
+
+    def _create_step_context(self, step: Union[ParallelExtractStep, ParallelProcessStep]) -> StepContext:
         step_dir = self._run_context.output_dir / step.name
         step_dir.mkdir(parents=True, exist_ok=True)
 
-        logger.info("start executing %s step in persistent mode...", step.name)
-
-        context = StepContext(
+        return StepContext(
             pipeline_context=self._pipeline_context,
             run_context=self._run_context,
-            step_dir=step_dir
+            step_dir=step_dir,
         )
 
-        if isinstance(step, ParallelExtractStep) and not isinstance(source, DocumentPairContext):
-            result = step.extract(context, source)
-        elif isinstance(step, ParallelProcessStep) and isinstance(source, DocumentPairContext):
-            result = step.process(context, source)
+    def _save_result(self, step: Union[ParallelExtractStep, ParallelProcessStep], metadata: StepMetadata,
+                     result: StepResult) -> None:
+        # Only completed steps can be reused, stopped steps must run again
+        if not result.should_stop_pipeline:
+            step_dir = self._run_context.output_dir / step.name
+            self._checkpoint_format.dump_pair(result.context, step_dir)
+            self._save_checkpoint(step, metadata, COMPLETED_STATUS, result.context, step_dir)
         else:
-            raise ValueError("step must be a subclass of either ParallelExtractStep or ParallelProcessStep")
+            self._save_checkpoint(step, metadata, STOPPED_STATUS)
 
-        if not result.should_stop_pipeline:
-            result.context.dump_to(step_dir)
+    def execute_streaming_steps(self, steps: list[tuple[StreamingProcessStep, StepMetadata]],
+                                source: DocumentPairContext) -> StepResult:
+        step_dirs = _create_step_dirs(self._run_context.output_dir, steps)
+        result = self._stream_steps(steps, source, step_dirs, self._checkpoint_format)
 
-        logger.info("%s step executed in %s seconds.", step.name, 0)
+        # Only the result of the last step of the stream is persisted
+        last_step, last_metadata = steps[-1]
+        self._save_checkpoint(last_step, last_metadata, COMPLETED_STATUS, result.context, step_dirs[-1])
 
         return result
 
+    def _save_checkpoint(self, step: Union[ParallelExtractStep, ParallelProcessStep], metadata: StepMetadata,
+                         status: str, context: Union[DocumentPairContext, None] = None,
+                         step_dir: Union[Path, None] = None) -> None:
+        file_paths = []
+        if context is not None:
+            file_paths = self._checkpoint_format.pair_file_paths(
+                context.document_1.source, context.document_2.source, step_dir)
+
+        self._manifest.save_checkpoint(
+            self._run_context.source_hash, step.name, metadata.digest(), status, file_paths,
+            self._checkpoint_format.format_name())
+
+    def _has_checkpoint(self, step_name: str, step_key: str) -> bool:
+        # Checkpoints written in other format can not be loaded
+        return self._manifest.has_checkpoint(
+            self._run_context.source_hash, step_name, step_key,
+            checkpoint_format=self._checkpoint_format.format_name())
 
-class IntelligentPersistenceStepsExecutor(StepsExecutor):
+
+class IntelligentPersistenceStepsExecutor(PersistentStepsExecutor):
     def __init__(self,  pipeline_context: PipelineContext, run_context: RunContext):
-        self._pipeline_context = pipeline_context
-        self._run_context = run_context
-        self.source_has_been_previously_executed = False
+        super().__init__(pipeline_context, run_context)
 
-        main_marker_file = self._run_context.output_dir / ".patee"
-        self._validate_directory(self._run_context.output_dir, main_marker_file, self._run_context.source_hash)
+        self.source_has_been_previously_executed = self._manifest.register_source(self._run_context.source_hash)
 
-    def execute_step(self, step: Union[ParallelExtractStep, ParallelProcessStep], metadata: StepMetadata,
-                     source: Union[MonolingualSingleFilePair, MultilingualSingleFile, DocumentPairContext]) -> StepResult:
+        if self.source_has_been_previously_executed:
+            logger.info("the source with hash %s has been executed before in %s",
+                        self._run_context.source_hash, self._run_context.output_dir)
+        else:
+            logger.info("the source with hash %s has not been executed before in %s",
+                        self._run_context.source_hash, self._run_context.output_dir)
+
+    def _load_previous_result(self, step: Union[ParallelExtractStep, ParallelProcessStep], metadata: StepMetadata,
+                              source: Union[MonolingualSingleFilePair, MultilingualSingleFile, DocumentPairContext],
+                              ) -> Union[StepResult, None]:
         step_dir = self._run_context.output_dir / step.name
-        step_dir.mkdir(parents=True, exist_ok=True)
-        step_marker_file = step_dir / ".patee"
-        source_step_hash = f"{self._run_context.source_hash}--{hash(metadata)}"
+        step_key = metadata.digest()
 
-        has_been_executed, open_mode = self._has_been_executed(step_marker_file, source_step_hash)
+        if not self._has_checkpoint(step.name, step_key):
+            return None
 
-        if has_been_executed:
+        logger.info(
+            "the step %s with key %s have already been executed in %s. Skipping...",
+            step.name, step_key, step_dir)
+
+        return self._load_result_from_previous_execution(source, step, metadata)
+
+    def execute_streaming_steps(self, steps: list[tuple[StreamingProcessStep, StepMetadata]],
+                                source: DocumentPairContext) -> StepResult:
+        # Only the result of the last step of the stream is persisted
+        last_step, last_metadata = steps[-1]
+        step_key = last_metadata.digest()
+
+        if self._has_checkpoint(last_step.name, step_key):
             logger.info(
-                "the step %s with hash %s have already been executed in %s. Skipping...",
-                step.name, source_step_hash, step_dir)
+                "the step %s with key %s have already been executed. Skipping stream...", last_step.name, step_key)
 
-            result = self._load_result_from_previous_execution(source, step_dir)
+            meter = _StepMeter()
+            result = self._load_result_from_previous_execution(source, last_step, last_metadata)
+            for _, metadata in steps:
+                self._record_metrics(meter, metadata, source, result)
 
             return result
-        else:
-            logger.info("start executing %s step in persistent mode...", step.name)
 
-            context = StepContext(
-                pipeline_context=self._pipeline_context,
-                run_context=self._run_context,
-                step_dir=step_dir,
-            )
+        return super().execute_streaming_steps(steps, source)
 
-            if isinstance(step, ParallelExtractStep) and not isinstance(source, DocumentPairContext):
-                result = step.extract(context, source)
-            elif isinstance(step, ParallelProcessStep) and isinstance(source, DocumentPairContext):
-                result = step.process(context, source)
-            else:
-                raise ValueError("step must be a subclass of either ParallelExtractStep or ParallelProcessStep")
+    def has_checkpoint(self, step: Union[ParallelExtractStep, ParallelProcessStep], metadata: StepMetadata) -> bool:
+        """Check if the result of the step for the current source has been persisted by a previous execution."""
+        return self._has_checkpoint(step.name, metadata.digest())
 
-            if not result.should_stop_pipeline:
-                result.context.dump_to(step_dir)
+    def load_checkpoint(self, step: Union[ParallelExtractStep, ParallelProcessStep], metadata: StepMetadata,
+                        source: Union[MonolingualSingleFilePair, MultilingualSingleFile]) -> StepResult:
+        """Load the persisted result of the step for the current source without executing it."""
+        logger.info("loading checkpoint of %s step from %s ...", step.name, self._run_context.output_dir / step.name)
 
-            # Save the hash of the source step to the marker file
-            with step_marker_file.open(open_mode, encoding="utf-8") as f:
-                f.write(source_step_hash + "\n")
+        meter = _StepMeter()
 
-            logger.info("%s step executed in %s seconds", step.name, 0)
+        result = self._load_result_from_previous_execution(source, step, metadata)
 
-            return result
+        self._record_metrics(meter, metadata, source, result)
 
-    @staticmethod
-    def _has_been_executed(step_marker_file: Path, source_step_hash: str) -> (bool, str):
-        if step_marker_file.exists():
-            for existing_hash in step_marker_file.read_text(encoding="utf-8").splitlines():
-                if existing_hash == source_step_hash:
-                    return True, "a"
-            return False, "a"
-        else:
-            return False, "w"
+        return result
 
     @staticmethod
     def _get_document_sources(
@@ -167,32 +398,112 @@ class IntelligentPersistenceStepsExecutor(StepsExecutor):
         else:
             raise ValueError("Unknown source type")
 
-    def _validate_directory(self, base_dir: Path, main_marker_file: Path, source_hash: str):
-        has_been_executed, open_mode = self._has_been_executed(main_marker_file, source_hash)
-        if has_been_executed:
-            logger.info("the source with hash %s has been executed before in %s", source_hash, base_dir)
-            self.source_has_been_previously_executed = True
-        else:
-            logger.info("the source with hash %s has not been executed before in %s", source_hash, base_dir)
-            self.source_has_been_previously_executed = False
-
-        with main_marker_file.open(open_mode, encoding="utf-8") as f:
-            f.write(source_hash + "\n")
-
-
-    def _load_result_from_previous_execution(self, source, step_dir: Path) -> StepResult:
+    def _load_result_from_previous_execution(self, source, step: Union[ParallelExtractStep, ParallelProcessStep],
+                                             metadata: StepMetadata) -> StepResult:
+        step_dir = self._run_context.output_dir / step.name
         document_1_source, document_2_source = self._get_document_sources(source)
 
-        logger.debug("reading document 1 ...")
-        document_1_context = document_1_source.create_context_executed_step(step_dir)
-        logger.debug("reading document 2 ...")
-        document_2_context = document_2_source.create_context_executed_step(step_dir)
+        # Recently used checkpoints are the last ones evicted by the checkpoint cache
+        self._manifest.touch_checkpoint(self._run_context.source_hash, step.name, metadata.digest())
 
+        logger.debug("reading documents in %s format ...", self._checkpoint_format.format_name())
         result = StepResult(
-            context=DocumentPairContext(
-                document_1=document_1_context,
-                document_2=document_2_context,
-            ),
+            context=self._checkpoint_format.load_pair(document_1_source, document_2_source, step_dir),
             skipped=True,
         )
         return result
+
+
+class _StepMeter:
+    """Measure the resources used by a step from its creation until finished."""
+
+    def __init__(self):
+        self._start_wall_time = time.perf_counter()
+        self._start_cpu_time = time.process_time()
+        self._start_peak_rss = _get_peak_rss_bytes()
+
+    def finish(self, metadata: StepMetadata,
+               source: Union[MonolingualSingleFilePair, MultilingualSingleFile, DocumentPairContext],
+               result: StepResult) -> StepMetrics:
+        input_blocks, input_bytes = _count_blocks_and_bytes(source)
+        output_blocks, output_bytes = _count_blocks_and_bytes(result.context)
+
+        return StepMetrics(
+            name=metadata.name,
+            type=metadata.type,
+            skipped=result.skipped,
+            wall_time_seconds=time.perf_counter() - self._start_wall_time,
+            cpu_time_seconds=time.process_time() - self._start_cpu_time,
+            peak_rss_delta_bytes=_get_peak_rss_bytes() - self._start_peak_rss,
+            input_blocks=input_blocks,
+            input_bytes=input_bytes,
+            output_blocks=output_blocks,
+            output_bytes=output_bytes,
+        )
+
+
+def _get_peak_rss_bytes() -> int:
+    if resource is None:
+        return 0
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux
+    return peak_rss if sys.platform == "darwin" else peak_rss * 1024
+
+
+def _count_blocks_and_bytes(
+        source: Union[MonolingualSingleFilePair, MultilingualSingleFile, DocumentPairContext, None]) -> (int, int):
+    if not isinstance(source, DocumentPairContext):
+        return 0, 0
+
+    blocks = 0
+    size_bytes = 0
+    for document in (source.document_1, source.document_2):
+        blocks += len(document.text_blocks)
+        if isinstance(document.text_blocks, MappedTextBlocks):
+            # Lazily loaded blocks are not decoded to be measured
+            size_bytes += document.text_blocks.encoded_size
+        else:
+            size_bytes += sum(len(block.encode("utf-8")) for block in document.text_blocks)
+
+    return blocks, size_bytes
+
+
+class _BlockStreamMeter:
+    """Measure the time spent producing a stream of pairs of text blocks and count them."""
+
+    def __init__(self, blocks: Iterator[BlockPair]):
+        self._blocks = blocks
+        self.wall_time_seconds = 0.0
+        self.cpu_time_seconds = 0.0
+        self.blocks = 0
+        self.bytes = 0
+
+    def __iter__(self) -> Iterator[BlockPair]:
+        blocks = self._blocks
+        while True:
+            start_wall_time = time.perf_counter()
+            start_cpu_time = time.process_time()
+            pair = next(blocks, None)
+            self.wall_time_seconds += time.perf_counter() - start_wall_time
+            self.cpu_time_seconds += time.process_time() - start_cpu_time
+
+            if pair is None:
+                return
+
+            for block in pair:
+                if block is not None:
+                    self.blocks += 1
+                    self.bytes += len(block.encode("utf-8"))
+
+            yield pair
+
+
+def _create_step_dirs(output_dir: Path, steps: list[tuple[StreamingProcessStep, StepMetadata]]) -> list[Path]:
+    step_dirs = []
+    for step, _ in steps:
+        step_dir = output_dir / step.name
+        step_dir.mkdir(parents=True, exist_ok=True)
+        step_dirs.append(step_dir)
+
+    return step_dirs
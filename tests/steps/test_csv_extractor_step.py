@@ -0,0 +1,111 @@
+import pandas as pd
+import pytest
+
+from patee.input_types import MultilingualSingleFile
+from patee.step_types import StepContext
+from patee.steps.csv_extractor_step import CsvExtractor
+from tests.utils.mothers.contexts import get_pipeline_context, get_run_context
+from tests.utils.mothers.sources import TSV_FILE
+
+
+def _get_step_context() -> StepContext:
+    return StepContext(
+        pipeline_context=get_pipeline_context(),
+        run_context=get_run_context(output_dir=None),
+        step_dir=None,
+    )
+
+
+class TestCsvExtractor:
+    def test_csv_default_instance(self):
+        context = get_pipeline_context()
+        extractor = CsvExtractor("csv_extractor", context)
+
+        assert extractor.name == "csv_extractor"
+        assert extractor.delimiter is None
+        assert extractor.header
+        assert extractor.columns is None
+        assert extractor.chunksize is None
+
+    def test_csv_instance_with_invalid_columns(self):
+        context = get_pipeline_context()
+
+        with pytest.raises(ValueError, match="columns must contain exactly two column names"):
+            CsvExtractor("csv_extractor", context, **{"columns": ["en"]})
+
+    def test_csv_instance_with_invalid_chunksize(self):
+        context = get_pipeline_context()
+
+        with pytest.raises(ValueError, match="chunksize must be a positive integer"):
+            CsvExtractor("csv_extractor", context, **{"chunksize": 0})
+
+    def test_csv_instance_with_column_positions_and_header(self):
+        context = get_pipeline_context()
+
+        with pytest.raises(ValueError, match="columns must be column names when the file has a header"):
+            CsvExtractor("csv_extractor", context, **{"columns": [0, 1]})
+
+    def test_csv_extractor_selects_language_columns(self):
+        extractor = CsvExtractor("csv_extractor", get_pipeline_context())
+        source = MultilingualSingleFile(document_path=TSV_FILE, iso2_languages=["en", "es"])
+
+        result = extractor.extract(_get_step_context(), source)
+
+        expected = pd.read_csv(TSV_FILE, sep="\t", dtype=str)
+        assert result.context.document_1.source.iso2_language == "en"
+        assert result.context.document_1.text_blocks == expected["en"].tolist()
+        assert result.context.document_2.source.iso2_language == "es"
+        assert result.context.document_2.text_blocks == expected["es"].tolist()
+
+    def test_csv_extractor_selects_explicit_columns(self):
+        extractor = CsvExtractor("csv_extractor", get_pipeline_context(), **{"columns": ["es", "idiom"]})
+        source = MultilingualSingleFile(document_path=TSV_FILE, iso2_languages=["es", "en"])
+
+        result = extractor.extract(_get_step_context(), source)
+
+        expected = pd.read_csv(TSV_FILE, sep="\t", dtype=str)
+        assert result.context.document_1.text_blocks == expected["es"].tolist()
+        assert result.context.document_2.text_blocks == expected["idiom"].tolist()
+
+    def test_csv_extractor_reads_in_chunks(self):
+        source = MultilingualSingleFile(document_path=TSV_FILE, iso2_languages=["en", "es"])
+        extractor = CsvExtractor("csv_extractor", get_pipeline_context())
+        chunked_extractor = CsvExtractor("csv_extractor", get_pipeline_context(), **{"chunksize": 7})
+
+        result = extractor.extract(_get_step_context(), source)
+        chunked_result = chunked_extractor.extract(_get_step_context(), source)
+
+        assert chunked_result.context == result.context
+
+    def test_csv_extractor_selects_column_positions_without_header(self, tmp_path):
+        csv_path = tmp_path / "sentences.csv"
+        csv_path.write_text("1,hello,hola\n2,bye,adiós\n", encoding="utf-8")
+        extractor = CsvExtractor("csv_extractor", get_pipeline_context(), **{"header": False, "columns": [2, 1]})
+        source = MultilingualSingleFile(document_path=csv_path, iso2_languages=["es", "en"])
+
+        result = extractor.extract(_get_step_context(), source)
+
+        assert result.context.document_1.text_blocks == ["hola", "adiós"]
+        assert result.context.document_2.text_blocks == ["hello", "bye"]
+
+    def test_csv_extractor_without_header(self, tmp_path):
+        csv_path = tmp_path / "sentences.csv"
+        csv_path.write_text("hello,hola\nNA,\n\"one, two\",\"uno, dos\"\n", encoding="utf-8")
+        extractor = CsvExtractor("csv_extractor", get_pipeline_context(), **{"header": False})
+        source = MultilingualSingleFile(document_path=csv_path, iso2_languages=["en", "es"])
+
+        result = extractor.extract(_get_step_context(), source)
+
+        assert result.context.document_1.text_blocks == ["hello", "NA", "one, two"]
+        assert result.context.document_2.text_blocks == ["hola", "", "uno, dos"]
+
+    def test_csv_extractor_with_explicit_delimiter(self, tmp_path):
+        csv_path = tmp_path / "sentences.txt"
+        csv_path.write_text("source;target\nhello;hola\n", encoding="utf-8")
+        extractor = CsvExtractor("csv_extractor", get_pipeline_context(), **{"delimiter": ";"})
+        source = MultilingualSingleFile(document_path=csv_path, iso2_languages=["en", "es"])
+
+        result = extractor.extract(_get_step_context(), source)
+
+        assert result.context.document_1.text_blocks == ["hello"]
+        assert result.context.document_2.text_blocks == ["hola"]
@@ -1,8 +1,18 @@
+from concurrent.futures import Future
 from pathlib import Path
 
+import pytest
+
+from patee.input_types import PageInfo
 from patee.step_types import StepContext
-from patee.steps.docling_extractor_step import DoclingExtractor
-from tests.utils.mothers.sources import get_existing_monolingual_single_file_pair
+from patee.steps import docling_extractor_step
+from patee.steps.docling_extractor_step import DoclingExtractor, DoclingConversionCache, _DoclingElement
+from tests.utils.mothers.sources import (
+    get_existing_monolingual_single_file_pair,
+    get_existing_monolingual_single_file,
+    PDF_ES_FILE,
+    TXT_ES_FILE,
+)
 from tests.utils.mothers.contexts import get_pipeline_context, get_run_context
 
 OUT_DIR = Path(__file__).parent / "out" / "docling_extractor"
@@ -48,6 +58,142 @@ class TestDoclingExtractor:
         assert extractor.parser == "docling"
         assert extractor.labels_to_extract == { "text", "list_item"}
 
+    def test_docling_instance_with_concurrent_extraction(self):
+        context = get_pipeline_context()
+        extractor = DoclingExtractor("docling_extractor", context, **{"concurrent": True})
+
+        assert extractor.name == "docling_extractor"
+        assert extractor.concurrent
+
+    def test_docling_instance_with_page_workers(self):
+        context = get_pipeline_context()
+        extractor = DoclingExtractor("docling_extractor", context, **{"page_workers": 4, "pages_per_chunk": 5})
+
+        assert extractor.page_workers == 4
+        assert extractor.pages_per_chunk == 5
+
+    def test_docling_close_shuts_down_the_pool(self):
+        context = get_pipeline_context()
+        extractor = DoclingExtractor("docling_extractor", context, **{"page_workers": 2})
+        pool = extractor._get_pool()
+
+        extractor.close()
+
+        assert extractor._pool is None
+        with pytest.raises(RuntimeError):
+            pool.submit(int)
+
+    def test_docling_instance_with_invalid_page_workers(self):
+        context = get_pipeline_context()
+
+        with pytest.raises(ValueError, match="page_workers must be a positive integer"):
+            DoclingExtractor("docling_extractor", context, **{"page_workers": 0})
+
+    def test_docling_page_ranges_without_page_info(self):
+        page_ranges = docling_extractor_step._get_page_ranges(PDF_ES_FILE, None)
+
+        assert page_ranges == [None]
+
+    def test_docling_page_ranges_skip_excluded_pages(self):
+        page_info = PageInfo(start_page=3, end_page=20, pages_to_exclude={3, 7, 8, 15, 20})
+
+        page_ranges = docling_extractor_step._get_page_ranges(PDF_ES_FILE, page_info)
+
+        assert page_ranges == [(4, 6), (9, 14), (16, 19)]
+
+    def test_docling_page_ranges_of_non_pdf_document(self):
+        page_info = PageInfo(start_page=1, end_page=10, pages_to_exclude={5})
+
+        page_ranges = docling_extractor_step._get_page_ranges(TXT_ES_FILE, page_info)
+
+        assert page_ranges == [(1, 10)]
+
+    def test_docling_split_page_ranges_of_whole_document(self):
+        page_ranges = docling_extractor_step._split_page_ranges(PDF_ES_FILE, [None], 10)
+
+        assert page_ranges == [(1, 10), (11, 20), (21, 30), (31, 40)]
+
+    def test_docling_split_page_ranges_of_sub_ranges(self):
+        page_ranges = docling_extractor_step._split_page_ranges(PDF_ES_FILE, [(3, 4), (6, 14), (38, 100)], 5)
+
+        assert page_ranges == [(3, 4), (6, 10), (11, 14), (38, 40)]
+
+    def test_docling_split_page_ranges_of_non_pdf_document(self):
+        page_ranges = docling_extractor_step._split_page_ranges(TXT_ES_FILE, [None], 10)
+
+        assert page_ranges == [None]
+
+    def test_docling_filter_without_page_info(self):
+        context = get_pipeline_context()
+        extractor = DoclingExtractor("docling_extractor", context)
+        file = get_existing_monolingual_single_file()
+
+        result = extractor._filter_elements(file, None, [_DoclingElement(1, "text", "one")])
+
+        assert result.extracted_text == [("text", "one")]
+
+    def test_docling_conversion_cache_round_trip(self, tmp_path):
+        cache = DoclingConversionCache(tmp_path / "cache")
+        key = cache.get_key(PDF_ES_FILE, None, "docling", False)
+        elements = [_DoclingElement(1, "text", "one"), _DoclingElement(2, "section_header", "dos")]
+
+        assert cache.load(key) is None
+
+        cache.save(key, elements)
+
+        assert cache.load(key) == elements
+        assert key != cache.get_key(PDF_ES_FILE, None, "pypdfium", False)
+        assert key != cache.get_key(PDF_ES_FILE, PageInfo(start_page=1, end_page=4), "docling", False)
+
+    def test_docling_extractor_filters_cached_conversion(self, tmp_path):
+        context = get_pipeline_context()
+        source = get_existing_monolingual_single_file_pair()
+        source.shared_config = PageInfo(start_page=1, end_page=4, pages_to_exclude={3})
+        cache = DoclingConversionCache(tmp_path)
+        for file in (source.document_1, source.document_2):
+            cache.save(cache.get_key(file.document_path, source.shared_config, "docling", False), [
+                _DoclingElement(1, "text", "one"),
+                _DoclingElement(2, "section_header", "two"),
+                _DoclingElement(3, "text", "three"),
+                _DoclingElement(4, "text", "four"),
+            ])
+        step_context = StepContext(
+            pipeline_context=context,
+            run_context=get_run_context(output_dir=None),
+            step_dir=None
+        )
+
+        text_result = DoclingExtractor("docling_extractor", context, **{"conversion_cache_dir": tmp_path}).extract(
+            step_context, source)
+        header_result = DoclingExtractor("docling_extractor", context, **{
+            "conversion_cache_dir": tmp_path, "labels_to_extract": "section_header"}).extract(step_context, source)
+
+        assert text_result.context.document_1.text_blocks == ["one", "four"]
+        assert header_result.context.document_2.text_blocks == ["two"]
+
+    def test_docling_instances_share_converter(self):
+        context = get_pipeline_context()
+        extractor_1 = DoclingExtractor("docling_extractor_1", context)
+        extractor_2 = DoclingExtractor("docling_extractor_2", context, **{"labels_to_extract": "list_item"})
+        pypdfium_extractor = DoclingExtractor("docling_extractor_3", context, **{"parser": "pypdfium"})
+
+        assert extractor_1._converter is extractor_2._converter
+        assert extractor_1._converter is not pypdfium_extractor._converter
+
+    def test_docling_warm_up_loads_models_once(self, monkeypatch):
+        calls = []
+        converter = docling_extractor_step.get_converter("pypdfium", do_ocr=True)
+        monkeypatch.setattr(converter, "initialize_pipeline", lambda input_format: calls.append(input_format))
+        monkeypatch.setattr(docling_extractor_step, "_warm_converters", set())
+
+        context = get_pipeline_context()
+        extractor = DoclingExtractor("docling_extractor", context, **{"parser": "pypdfium", "do_ocr": True,
+                                                                      "warm_up": True})
+        extractor.warm_up()
+
+        assert extractor._converter is converter
+        assert len(calls) == 1
+
     def test_docling_extractor_can_process(self):
         context = get_pipeline_context()
         extractor = DoclingExtractor("docling_extractor", context)
@@ -0,0 +1,158 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from patee.step_types import StepContext, DocumentPairContext, DocumentContext, DocumentSource
+from patee.steps.gale_church_aligner_step import (
+    GaleChurchAlignerStep,
+    align_block_lengths,
+    BEAD_PRIORS,
+    DEFAULT_VARIANCE,
+    _length_costs,
+)
+from tests.utils.mothers.contexts import get_pipeline_context, get_run_context
+from tests.utils.mothers.sources import PDF_ES_FILE, PDF_CA_FILE
+
+
+def _get_step_context() -> StepContext:
+    return StepContext(
+        pipeline_context=get_pipeline_context(),
+        run_context=get_run_context(output_dir=None),
+        step_dir=None,
+    )
+
+
+def _get_pair_context(blocks_1: list[str], blocks_2: list[str]) -> DocumentPairContext:
+    return DocumentPairContext(
+        document_1=DocumentContext(
+            source=DocumentSource(document_path=PDF_ES_FILE, iso2_language="es"),
+            text_blocks=blocks_1,
+            extra={},
+        ),
+        document_2=DocumentContext(
+            source=DocumentSource(document_path=PDF_CA_FILE, iso2_language="ca"),
+            text_blocks=blocks_2,
+            extra={},
+        ),
+    )
+
+
+def _align_without_band(lengths_1: list[int], lengths_2: list[int]) -> list[tuple[int, int]]:
+    length_ratio = sum(lengths_2) / sum(lengths_1)
+    costs = {(0, 0): (0.0, None)}
+    for i in range(len(lengths_1) + 1):
+        for j in range(len(lengths_2) + 1):
+            for bead, prior in BEAD_PRIORS.items():
+                previous = (i - bead[0], j - bead[1])
+                if previous not in costs:
+                    continue
+                length_1 = sum(lengths_1[previous[0]:i])
+                length_2 = sum(lengths_2[previous[1]:j])
+                cost = costs[previous][0] + float(
+                    _length_costs(length_1, np.array([length_2]), length_ratio, DEFAULT_VARIANCE)[0]) - math.log(prior)
+                if (i, j) not in costs or cost < costs[(i, j)][0]:
+                    costs[(i, j)] = (cost, bead)
+
+    beads = []
+    i, j = len(lengths_1), len(lengths_2)
+    while i > 0 or j > 0:
+        bead = costs[(i, j)][1]
+        beads.append(bead)
+        i, j = i - bead[0], j - bead[1]
+    return list(reversed(beads))
+
+
+class TestGaleChurchAlignerStep:
+    def test_aligner_default_instance(self):
+        context = get_pipeline_context()
+        aligner = GaleChurchAlignerStep("aligner", context)
+
+        assert aligner.name == "aligner"
+        assert aligner.band_width == 100
+        assert aligner.length_ratio is None
+        assert not aligner.keep_unaligned
+
+    def test_aligner_instance_with_invalid_band_width(self):
+        context = get_pipeline_context()
+
+        with pytest.raises(ValueError, match="band_width must be an integer greater than 1"):
+            GaleChurchAlignerStep("aligner", context, **{"band_width": 1})
+
+    def test_align_block_lengths_one_to_one(self):
+        beads = align_block_lengths([10, 20, 30], [11, 19, 31])
+
+        assert beads == [(1, 1), (1, 1), (1, 1)]
+
+    def test_align_block_lengths_with_split_and_merged_blocks(self):
+        beads = align_block_lengths([10, 40, 30, 20, 20, 50], [10, 20, 19, 30, 41, 50])
+
+        assert beads == [(1, 1), (1, 2), (1, 1), (2, 1), (1, 1)]
+
+    def test_align_block_lengths_of_empty_documents(self):
+        assert align_block_lengths([], [5, 5]) == [(0, 1), (0, 1)]
+        assert align_block_lengths([3], []) == [(1, 0)]
+        assert align_block_lengths([], []) == []
+
+    def test_align_block_lengths_of_an_empty_document_against_a_long_one(self):
+        assert align_block_lengths([], [10] * 500) == [(0, 1)] * 500
+        assert align_block_lengths([10] * 500, []) == [(1, 0)] * 500
+
+    def test_align_block_lengths_matches_alignment_without_band(self):
+        randomizer = random.Random(7)
+        for _ in range(5):
+            lengths_1 = [randomizer.randint(5, 120) for _ in range(40)]
+            lengths_2 = []
+            for length in lengths_1:
+                if randomizer.random() < 0.1:
+                    lengths_2.extend([length // 2, length - length // 2])
+                elif randomizer.random() < 0.05:
+                    continue
+                else:
+                    lengths_2.append(max(1, int(length * 1.2 + randomizer.gauss(0, 3))))
+
+            assert align_block_lengths(lengths_1, lengths_2, band_width=50) == _align_without_band(
+                lengths_1, lengths_2)
+
+    def test_align_block_lengths_of_long_documents(self):
+        randomizer = random.Random(3)
+        lengths_1 = [randomizer.randint(20, 200) for _ in range(5000)]
+        lengths_2 = [length + randomizer.randint(-2, 2) for length in lengths_1]
+
+        beads = align_block_lengths(lengths_1, lengths_2, band_width=10)
+
+        assert beads == [(1, 1)] * 5000
+
+    def test_aligner_can_process(self):
+        aligner = GaleChurchAlignerStep("aligner", get_pipeline_context())
+        source = _get_pair_context(
+            ["Primera frase.", "Una frase larga que el otro documento divide en dos frases distintas.", "Fin."],
+            ["Primera frase.", "Una frase llarga que l'altre document", "divideix en dues frases diferents.", "Fi."],
+        )
+
+        result = aligner.process(_get_step_context(), source)
+
+        assert result.context.document_1.text_blocks == [
+            "Primera frase.", "Una frase larga que el otro documento divide en dos frases distintas.", "Fin."]
+        assert result.context.document_2.text_blocks == [
+            "Primera frase.", "Una frase llarga que l'altre document divideix en dues frases diferents.", "Fi."]
+        assert result.context.document_1.extra["beads"] == {"1-1": 2, "1-2": 1}
+
+    def test_aligner_drops_unaligned_blocks(self):
+        aligner = GaleChurchAlignerStep("aligner", get_pipeline_context())
+        source = _get_pair_context([], ["Primera frase.", "Fi."])
+
+        result = aligner.process(_get_step_context(), source)
+
+        assert result.context.document_1.text_blocks == []
+        assert result.context.document_2.text_blocks == []
+
+    def test_aligner_can_keep_unaligned_blocks(self):
+        aligner = GaleChurchAlignerStep("aligner", get_pipeline_context(), **{"keep_unaligned": True})
+        source = _get_pair_context([], ["Primera frase.", "Fi."])
+
+        result = aligner.process(_get_step_context(), source)
+
+        assert result.context.document_1.text_blocks == ["", ""]
+        assert result.context.document_2.text_blocks == ["Primera frase.", "Fi."]
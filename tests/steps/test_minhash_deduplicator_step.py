@@ -0,0 +1,146 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from patee.step_types import StepContext, DocumentPairContext, DocumentContext, DocumentSource
+from patee.steps.minhash_deduplicator_step import MinHashDeduplicatorStep, MinHasher, MinHashLshIndex, optimal_bands
+from tests.utils.mothers.contexts import get_pipeline_context, get_run_context
+from tests.utils.mothers.sources import PDF_ES_FILE, PDF_CA_FILE
+
+
+def _get_step_context(source_hash: str = "123456") -> StepContext:
+    return StepContext(
+        pipeline_context=get_pipeline_context(),
+        run_context=get_run_context(output_dir=None, source_hash=source_hash),
+        step_dir=None,
+    )
+
+
+def _get_pair_context(blocks_1: list[str], blocks_2: list[str]) -> DocumentPairContext:
+    return DocumentPairContext(
+        document_1=DocumentContext(
+            source=DocumentSource(document_path=PDF_ES_FILE, iso2_language="es"),
+            text_blocks=blocks_1,
+            extra={},
+        ),
+        document_2=DocumentContext(
+            source=DocumentSource(document_path=PDF_CA_FILE, iso2_language="ca"),
+            text_blocks=blocks_2,
+            extra={},
+        ),
+    )
+
+
+BLOCKS_1 = [
+    "El plan de formación se revisará cada año por la comisión de seguimiento.",
+    "Las personas participantes recibirán un certificado al finalizar el curso.",
+    "El  plan de formación se revisará cada año por la comisión de seguimiento",
+    "La inscripción se realizará a través de la sede electrónica.",
+]
+BLOCKS_2 = [
+    "El pla de formació es revisarà cada any per la comissió de seguiment.",
+    "Les persones participants rebran un certificat en finalitzar el curs.",
+    "El pla de formació es revisarà cada any per la comissió de seguiment",
+    "La inscripció es farà a través de la seu electrònica.",
+]
+
+
+class TestMinHashDeduplicatorStep:
+    def test_deduplicator_default_instance(self):
+        deduplicator = MinHashDeduplicatorStep("dedup", get_pipeline_context())
+
+        assert deduplicator.name == "dedup"
+        assert deduplicator.threshold == 0.8
+        assert deduplicator.num_perm == 128
+        assert deduplicator.bands == optimal_bands(0.8, 128)
+        assert deduplicator.index_path is None
+
+    def test_deduplicator_instance_with_invalid_bands(self):
+        with pytest.raises(ValueError, match="bands must be a positive divisor of num_perm"):
+            MinHashDeduplicatorStep("dedup", get_pipeline_context(), **{"num_perm": 128, "bands": 3})
+
+    def test_deduplicator_removes_near_duplicates(self):
+        deduplicator = MinHashDeduplicatorStep("dedup", get_pipeline_context(), **{"batch_size": 2})
+
+        result = deduplicator.process(_get_step_context(), _get_pair_context(BLOCKS_1, BLOCKS_2))
+
+        assert result.context.document_1.text_blocks == [BLOCKS_1[0], BLOCKS_1[1], BLOCKS_1[3]]
+        assert result.context.document_2.text_blocks == [BLOCKS_2[0], BLOCKS_2[1], BLOCKS_2[3]]
+
+    def test_deduplicator_keeps_pairs_with_different_translations(self):
+        deduplicator = MinHashDeduplicatorStep("dedup", get_pipeline_context())
+        blocks_2 = [BLOCKS_2[0], BLOCKS_2[1], BLOCKS_2[3], BLOCKS_2[1]]
+
+        result = deduplicator.process(_get_step_context(), _get_pair_context(BLOCKS_1, blocks_2))
+
+        assert result.context.document_1.text_blocks == BLOCKS_1
+
+    def test_deduplicator_with_index_dir_compares_with_other_sources(self, tmp_path: Path):
+        deduplicator = MinHashDeduplicatorStep("dedup", get_pipeline_context(), **{"index_dir": str(tmp_path)})
+
+        first = deduplicator.process(_get_step_context("source_1"), _get_pair_context(BLOCKS_1[:2], BLOCKS_2[:2]))
+        second = deduplicator.process(_get_step_context("source_2"), _get_pair_context(BLOCKS_1[2:], BLOCKS_2[2:]))
+
+        assert first.context.document_1.text_blocks == BLOCKS_1[:2]
+        assert second.context.document_1.text_blocks == [BLOCKS_1[3]]
+        assert (tmp_path / "minhash_lsh.sqlite3").is_file()
+
+    def test_deduplicator_with_index_dir_can_rerun_a_source(self, tmp_path: Path):
+        deduplicator = MinHashDeduplicatorStep("dedup", get_pipeline_context(), **{"index_dir": str(tmp_path)})
+
+        deduplicator.process(_get_step_context("source_1"), _get_pair_context(BLOCKS_1, BLOCKS_2))
+        rerun = deduplicator.process(_get_step_context("source_1"), _get_pair_context(BLOCKS_1, BLOCKS_2))
+
+        assert rerun.context.document_1.text_blocks == [BLOCKS_1[0], BLOCKS_1[1], BLOCKS_1[3]]
+
+    def test_deduplicator_with_index_dir_reads_candidates_removed_by_other_process(self, tmp_path: Path, monkeypatch):
+        deduplicator = MinHashDeduplicatorStep("dedup", get_pipeline_context(), **{"index_dir": str(tmp_path)})
+        deduplicator.process(_get_step_context("source_1"), _get_pair_context(BLOCKS_1[:1], BLOCKS_2[:1]))
+
+        get_signatures = MinHashLshIndex.get_signatures
+
+        def remove_source_before_get_signatures(self, ids):
+            # Other process reruns source_1 between reading the candidates and their signatures
+            other_index = MinHashLshIndex(deduplicator.index_path, deduplicator.hasher.description())
+            other_index.remove_source("source_1")
+            other_index.close()
+            return get_signatures(self, ids)
+
+        monkeypatch.setattr(MinHashLshIndex, "get_signatures", remove_source_before_get_signatures)
+
+        result = deduplicator.process(_get_step_context("source_2"), _get_pair_context(BLOCKS_1[2:], BLOCKS_2[2:]))
+
+        assert result.context.document_1.text_blocks == [BLOCKS_1[3]]
+
+    def test_deduplicator_with_index_of_other_parameters(self, tmp_path: Path):
+        deduplicator = MinHashDeduplicatorStep("dedup", get_pipeline_context(), **{"index_dir": str(tmp_path)})
+        deduplicator.process(_get_step_context(), _get_pair_context(BLOCKS_1, BLOCKS_2))
+        other = MinHashDeduplicatorStep("dedup", get_pipeline_context(), **{
+            "index_dir": str(tmp_path), "num_perm": 64})
+
+        with pytest.raises(ValueError, match="was built with other num_perm"):
+            other.process(_get_step_context(), _get_pair_context(BLOCKS_1, BLOCKS_2))
+
+
+class TestMinHasher:
+    def test_signatures_estimate_jaccard_similarity(self):
+        hasher = MinHasher(num_perm=256, bands=32, shingle_size=3)
+        # 3-shingles of "abcdefgh" and "abcdefgx": 5 shared of 7
+        signatures = hasher.signatures(["abcdefgh", "abcdefgx", "", "zyxwvuts"])
+
+        assert signatures.shape == (4, 256)
+        assert abs(np.mean(signatures[0] == signatures[1]) - 5 / 7) < 0.1
+        assert np.mean(signatures[0] == signatures[3]) < 0.05
+
+    def test_signatures_are_independent_of_the_batch(self):
+        hasher = MinHasher(num_perm=64, bands=8, shingle_size=5)
+
+        batch = hasher.signatures(BLOCKS_1)
+        single = hasher.signatures([BLOCKS_1[1]])
+
+        assert np.array_equal(batch[1], single[0])
+        assert np.array_equal(hasher.band_keys(batch)[1], hasher.band_keys(single)[0])
+
+    def test_optimal_bands_grow_when_threshold_decreases(self):
+        assert optimal_bands(0.5, 128) > optimal_bands(0.9, 128)
@@ -35,4 +35,26 @@ class TestNoopProcessorStep:
 
         default_text_blocks = get_default_text_blocks()
         assert result.context.document_1.text_blocks == default_text_blocks
-        assert result.context.document_2.text_blocks == default_text_blocks
\ No newline at end of file
+        assert result.context.document_2.text_blocks == default_text_blocks
+
+    def test_noop_can_process_blocks(self):
+        context = get_pipeline_context()
+        extractor = NoopProcessorStep("no-op", context)
+        pipeline_context = get_pipeline_context()
+        run_context = get_run_context(output_dir=None)
+
+        step_result = get_step_result()
+        context = StepContext(
+            pipeline_context=pipeline_context,
+            run_context=run_context,
+            step_dir=None,
+        )
+
+        blocks = extractor.process_blocks(
+            context,
+            step_result.context.document_1.source,
+            step_result.context.document_2.source,
+            step_result.context.iter_block_pairs())
+
+        default_text_blocks = get_default_text_blocks()
+        assert list(blocks) == list(zip(default_text_blocks, default_text_blocks))
@@ -0,0 +1,98 @@
+import pytest
+
+from patee.step_types import StepContext, DocumentPairContext, DocumentContext, DocumentSource
+from patee.steps.sentence_segmenter_step import SentenceSegmenterStep, segment_text
+from tests.utils.mothers.contexts import get_pipeline_context, get_run_context
+from tests.utils.mothers.sources import PDF_ES_FILE, PDF_CA_FILE
+
+
+def _get_step_context() -> StepContext:
+    return StepContext(
+        pipeline_context=get_pipeline_context(),
+        run_context=get_run_context(output_dir=None),
+        step_dir=None,
+    )
+
+
+def _get_pair_context(blocks_1: list[str], blocks_2: list[str]) -> DocumentPairContext:
+    return DocumentPairContext(
+        document_1=DocumentContext(
+            source=DocumentSource(document_path=PDF_ES_FILE, iso2_language="es"),
+            text_blocks=blocks_1,
+            extra={},
+        ),
+        document_2=DocumentContext(
+            source=DocumentSource(document_path=PDF_CA_FILE, iso2_language="ca"),
+            text_blocks=blocks_2,
+            extra={},
+        ),
+    )
+
+
+class TestSentenceSegmenterStep:
+    def test_segmenter_default_instance(self):
+        context = get_pipeline_context()
+        segmenter = SentenceSegmenterStep("segmenter", context)
+
+        assert segmenter.name == "segmenter"
+        assert segmenter.batch_size == 1024
+        assert segmenter.workers == 1
+
+    def test_segmenter_instance_with_invalid_workers(self):
+        context = get_pipeline_context()
+
+        with pytest.raises(ValueError, match="workers must be a positive integer"):
+            SentenceSegmenterStep("segmenter", context, **{"workers": 0})
+
+    def test_segment_text_with_language_abbreviations(self):
+        sentences = segment_text("Hola Sr. García. ¿Cómo está? Vivo en EE. UU. desde 2010. \"Adiós.\" Fin", "es")
+
+        assert sentences == ["Hola Sr. García.", "¿Cómo está?", "Vivo en EE. UU. desde 2010.", "\"Adiós.\"", "Fin"]
+
+    def test_segment_text_with_initials_and_paragraphs(self):
+        sentences = segment_text("Mr. J. Smith went to the U.S. yesterday. He said \"hi!\" Then\nleft.\n\nDone", "en")
+
+        assert sentences == ["Mr. J. Smith went to the U.S. yesterday.", "He said \"hi!\"", "Then left.", "Done"]
+
+    def test_segment_text_does_not_split_before_lowercase(self):
+        sentences = segment_text("Esperó... y luego se fue. Adiós", "es")
+
+        assert sentences == ["Esperó... y luego se fue.", "Adiós"]
+
+    def test_segmenter_can_process(self):
+        segmenter = SentenceSegmenterStep("segmenter", get_pipeline_context(), **{"batch_size": 1})
+        source = _get_pair_context(
+            ["Primera frase. Segunda frase.", "Tercera frase, pág. 3."],
+            ["Primera frase. Segona frase. Tercera frase, pàg. 3."],
+        )
+
+        result = segmenter.process(_get_step_context(), source)
+
+        assert result.context.document_1.text_blocks == ["Primera frase.", "Segunda frase.", "Tercera frase, pág. 3."]
+        assert result.context.document_2.text_blocks == ["Primera frase.", "Segona frase.", "Tercera frase, pàg. 3."]
+
+    def test_segmenter_can_process_with_worker_processes(self):
+        segmenter = SentenceSegmenterStep("segmenter", get_pipeline_context(), **{"batch_size": 2, "workers": 2})
+        blocks = [f"Frase {idx}. Otra frase {idx}." for idx in range(10)]
+        source = _get_pair_context(blocks, blocks)
+
+        result = segmenter.process(_get_step_context(), source)
+
+        assert result.context.document_1.text_blocks == [
+            sentence for idx in range(10) for sentence in (f"Frase {idx}.", f"Otra frase {idx}.")]
+
+    def test_segmenter_close_shuts_down_the_pool(self):
+        segmenter = SentenceSegmenterStep("segmenter", get_pipeline_context(), **{"workers": 2})
+        source = _get_pair_context(["Frase uno. Frase dos."], ["Frase una. Frase dos."])
+        segmenter.process(_get_step_context(), source)
+        pool = segmenter._pool
+
+        segmenter.close()
+
+        assert segmenter._pool is None
+        with pytest.raises(RuntimeError):
+            pool.submit(int)
+
+        result = segmenter.process(_get_step_context(), source)
+        assert result.context.document_1.text_blocks == ["Frase uno.", "Frase dos."]
+        segmenter.close()
@@ -0,0 +1,63 @@
+from pathlib import Path
+
+import pytest
+
+from patee import Patee
+from patee.corpus_writers import read_shard_index
+from patee.step_types import StepContext
+from patee.steps.sharded_writer_step import ShardedWriterStep
+from tests.utils.mothers.contexts import get_pipeline_context, get_run_context
+from tests.utils.mothers.sources import get_step_result, get_existing_monolingual_single_file_pair
+
+
+def _get_step_context(source_hash: str) -> StepContext:
+    return StepContext(
+        pipeline_context=get_pipeline_context(),
+        run_context=get_run_context(output_dir=None, source_hash=source_hash),
+        step_dir=None,
+    )
+
+
+class TestShardedWriterStep:
+    def test_writer_instance_with_unsupported_format(self, tmp_path: Path):
+        with pytest.raises(ValueError, match="Unsupported shard format"):
+            ShardedWriterStep("save", get_pipeline_context(), **{"output_path": str(tmp_path), "format": "text"})
+
+    def test_writer_can_process_many_sources(self, tmp_path: Path):
+        writer = ShardedWriterStep("save", get_pipeline_context(), **{"output_path": str(tmp_path)})
+        step_result = get_step_result()
+
+        for source_hash in ("source_1", "source_2"):
+            result = writer.process(_get_step_context(source_hash), step_result.context)
+            assert result.context == step_result.context
+        writer.close()
+
+        [shard] = read_shard_index(tmp_path).values()
+        assert shard.finalized
+        assert shard.sources == ["source_1", "source_2"]
+        assert shard.pairs == 2 * len(list(step_result.context.iter_block_pairs()))
+
+    def test_writer_shards_are_finalized_when_worker_processes_exit(self, tmp_path: Path):
+        shards_dir = tmp_path / "shards"
+        shards_dir.mkdir()
+        config_path = tmp_path / "pipeline.yml"
+        config_path.write_text(
+            "version: 1.0\n"
+            "steps:\n"
+            "  - type: text_extractor\n"
+            "    name: load\n"
+            "  - type: write_to_shards\n"
+            "    name: save\n"
+            "    config:\n"
+            f"      output_path: {shards_dir.as_posix()}\n"
+        )
+        patee = Patee.load_from(config_path)
+        sources = [get_existing_monolingual_single_file_pair("txt") for _ in range(4)]
+
+        result = patee.run_many(sources, workers=2)
+
+        assert all(run_result.status == "succeeded" for run_result in result.results)
+        shards = read_shard_index(shards_dir)
+        assert all(shard.finalized for shard in shards.values())
+        assert sum(len(shard.sources) for shard in shards.values()) == 4
+        assert not list(shards_dir.glob("*.open"))
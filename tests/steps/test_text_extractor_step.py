@@ -33,4 +33,23 @@ class TestTextReaderExtractor:
         result.context.dump_to(OUT_DIR)
 
         assert result.context.document_1.text_blocks is not None
-        assert result.context.document_2.text_blocks is not None
\ No newline at end of file
+        assert result.context.document_2.text_blocks is not None
+
+    def test_text_reader_extractor_can_process_concurrently(self):
+        context = get_pipeline_context()
+        extractor = TextReaderExtractor("text_reader_extractor", context, **{"concurrent": True})
+        pipeline_context = get_pipeline_context()
+        run_context = get_run_context(output_dir=None)
+
+        source = get_existing_monolingual_single_file_pair(mode="txt")
+        context = StepContext(
+            pipeline_context=pipeline_context,
+            run_context=run_context,
+            step_dir=None,
+        )
+
+        result = extractor.extract(context, source)
+
+        assert extractor.concurrent
+        assert result.context.document_1.text_blocks == [source.document_1.document_path.read_text(encoding="utf-8")]
+        assert result.context.document_2.text_blocks == [source.document_2.document_path.read_text(encoding="utf-8")]
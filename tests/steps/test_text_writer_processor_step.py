@@ -0,0 +1,78 @@
+import gzip
+from pathlib import Path
+
+import pytest
+
+from patee.input_types import MultilingualSingleFile
+from patee.step_types import StepContext, DocumentPairContext, DocumentContext, DocumentSource
+from patee.steps.text_writer_processor_step import TextWriterProcessorStep
+from tests.utils.mothers.contexts import get_pipeline_context, get_run_context
+from tests.utils.mothers.sources import get_step_result, get_default_text_blocks, TSV_FILE
+
+
+def _get_step_context() -> StepContext:
+    return StepContext(
+        pipeline_context=get_pipeline_context(),
+        run_context=get_run_context(output_dir=None),
+        step_dir=None,
+    )
+
+
+class TestTextWriterProcessorStep:
+    def test_writer_instance_with_missing_output_path(self, tmp_path: Path):
+        with pytest.raises(ValueError, match="output_path does not exist"):
+            TextWriterProcessorStep("save", get_pipeline_context(), **{"output_path": str(tmp_path / "missing")})
+
+    def test_writer_instance_with_unsupported_format(self, tmp_path: Path):
+        with pytest.raises(ValueError, match="Unsupported format"):
+            TextWriterProcessorStep("save", get_pipeline_context(), **{"output_path": str(tmp_path), "format": "xml"})
+
+    def test_writer_can_process_with_blocks_separator(self, tmp_path: Path):
+        writer = TextWriterProcessorStep("save", get_pipeline_context(), **{
+            "output_path": str(tmp_path), "blocks_separator": "\n\n"})
+        step_result = get_step_result()
+
+        result = writer.process(_get_step_context(), step_result.context)
+
+        assert result.context == step_result.context
+        document_1_path = tmp_path / f"{step_result.context.document_1.source.document_path.stem}.txt"
+        assert document_1_path.read_text(encoding="utf-8") == "\n\n".join(get_default_text_blocks())
+
+    def test_writer_honors_block_separator_of_previous_versions(self, tmp_path: Path):
+        writer = TextWriterProcessorStep("save", get_pipeline_context(), **{
+            "output_path": str(tmp_path), "block_separator": "|"})
+        step_result = get_step_result()
+
+        writer.process(_get_step_context(), step_result.context)
+
+        document_2_path = tmp_path / f"{step_result.context.document_2.source.document_path.stem}.txt"
+        assert document_2_path.read_text(encoding="utf-8") == "|".join(get_default_text_blocks())
+
+    def test_writer_can_process_a_multilingual_file(self, tmp_path: Path):
+        writer = TextWriterProcessorStep("save", get_pipeline_context(), **{"output_path": str(tmp_path)})
+        source = MultilingualSingleFile(document_path=TSV_FILE, iso2_languages=["en", "es"])
+        context = DocumentPairContext(
+            document_1=DocumentContext(DocumentSource.from_multilingual_file(source, 0), ["hello", "world"], {}),
+            document_2=DocumentContext(DocumentSource.from_multilingual_file(source, 1), ["hola", "mundo"], {}),
+        )
+
+        writer.process(_get_step_context(), context)
+
+        assert (tmp_path / f"{TSV_FILE.stem}_en.txt").read_text(encoding="utf-8") == "hello\nworld"
+        assert (tmp_path / f"{TSV_FILE.stem}_es.txt").read_text(encoding="utf-8") == "hola\nmundo"
+
+    def test_writer_can_process_blocks_to_compressed_tsv(self, tmp_path: Path):
+        writer = TextWriterProcessorStep("save", get_pipeline_context(), **{
+            "output_path": str(tmp_path), "format": "tsv", "compression": "gzip"})
+        step_result = get_step_result()
+        document_1 = step_result.context.document_1.source
+        document_2 = step_result.context.document_2.source
+
+        blocks = list(writer.process_blocks(_get_step_context(), document_1, document_2,
+                                            step_result.context.iter_block_pairs()))
+
+        assert blocks == list(step_result.context.iter_block_pairs())
+        [file_path] = list(tmp_path.iterdir())
+        assert file_path.name.endswith(".tsv.gz")
+        with gzip.open(file_path, "rt", encoding="utf-8") as f:
+            assert len(f.read().splitlines()) == len(blocks)
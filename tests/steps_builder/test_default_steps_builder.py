@@ -1,12 +1,21 @@
+import subprocess
+import sys
+from importlib.metadata import EntryPoint
+
 import pytest
 
 from patee.steps.csv_extractor_step import CsvExtractor
 from patee.steps.docling_extractor_step import DoclingExtractor
+from patee.steps.gale_church_aligner_step import GaleChurchAlignerStep
 from patee.steps.human_in_the_loop_processor_step import HumanInTheLoopProcessorStep
+from patee.steps.minhash_deduplicator_step import MinHashDeduplicatorStep
 from patee.steps.noop_processor_step import NoopProcessorStep
+from patee.steps.sentence_segmenter_step import SentenceSegmenterStep
+from patee.steps.sharded_writer_step import ShardedWriterStep
 from patee.steps.text_extractor_step import TextReaderExtractor
 from patee.steps.text_writer_processor_step import TextWriterProcessorStep
-from patee.steps_builder.default_steps_builder import DefaultStepsBuilder
+from patee.steps_builder import default_steps_builder
+from patee.steps_builder.default_steps_builder import DefaultStepsBuilder, STEPS_ENTRY_POINT_GROUP
 from tests.utils.mothers.contexts import get_pipeline_context
 
 
@@ -21,7 +30,11 @@ class TestDefaultStepsBuilder:
             "csv_extractor",
             "noop",
             "human_in_the_loop",
+            "sentence_segmenter",
+            "gale_church_aligner",
+            "minhash_deduplicator",
             "write_to_file",
+            "write_to_shards",
         }
         assert self.builder.get_supported_step_types() == expected_types
 
@@ -60,6 +73,27 @@ class TestDefaultStepsBuilder:
         assert isinstance(step, HumanInTheLoopProcessorStep)
         assert step.name == "hitl"
 
+    def test_build_sentence_segmenter_step(self):
+        context = get_pipeline_context()
+        step = self.builder.build("sentence_segmenter", "segment", context)
+
+        assert isinstance(step, SentenceSegmenterStep)
+        assert step.name == "segment"
+
+    def test_build_gale_church_aligner_step(self):
+        context = get_pipeline_context()
+        step = self.builder.build("gale_church_aligner", "align", context)
+
+        assert isinstance(step, GaleChurchAlignerStep)
+        assert step.name == "align"
+
+    def test_build_minhash_deduplicator_step(self):
+        context = get_pipeline_context()
+        step = self.builder.build("minhash_deduplicator", "dedup", context)
+
+        assert isinstance(step, MinHashDeduplicatorStep)
+        assert step.name == "dedup"
+
     def test_build_write_to_file_step(self):
         context = get_pipeline_context()
         step = self.builder.build("write_to_file", "save", context)
@@ -67,7 +101,44 @@ class TestDefaultStepsBuilder:
         assert isinstance(step, TextWriterProcessorStep)
         assert step.name == "save"
 
+    def test_build_write_to_shards_step(self):
+        context = get_pipeline_context()
+        step = self.builder.build("write_to_shards", "save", context)
+
+        assert isinstance(step, ShardedWriterStep)
+        assert step.name == "save"
+
     def test_build_unsupported_step(self):
         context = get_pipeline_context()
         with pytest.raises(ValueError, match=r"Unsupported step: unknown_step"):
             self.builder.build("unknown_step", "test_step", context)
+
+
+    def test_build_entry_point_step(self, monkeypatch):
+        from tests.utils.fakes.step_fakes import FakeProcessor
+
+        registered = [
+            EntryPoint(name="text_fake", value="tests.utils.fakes.step_fakes:FakeProcessor",
+                       group=STEPS_ENTRY_POINT_GROUP),
+        ]
+        monkeypatch.setattr(default_steps_builder, "entry_points", lambda group: registered)
+        builder = DefaultStepsBuilder()
+        context = get_pipeline_context()
+
+        step = builder.build("text_fake", "fake", context)
+
+        assert "text_fake" in builder.get_supported_step_types()
+        assert isinstance(step, FakeProcessor)
+
+    def test_build_does_not_import_other_steps(self):
+        code = (
+            "import sys\n"
+            "from patee.steps_builder.default_steps_builder import DefaultStepsBuilder\n"
+            "from tests.utils.mothers.contexts import get_pipeline_context\n"
+            "DefaultStepsBuilder().build('text_extractor', 'text_reader', get_pipeline_context())\n"
+            "print(','.join(m for m in ('docling', 'pandas') if m in sys.modules))\n"
+        )
+
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+
+        assert output.stdout.strip() == ""
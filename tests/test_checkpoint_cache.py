@@ -0,0 +1,111 @@
+import json
+import time
+from pathlib import Path
+
+import pytest
+
+from patee.checkpoint_cache import CheckpointCache, parse_size, parse_age, main
+from patee.checkpoint_manifest import CheckpointManifest
+from patee.digests import source_digest
+from patee.patee import Patee
+from tests.utils.fakes.step_fakes import FakeStepsBuilder
+from tests.utils.mothers.sources import get_existing_monolingual_single_file_pair, PIPELINES_DIR
+
+FAKES_CONFIG = PIPELINES_DIR / "just_for_tests.yml"
+
+
+def _save_checkpoint(out_dir: Path, source_hash: str, step_name: str, size_bytes: int) -> Path:
+    manifest = CheckpointManifest(out_dir)
+    file_path = out_dir / step_name / f"{source_hash}.txt"
+    file_path.parent.mkdir(exist_ok=True)
+    file_path.write_bytes(b"x" * size_bytes)
+    manifest.save_checkpoint(source_hash, step_name, "step_key", file_paths=[file_path])
+    # Distinct access times for the least recently used order
+    time.sleep(0.01)
+    return file_path
+
+
+class TestCheckpointCache:
+    def test_collect_evicts_least_recently_used_beyond_size(self, tmp_path):
+        oldest = _save_checkpoint(tmp_path, "source_1", "00_extract", 100)
+        touched = _save_checkpoint(tmp_path, "source_2", "00_extract", 100)
+        newest = _save_checkpoint(tmp_path, "source_3", "00_extract", 100)
+        CheckpointManifest(tmp_path).touch_checkpoint("source_2", "00_extract", "step_key")
+
+        result = CheckpointCache(tmp_path, max_bytes=150).collect()
+
+        assert result.evicted_checkpoints == 2
+        assert result.freed_bytes == 200
+        assert result.kept_bytes == 100
+        assert not oldest.exists()
+        assert not newest.exists()
+        assert touched.exists()
+        assert not CheckpointManifest(tmp_path).has_checkpoint("source_1", "00_extract", "step_key")
+
+    def test_collect_evicts_by_age(self, tmp_path):
+        old = _save_checkpoint(tmp_path, "source_1", "00_extract", 10)
+        time.sleep(0.2)
+        recent = _save_checkpoint(tmp_path, "source_2", "00_extract", 10)
+
+        result = CheckpointCache(tmp_path, max_age_seconds=0.1).collect()
+
+        assert result.evicted_checkpoints == 1
+        assert not old.exists()
+        assert recent.exists()
+
+    def test_collect_keeps_protected_and_active_sources(self, tmp_path):
+        protected = _save_checkpoint(tmp_path, "source_1", "00_extract", 10)
+        active = _save_checkpoint(tmp_path, "source_2", "00_extract", 10)
+        CheckpointManifest(tmp_path).begin_run("source_2")
+
+        result = CheckpointCache(tmp_path, max_bytes=0).collect(protected_sources=["source_1"])
+
+        assert result.evicted_checkpoints == 0
+        assert protected.exists()
+        assert active.exists()
+
+    def test_collect_does_not_delete_files_written_again(self, tmp_path):
+        file_path = _save_checkpoint(tmp_path, "source_1", "00_extract", 10)
+        time.sleep(0.01)
+        file_path.write_bytes(b"written by another run")
+
+        CheckpointCache(tmp_path, max_bytes=0).collect()
+
+        assert file_path.exists()
+
+    def test_collect_dry_run(self, tmp_path):
+        file_path = _save_checkpoint(tmp_path, "source_1", "00_extract", 10)
+
+        result = CheckpointCache(tmp_path, max_bytes=0).collect(dry_run=True)
+
+        assert result.evicted_checkpoints == 1
+        assert file_path.exists()
+
+    def test_evicted_checkpoints_are_executed_again(self, tmp_path):
+        patee = Patee.load_from(FAKES_CONFIG, steps_builder=FakeStepsBuilder())
+        source = get_existing_monolingual_single_file_pair()
+        patee.run(source, tmp_path, resume=True)
+
+        cache = CheckpointCache(tmp_path, max_bytes=0)
+        assert all(checkpoint.size_bytes > 0 for checkpoint in cache.checkpoints())
+        cache.collect()
+        result = patee.run(source, tmp_path, resume=True)
+
+        assert result.executed_steps == frozenset({"00_extract", "01_process"})
+        assert not any(checkpoint.source_hash != source_digest(source) for checkpoint in cache.checkpoints())
+
+    def test_main(self, tmp_path, capsys):
+        _save_checkpoint(tmp_path, "source_1", "00_extract", 2048)
+
+        assert main([str(tmp_path), "--max-size", "1K"]) == 0
+
+        assert json.loads(capsys.readouterr().out)["freed_bytes"] == 2048
+
+    def test_parse_size_and_age(self):
+        assert parse_size("512") == 512
+        assert parse_size("10G") == 10 * 1024 ** 3
+        assert parse_size("1.5mb") == int(1.5 * 1024 ** 2)
+        assert parse_age("30d") == 30 * 24 * 60 * 60
+        assert parse_age("90") == 90
+        with pytest.raises(ValueError):
+            parse_size("ten")
@@ -0,0 +1,168 @@
+from pathlib import Path
+
+import pytest
+
+from patee.checkpoint_formats import (
+    TextCheckpointFormat,
+    BinaryCheckpointFormat,
+    MappedBinaryCheckpointFormat,
+    MappedTextBlocks,
+    get_checkpoint_format,
+)
+from patee.step_types import DocumentSource, DocumentContext, DocumentPairContext, TEXT_BLOCK_SEPARATOR
+
+
+def _create_document(text_blocks: list[str], extra: dict = None) -> DocumentContext:
+    return DocumentContext(DocumentSource(Path("document.pdf"), "en"), text_blocks, extra or {})
+
+
+class TestGetCheckpointFormat:
+    def test_get_text_format(self):
+        assert isinstance(get_checkpoint_format("text"), TextCheckpointFormat)
+
+    def test_get_binary_format(self):
+        assert isinstance(get_checkpoint_format("binary"), BinaryCheckpointFormat)
+
+    def test_get_mapped_binary_format(self):
+        assert isinstance(get_checkpoint_format("mapped_binary"), MappedBinaryCheckpointFormat)
+
+    def test_get_unsupported_format(self):
+        with pytest.raises(ValueError, match="Unsupported checkpoint format: unknown"):
+            get_checkpoint_format("unknown")
+
+
+class TestTextCheckpointFormat:
+    def test_roundtrip(self, tmp_path):
+        document = _create_document(["Sample text content", "Another block of text"], {"lang": "en"})
+        checkpoint_format = TextCheckpointFormat()
+
+        checkpoint_format.dump(document, tmp_path)
+        loaded = checkpoint_format.load(document.source, tmp_path)
+
+        assert (tmp_path / "document.txt").exists()
+        assert loaded == document
+
+    def test_roundtrip_after_a_dump_with_extra(self, tmp_path):
+        checkpoint_format = TextCheckpointFormat()
+        checkpoint_format.dump(_create_document(["Sample text content"], {"seen_labels": ["text"]}), tmp_path)
+        document = _create_document(["Other text content"])
+
+        checkpoint_format.dump(document, tmp_path)
+        loaded = checkpoint_format.load(document.source, tmp_path)
+
+        assert loaded == document
+        assert not (tmp_path / "document_extra.json").exists()
+
+    def test_writer_roundtrip_after_a_dump_with_extra(self, tmp_path):
+        checkpoint_format = TextCheckpointFormat()
+        checkpoint_format.dump(_create_document(["Sample text content"], {"seen_labels": ["text"]}), tmp_path)
+        document = _create_document(["Other text content"])
+
+        writer = checkpoint_format.open_writer(document.source, tmp_path)
+        writer.write_block("Other text content")
+        writer.close()
+        loaded = checkpoint_format.load(document.source, tmp_path)
+
+        assert loaded == document
+        assert not (tmp_path / "document_extra.json").exists()
+
+
+class TestBinaryCheckpointFormat:
+    def test_roundtrip(self, tmp_path):
+        document = _create_document(["Sample text content", "Otro bloque de texto con ñ y €"], {"lang": "en"})
+        checkpoint_format = BinaryCheckpointFormat()
+
+        checkpoint_format.dump(document, tmp_path)
+        loaded = checkpoint_format.load(document.source, tmp_path)
+
+        assert (tmp_path / "document.ptc").exists()
+        assert loaded == document
+
+    def test_roundtrip_blocks_containing_the_text_separator(self, tmp_path):
+        document = _create_document([f"first{TEXT_BLOCK_SEPARATOR}block", "", "last block"])
+        checkpoint_format = BinaryCheckpointFormat()
+
+        checkpoint_format.dump(document, tmp_path)
+        loaded = checkpoint_format.load(document.source, tmp_path)
+
+        assert loaded.text_blocks == document.text_blocks
+
+    def test_roundtrip_without_blocks(self, tmp_path):
+        document = _create_document([])
+        checkpoint_format = BinaryCheckpointFormat()
+
+        checkpoint_format.dump(document, tmp_path)
+        loaded = checkpoint_format.load(document.source, tmp_path)
+
+        assert loaded.text_blocks == []
+        assert loaded.extra == {}
+
+    def test_load_invalid_file(self, tmp_path):
+        (tmp_path / "document.ptc").write_bytes(b"not a checkpoint")
+
+        with pytest.raises(ValueError, match="is not a valid binary checkpoint file"):
+            BinaryCheckpointFormat().load(DocumentSource(Path("document.pdf"), "en"), tmp_path)
+
+    def test_load_invalid_dir(self):
+        with pytest.raises(ValueError, match="is not a directory"):
+            BinaryCheckpointFormat().load(DocumentSource(Path("document.pdf"), "en"), Path("/non/existent/path"))
+
+    def test_pair_roundtrip(self, tmp_path):
+        document_1 = DocumentContext(DocumentSource(Path("doc1.pdf"), "en"), ["English text"], {"lang": "en"})
+        document_2 = DocumentContext(DocumentSource(Path("doc2.pdf"), "es"), ["Spanish text"], {"lang": "es"})
+        checkpoint_format = BinaryCheckpointFormat()
+
+        checkpoint_format.dump_pair(DocumentPairContext(document_1, document_2), tmp_path)
+        loaded = checkpoint_format.load_pair(document_1.source, document_2.source, tmp_path)
+
+        assert loaded.document_1 == document_1
+        assert loaded.document_2 == document_2
+
+
+class TestMappedBinaryCheckpointFormat:
+    def test_load_is_lazy(self, tmp_path):
+        document = _create_document(["first block", "segundo bloque ñ", "third block"], {"lang": "en"})
+        checkpoint_format = MappedBinaryCheckpointFormat()
+
+        checkpoint_format.dump(document, tmp_path)
+        loaded = checkpoint_format.load(document.source, tmp_path)
+
+        assert isinstance(loaded.text_blocks, MappedTextBlocks)
+        assert len(loaded.text_blocks) == 3
+        assert loaded.text_blocks[1] == "segundo bloque ñ"
+        assert loaded.text_blocks[-1] == "third block"
+        assert loaded.text_blocks[1:] == ["segundo bloque ñ", "third block"]
+        assert loaded.extra == {"lang": "en"}
+        assert loaded == document
+
+    def test_invalid_block_index(self, tmp_path):
+        document = _create_document(["first block"])
+        checkpoint_format = MappedBinaryCheckpointFormat()
+
+        checkpoint_format.dump(document, tmp_path)
+        loaded = checkpoint_format.load(document.source, tmp_path)
+
+        with pytest.raises(IndexError):
+            _ = loaded.text_blocks[1]
+
+    def test_dump_mapped_blocks(self, tmp_path):
+        (tmp_path / "previous").mkdir()
+        (tmp_path / "next").mkdir()
+        document = _create_document(["first block", "second block"], {"lang": "en"})
+        checkpoint_format = MappedBinaryCheckpointFormat()
+
+        checkpoint_format.dump(document, tmp_path / "previous")
+        loaded = checkpoint_format.load(document.source, tmp_path / "previous")
+        checkpoint_format.dump(loaded, tmp_path / "next")
+
+        assert (tmp_path / "next" / "document.ptc").read_bytes() == (tmp_path / "previous" / "document.ptc").read_bytes()
+
+    def test_overwrite_mapped_file(self, tmp_path):
+        checkpoint_format = MappedBinaryCheckpointFormat()
+        checkpoint_format.dump(_create_document(["first block"]), tmp_path)
+        loaded = checkpoint_format.load(DocumentSource(Path("document.pdf"), "en"), tmp_path)
+
+        checkpoint_format.dump(_create_document(["new"]), tmp_path)
+
+        assert loaded.text_blocks == ["first block"]
+        assert checkpoint_format.load(DocumentSource(Path("document.pdf"), "en"), tmp_path).text_blocks == ["new"]
@@ -0,0 +1,142 @@
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from patee.checkpoint_manifest import CheckpointManifest, MANIFEST_FILE_NAME, STOPPED_STATUS
+
+
+def _save_checkpoints(out_dir: Path, worker_idx: int) -> None:
+    manifest = CheckpointManifest(out_dir)
+    for idx in range(20):
+        manifest.save_checkpoint(f"source_{worker_idx}_{idx}", "00_extract", "step_key")
+
+
+class TestCheckpointManifest:
+    def test_create_manifest(self, tmp_path):
+        manifest = CheckpointManifest(tmp_path)
+
+        assert manifest.path == tmp_path / MANIFEST_FILE_NAME
+        assert manifest.path.exists()
+
+    def test_create_manifest_invalid_dir(self):
+        with pytest.raises(ValueError, match="is not a directory"):
+            CheckpointManifest(Path("/non/existent/path"))
+
+    def test_register_source(self, tmp_path):
+        manifest = CheckpointManifest(tmp_path)
+
+        assert not manifest.register_source("source_hash")
+        assert manifest.register_source("source_hash")
+        assert CheckpointManifest(tmp_path).register_source("source_hash")
+
+    def test_save_and_lookup_checkpoint(self, tmp_path):
+        manifest = CheckpointManifest(tmp_path)
+
+        assert not manifest.has_checkpoint("source_hash", "00_extract", "step_key")
+
+        manifest.save_checkpoint("source_hash", "00_extract", "step_key")
+
+        assert manifest.has_checkpoint("source_hash", "00_extract", "step_key")
+        assert not manifest.has_checkpoint("source_hash", "00_extract", "other_step_key")
+        assert not manifest.has_checkpoint("other_source_hash", "00_extract", "step_key")
+
+    def test_lookup_is_keyed_by_status(self, tmp_path):
+        manifest = CheckpointManifest(tmp_path)
+
+        manifest.save_checkpoint("source_hash", "01_hitl", "step_key", STOPPED_STATUS)
+        assert not manifest.has_checkpoint("source_hash", "01_hitl", "step_key")
+        assert manifest.has_checkpoint("source_hash", "01_hitl", "step_key", STOPPED_STATUS)
+
+        manifest.save_checkpoint("source_hash", "01_hitl", "step_key")
+        assert manifest.has_checkpoint("source_hash", "01_hitl", "step_key")
+        assert not manifest.has_checkpoint("source_hash", "01_hitl", "step_key", STOPPED_STATUS)
+
+    def test_lookup_is_keyed_by_checkpoint_format(self, tmp_path):
+        manifest = CheckpointManifest(tmp_path)
+
+        manifest.save_checkpoint("source_hash", "00_extract", "step_key", checkpoint_format="binary")
+
+        assert manifest.has_checkpoint("source_hash", "00_extract", "step_key", checkpoint_format="binary")
+        assert not manifest.has_checkpoint("source_hash", "00_extract", "step_key")
+
+    def test_save_checkpoint_replaces_the_checkpoints_with_other_keys(self, tmp_path):
+        manifest = CheckpointManifest(tmp_path)
+        manifest.save_checkpoint("source_hash", "00_extract", "step_key")
+        manifest.save_checkpoint("other_source_hash", "00_extract", "step_key")
+        manifest.save_checkpoint("source_hash", "00_extract", "other_step_key")
+
+        assert not manifest.has_checkpoint("source_hash", "00_extract", "step_key")
+        assert manifest.has_checkpoint("source_hash", "00_extract", "other_step_key")
+        assert manifest.has_checkpoint("other_source_hash", "00_extract", "step_key")
+
+    def test_checkpoint_with_changed_files_is_not_valid(self, tmp_path):
+        manifest = CheckpointManifest(tmp_path)
+        file_path = tmp_path / "checkpoint.txt"
+        file_path.write_text("checkpoint")
+        manifest.save_checkpoint("source_hash", "00_extract", "step_key", file_paths=[file_path])
+
+        assert manifest.has_checkpoint("source_hash", "00_extract", "step_key")
+
+        file_path.write_text("changed checkpoint")
+        assert not manifest.has_checkpoint("source_hash", "00_extract", "step_key")
+
+        file_path.unlink()
+        assert not manifest.has_checkpoint("source_hash", "00_extract", "step_key")
+
+    def test_checkpoint_with_files_written_by_other_source_is_not_valid(self, tmp_path):
+        manifest = CheckpointManifest(tmp_path)
+        file_path = tmp_path / "checkpoint.txt"
+        file_path.write_text("checkpoint")
+        manifest.save_checkpoint("source_hash", "00_extract", "step_key", file_paths=[file_path])
+
+        manifest.save_checkpoint("other_source_hash", "00_extract", "step_key", file_paths=[file_path])
+
+        assert not manifest.has_checkpoint("source_hash", "00_extract", "step_key")
+        assert manifest.has_checkpoint("other_source_hash", "00_extract", "step_key")
+
+    def test_evict_checkpoint(self, tmp_path):
+        manifest = CheckpointManifest(tmp_path)
+        file_path = tmp_path / "checkpoint.txt"
+        file_path.write_text("checkpoint")
+        manifest.save_checkpoint("source_hash", "00_extract", "step_key", file_paths=[file_path])
+
+        checkpoint, = manifest.list_checkpoints()
+        assert checkpoint.size_bytes == file_path.stat().st_size
+
+        assert manifest.evict_checkpoint(checkpoint, active_since=0.0)
+        assert not manifest.has_checkpoint("source_hash", "00_extract", "step_key")
+        assert not file_path.exists()
+
+    def test_evict_checkpoint_used_after_listing(self, tmp_path):
+        manifest = CheckpointManifest(tmp_path)
+        manifest.save_checkpoint("source_hash", "00_extract", "step_key")
+        checkpoint, = manifest.list_checkpoints()
+
+        manifest.touch_checkpoint("source_hash", "00_extract", "step_key")
+
+        assert not manifest.evict_checkpoint(checkpoint, active_since=0.0)
+        assert manifest.has_checkpoint("source_hash", "00_extract", "step_key")
+
+    def test_evict_checkpoint_of_active_run(self, tmp_path):
+        manifest = CheckpointManifest(tmp_path)
+        manifest.save_checkpoint("source_hash", "00_extract", "step_key")
+        checkpoint, = manifest.list_checkpoints()
+
+        run_id = manifest.begin_run("source_hash")
+        assert not manifest.evict_checkpoint(checkpoint, active_since=0.0)
+
+        manifest.end_run(run_id)
+        assert manifest.evict_checkpoint(checkpoint, active_since=0.0)
+
+    def test_concurrent_writes(self, tmp_path):
+        CheckpointManifest(tmp_path)
+
+        with ProcessPoolExecutor(max_workers=4) as pool:
+            list(pool.map(_save_checkpoints, [tmp_path] * 4, range(4)))
+
+        manifest = CheckpointManifest(tmp_path)
+        assert all(
+            manifest.has_checkpoint(f"source_{worker_idx}_{idx}", "00_extract", "step_key")
+            for worker_idx in range(4)
+            for idx in range(20))
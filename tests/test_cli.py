@@ -0,0 +1,118 @@
+import json
+
+import pytest
+
+from patee.cli import main, BatchSummary, format_progress
+from patee.corpus_writers import read_shard_index
+from patee.patee import RunResult
+from tests.utils.mothers.sources import TXT_ES_FILE, TXT_CA_FILE
+
+
+def _write_pipeline(tmp_path):
+    shards_dir = tmp_path / "shards"
+    shards_dir.mkdir()
+    pipeline_path = tmp_path / "pipeline.yml"
+    pipeline_path.write_text(
+        "version: 1.0\n"
+        "steps:\n"
+        "  - type: text_extractor\n"
+        "    name: load\n"
+        "  - type: write_to_shards\n"
+        "    name: save\n"
+        "    config:\n"
+        f"      output_path: {shards_dir}\n",
+        encoding="utf-8")
+    return pipeline_path, shards_dir
+
+
+def _write_manifest(tmp_path, sources: int, invalid: int = 0):
+    lines = [json.dumps({
+        "document_1": {"document_path": str(TXT_ES_FILE), "iso2_language": "es"},
+        "document_2": {"document_path": str(TXT_CA_FILE), "iso2_language": "ca"},
+        # Different page ranges, so every source is different
+        "shared_config": {"start_page": idx + 1, "end_page": idx + 1},
+    }) for idx in range(sources)]
+    lines += ['{"document_path": "missing.tsv", "iso2_languages": ["en", "es"]}'] * invalid
+
+    manifest_path = tmp_path / "sources.jsonl"
+    manifest_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return manifest_path
+
+
+class TestCli:
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_run(self, tmp_path, capsys, workers):
+        pipeline_path, shards_dir = _write_pipeline(tmp_path)
+        manifest_path = _write_manifest(tmp_path, sources=4)
+        summary_path = tmp_path / "summary.json"
+
+        exit_code = main(["run", str(pipeline_path), "--manifest", str(manifest_path), "--out",
+                          str(tmp_path / "out"), "--workers", str(workers), "--summary", str(summary_path)])
+
+        assert exit_code == 0
+        captured = capsys.readouterr()
+        summary = json.loads(captured.out)
+        assert summary["total"] == 4
+        assert summary["succeeded"] == 4
+        assert summary["processed_pages"] == 8
+        assert summary["sources_per_second"] > 0
+        assert json.loads(summary_path.read_text(encoding="utf-8")) == summary
+        assert "4/4 (100.0%)" in captured.err
+
+        shards = read_shard_index(shards_dir)
+        assert all(shard.finalized for shard in shards.values())
+        assert sum(len(shard.sources) for shard in shards.values()) == 4
+        assert not list(shards_dir.glob("*.open"))
+
+    def test_run_reports_invalid_sources(self, tmp_path, capsys):
+        pipeline_path, _ = _write_pipeline(tmp_path)
+        manifest_path = _write_manifest(tmp_path, sources=1, invalid=1)
+
+        exit_code = main(["run", str(pipeline_path), "--manifest", str(manifest_path), "--out",
+                          str(tmp_path / "out"), "--workers", "1", "--no-progress"])
+
+        assert exit_code == 1
+        captured = capsys.readouterr()
+        summary = json.loads(captured.out)
+        assert summary["succeeded"] == 1
+        assert summary["invalid"] == 1
+        assert summary["failures"][0]["line"] == 2
+        assert captured.err == ""
+
+    def test_run_without_manifest(self, tmp_path, capsys):
+        pipeline_path, _ = _write_pipeline(tmp_path)
+
+        exit_code = main(["run", str(pipeline_path), "--manifest", str(tmp_path / "missing.jsonl"), "--out",
+                          str(tmp_path / "out")])
+
+        assert exit_code == 2
+        assert "does not exist" in capsys.readouterr().err
+
+    def test_run_with_no_workers(self, tmp_path, capsys):
+        pipeline_path, _ = _write_pipeline(tmp_path)
+        manifest_path = _write_manifest(tmp_path, sources=1)
+
+        with pytest.raises(SystemExit) as exc_info:
+            main(["run", str(pipeline_path), "--manifest", str(manifest_path), "--out", str(tmp_path / "out"),
+                  "--workers", "0"])
+
+        assert exc_info.value.code == 2
+        assert "number of workers must be at least 1" in capsys.readouterr().err
+        assert not (tmp_path / "out").exists()
+
+    def test_gc(self, tmp_path, capsys):
+        assert main(["gc", str(tmp_path), "--max-size", "1G"]) == 0
+
+        assert json.loads(capsys.readouterr().out)["evicted_checkpoints"] == 0
+
+    def test_format_progress(self):
+        summary = BatchSummary(total=10, elapsed_seconds=2.0)
+        assert format_progress(summary) == "0/10 (0.0%) | 0.00 docs/s | 0.00 pages/s | ETA ?"
+
+        for _ in range(4):
+            summary.add_result(1, RunResult(status="succeeded", executed_steps=frozenset(),
+                                            skipped_steps=frozenset()), pages=2)
+        summary.add_result(2, RunResult(status="failed", executed_steps=frozenset(), skipped_steps=frozenset(),
+                                        non_succeeded_reason="error"), pages=0)
+
+        assert format_progress(summary) == "5/10 (50.0%) | 2.50 docs/s | 4.00 pages/s | ETA 0:00:02 | 1 failed"
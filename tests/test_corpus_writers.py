@@ -0,0 +1,153 @@
+import gzip
+import json
+import lzma
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+import pytest
+
+from patee.corpus_writers import open_corpus_writer, ShardedCorpusWriter, read_shard_index, finalize_shards
+from patee.step_types import DocumentSource
+
+DOCUMENT_1 = DocumentSource(Path("document_es.pdf"), "es")
+DOCUMENT_2 = DocumentSource(Path("document_ca.pdf"), "ca")
+PAIRS = [
+    ("Hola\tmundo", "Hola\tmón"),
+    ("Línea 1\nLínea 2", "Línia 1\nLínia 2"),
+    ("<b> & </b>", None),
+]
+
+
+def _write_pairs(output_format: str, out_dir: Path, compression=None, **kwargs) -> list[Path]:
+    with open_corpus_writer(output_format, out_dir, DOCUMENT_1, DOCUMENT_2, compression=compression,
+                            **kwargs) as writer:
+        for block_1, block_2 in PAIRS:
+            writer.write_pair(block_1, block_2)
+    return writer.file_paths
+
+
+class TestCorpusWriters:
+    def test_text_writer_writes_a_file_per_document(self, tmp_path: Path):
+        file_paths = _write_pairs("text", tmp_path, blocks_separator="\n---\n")
+
+        assert file_paths == [tmp_path / "document_es.txt", tmp_path / "document_ca.txt"]
+        assert file_paths[0].read_text(encoding="utf-8") == "Hola\tmundo\n---\nLínea 1\nLínea 2\n---\n<b> & </b>"
+        assert file_paths[1].read_text(encoding="utf-8") == "Hola\tmón\n---\nLínia 1\nLínia 2"
+
+    def test_text_writer_names_the_files_of_a_multilingual_file_after_their_language(self, tmp_path: Path):
+        document_1 = DocumentSource(Path("sentences.tsv"), "en")
+        document_2 = DocumentSource(Path("sentences.tsv"), "es")
+
+        with open_corpus_writer("text", tmp_path, document_1, document_2) as writer:
+            writer.write_pair("hello", "hola")
+            writer.write_pair("world", "mundo")
+
+        assert writer.file_paths == [tmp_path / "sentences_en.txt", tmp_path / "sentences_es.txt"]
+        assert writer.file_paths[0].read_text(encoding="utf-8") == "hello\nworld"
+        assert writer.file_paths[1].read_text(encoding="utf-8") == "hola\nmundo"
+
+    def test_tsv_writer_escapes_tabs_and_line_breaks(self, tmp_path: Path):
+        file_paths = _write_pairs("tsv", tmp_path)
+
+        assert file_paths == [tmp_path / "document_es-document_ca.tsv"]
+        assert file_paths[0].read_text(encoding="utf-8").splitlines() == [
+            "Hola\\tmundo\tHola\\tmón",
+            "Línea 1\\nLínea 2\tLínia 1\\nLínia 2",
+            "<b> & </b>\t",
+        ]
+
+    def test_jsonl_writer_with_gzip_compression(self, tmp_path: Path):
+        file_paths = _write_pairs("jsonl", tmp_path, compression="gzip")
+
+        assert file_paths == [tmp_path / "document_es-document_ca.jsonl.gz"]
+        with gzip.open(file_paths[0], "rt", encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f]
+        assert lines == [{"es": block_1 or "", "ca": block_2 or ""} for block_1, block_2 in PAIRS]
+
+    def test_tmx_writer_with_xz_compression(self, tmp_path: Path):
+        file_paths = _write_pairs("tmx", tmp_path, compression="xz")
+
+        with lzma.open(file_paths[0], "rb") as f:
+            root = ET.parse(f).getroot()
+        units = root.findall("./body/tu")
+        assert len(units) == len(PAIRS)
+        assert [seg.text for seg in units[2].iter("seg")] == ["<b> & </b>", None]
+        assert units[0][0].get("{http://www.w3.org/XML/1998/namespace}lang") == "es"
+
+    def test_aborted_writer_leaves_no_files(self, tmp_path: Path):
+        with pytest.raises(RuntimeError):
+            with open_corpus_writer("tsv", tmp_path, DOCUMENT_1, DOCUMENT_2) as writer:
+                writer.write_pair("a", "b")
+                raise RuntimeError("failed")
+
+        assert list(tmp_path.iterdir()) == []
+
+    def test_unsupported_compression(self, tmp_path: Path):
+        with pytest.raises(ValueError, match="Unsupported compression"):
+            open_corpus_writer("tsv", tmp_path, DOCUMENT_1, DOCUMENT_2, compression="zip")
+
+
+def _write_documents(writer: ShardedCorpusWriter, source_id: str, pairs: list) -> list:
+    return list(writer.write_documents(source_id, DOCUMENT_1, DOCUMENT_2, iter(pairs)))
+
+
+class TestShardedCorpusWriter:
+    def test_writer_appends_documents_and_rotates_shards(self, tmp_path: Path):
+        writer = ShardedCorpusWriter(tmp_path, "tsv", max_shard_bytes=100)
+
+        for idx in range(4):
+            assert _write_documents(writer, f"source_{idx}", PAIRS) == PAIRS
+        writer.close()
+
+        shards = read_shard_index(tmp_path)
+        assert len(shards) == 2
+        assert all(shard.finalized and shard.pairs == 2 * len(PAIRS) for shard in shards.values())
+        assert [source for shard in shards.values() for source in shard.sources] == [
+            "source_0", "source_1", "source_2", "source_3"]
+        for name, shard in shards.items():
+            assert (tmp_path / name).stat().st_size == shard.size_bytes
+            assert len((tmp_path / name).read_text(encoding="utf-8").splitlines()) == shard.pairs
+
+    def test_concurrent_writers_write_their_own_shards(self, tmp_path: Path):
+        writer_1 = ShardedCorpusWriter(tmp_path, "jsonl", compression="gzip")
+        writer_2 = ShardedCorpusWriter(tmp_path, "jsonl", compression="gzip")
+
+        _write_documents(writer_1, "source_1", PAIRS)
+        _write_documents(writer_2, "source_2", PAIRS)
+        _write_documents(writer_1, "source_3", PAIRS)
+        writer_1.close()
+        writer_2.close()
+
+        shards = read_shard_index(tmp_path)
+        assert sorted(shard.sources for shard in shards.values()) == [["source_1", "source_3"], ["source_2"]]
+        with gzip.open(tmp_path / next(name for name, shard in shards.items() if len(shard.sources) == 2), "rt",
+                       encoding="utf-8") as f:
+            assert len(f.read().splitlines()) == 2 * len(PAIRS)
+
+    def test_failed_document_is_removed_from_the_shard(self, tmp_path: Path):
+        writer = ShardedCorpusWriter(tmp_path, "tsv")
+        _write_documents(writer, "source_1", PAIRS)
+
+        def failing_pairs():
+            yield PAIRS[0]
+            raise RuntimeError("failed")
+
+        with pytest.raises(RuntimeError):
+            list(writer.write_documents("source_2", DOCUMENT_1, DOCUMENT_2, failing_pairs()))
+        writer.close()
+
+        [shard] = read_shard_index(tmp_path).values()
+        assert shard.sources == ["source_1"]
+        assert len((tmp_path / shard.name).read_text(encoding="utf-8").splitlines()) == len(PAIRS)
+
+    def test_finalize_shards_left_open(self, tmp_path: Path):
+        writer = ShardedCorpusWriter(tmp_path, "tmx", compression="xz")
+        _write_documents(writer, "source_1", PAIRS)
+
+        assert read_shard_index(tmp_path)[writer.shard_path.name].finalized is False
+
+        [shard_path] = finalize_shards(tmp_path)
+
+        assert read_shard_index(tmp_path)[shard_path.name].finalized is True
+        with lzma.open(shard_path, "rb") as f:
+            assert len(ET.parse(f).getroot().findall("./body/tu")) == len(PAIRS)
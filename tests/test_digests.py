@@ -0,0 +1,72 @@
+import subprocess
+import sys
+from pathlib import Path
+
+from patee import digests
+from patee.digests import file_digest, config_digest, source_digest
+from patee.input_types import MonolingualSingleFile, MonolingualSingleFilePair, PageInfo
+from tests.utils.mothers.sources import get_existing_monolingual_single_file_pair, PDF_ES_FILE
+
+ROOT_DIR = Path(__file__).parent.parent
+
+
+def _create_pair(tmp_path: Path, text_1: str, text_2: str, page_info: PageInfo = None) -> MonolingualSingleFilePair:
+    document_1_path = tmp_path / "document_es.txt"
+    document_2_path = tmp_path / "document_ca.txt"
+    document_1_path.write_text(text_1, encoding="utf-8")
+    document_2_path.write_text(text_2, encoding="utf-8")
+
+    return MonolingualSingleFilePair(
+        document_1=MonolingualSingleFile(document_path=document_1_path, iso2_language="es"),
+        document_2=MonolingualSingleFile(document_path=document_2_path, iso2_language="ca"),
+        shared_config=page_info,
+    )
+
+
+class TestDigests:
+    def test_source_digest_is_stable_across_processes(self):
+        source = get_existing_monolingual_single_file_pair()
+
+        code = ("from tests.utils.mothers.sources import get_existing_monolingual_single_file_pair;"
+                "from patee.digests import source_digest;"
+                "print(source_digest(get_existing_monolingual_single_file_pair()))")
+        output = subprocess.run(
+            [sys.executable, "-c", code], cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+
+        assert output.stdout.strip() == source_digest(source)
+
+    def test_source_digest_changes_with_content(self, tmp_path):
+        source = _create_pair(tmp_path, "hola", "hola")
+        original_digest = source_digest(source)
+
+        source.document_1.document_path.write_text("adiós", encoding="utf-8")
+
+        assert source_digest(source) != original_digest
+
+    def test_source_digest_changes_with_page_info(self, tmp_path):
+        source_1 = _create_pair(tmp_path, "hola", "hola", PageInfo(start_page=1, end_page=10))
+        source_2 = _create_pair(tmp_path, "hola", "hola", PageInfo(start_page=1, end_page=10, pages_to_exclude={3}))
+
+        assert source_digest(source_1) != source_digest(source_2)
+
+    def test_source_digest_does_not_depend_on_directory(self, tmp_path):
+        (tmp_path / "a").mkdir()
+        (tmp_path / "b").mkdir()
+        source_1 = _create_pair(tmp_path / "a", "hola", "hola")
+        source_2 = _create_pair(tmp_path / "b", "hola", "hola")
+
+        assert source_digest(source_1) == source_digest(source_2)
+
+    def test_file_digest_is_memoized(self, monkeypatch):
+        file_digest(PDF_ES_FILE)
+
+        def fail_open(*args, **kwargs):
+            raise AssertionError("file should not be read again")
+
+        monkeypatch.setattr(digests, "open", fail_open, raising=False)
+
+        assert file_digest(PDF_ES_FILE) == file_digest(PDF_ES_FILE)
+
+    def test_config_digest_does_not_depend_on_key_order(self):
+        assert config_digest({"a": 1, "b": [1, 2]}) == config_digest({"b": [1, 2], "a": 1})
+        assert config_digest({"a": 1}) != config_digest({"a": 2})
@@ -1,13 +1,25 @@
+import asyncio
+import time
 from pathlib import Path
 
-from patee.patee import Patee
+import pytest
+
+from patee.checkpoint_formats import MappedTextBlocks
+from patee.input_types import MonolingualSingleFilePair, MonolingualSingleFile, MultilingualSingleFile, PageInfo
+from patee.patee import Patee, count_source_pages
+from patee.pdf_pages import count_pdf_pages
 from tests.utils.fakes.step_fakes import FakeStepsBuilder
 from tests.utils.mothers.sources import (
     get_existing_monolingual_single_file_pair,
-    PIPELINES_DIR
+    PIPELINES_DIR,
+    PDF_ES_FILE,
+    PDF_CA_FILE,
+    TSV_FILE,
 )
 
 FAKES_CONFIG = PIPELINES_DIR / "just_for_tests.yml"
+STREAMING_FAKES_CONFIG = PIPELINES_DIR / "just_for_tests_streaming.yml"
+ASYNC_FAKES_CONFIG = PIPELINES_DIR / "just_for_tests_async.yml"
 
 OUT_DIR = Path(__file__).parent / "out"
 
@@ -19,6 +31,68 @@ class TestPatee:
         assert patee.step_names == ["00_extract", "01_process"]
 
 
+    def test_load_with_binary_checkpoint_format(self, tmp_path):
+        config_path = tmp_path / "pipeline.yml"
+        config_path.write_text(
+            "checkpoint_format: binary\n" + FAKES_CONFIG.read_text(encoding="utf-8"), encoding="utf-8")
+
+        patee = Patee.load_from(config_path, steps_builder=FakeStepsBuilder())
+        source = get_existing_monolingual_single_file_pair()
+
+        result = patee.run(source, tmp_path)
+
+        assert result.status == "succeeded"
+        assert (tmp_path / "01_process" / "GUIA-PDDD.ptc").exists()
+
+    def test_patee_does_not_resume_from_checkpoints_in_other_format(self, tmp_path):
+        out_dir = tmp_path / "out"
+        out_dir.mkdir()
+        config_path = tmp_path / "pipeline.yml"
+        config_path.write_text(
+            "checkpoint_format: binary\n" + FAKES_CONFIG.read_text(encoding="utf-8"), encoding="utf-8")
+        source = get_existing_monolingual_single_file_pair()
+
+        Patee.load_from(FAKES_CONFIG, steps_builder=FakeStepsBuilder()).run(source, out_dir, resume=True)
+        binary_result = Patee.load_from(config_path, steps_builder=FakeStepsBuilder()).run(
+            source, out_dir, resume=True)
+        resumed_result = Patee.load_from(config_path, steps_builder=FakeStepsBuilder()).run(
+            source, out_dir, resume=True)
+
+        assert binary_result.status == "succeeded"
+        assert binary_result.executed_steps == frozenset({"00_extract", "01_process"})
+        assert resumed_result.skipped_steps == frozenset({"00_extract", "01_process"})
+
+    def test_patee_resumes_mapped_binary_checkpoints_without_decoding_blocks(self, tmp_path, monkeypatch):
+        config_path = tmp_path / "pipeline.yml"
+        config_path.write_text(
+            "checkpoint_format: mapped_binary\n" + FAKES_CONFIG.read_text(encoding="utf-8"), encoding="utf-8")
+        out_dir = tmp_path / "out"
+        out_dir.mkdir()
+        patee = Patee.load_from(config_path, steps_builder=FakeStepsBuilder())
+        source = get_existing_monolingual_single_file_pair()
+        patee.run(source, out_dir, resume=True)
+
+        decoded_blocks = []
+        decode_block = MappedTextBlocks.__getitem__
+        monkeypatch.setattr(MappedTextBlocks, "__getitem__",
+                            lambda self, idx: decoded_blocks.append(idx) or decode_block(self, idx))
+
+        result = patee.run(source, out_dir, resume=True)
+
+        assert result.skipped_steps == frozenset({"00_extract", "01_process"})
+        assert decoded_blocks == []
+        metrics, = result.step_metrics
+        assert metrics.output_blocks == 2
+        assert metrics.output_bytes == len("fake text 1 fake") + len("fake text 2 fake")
+
+    def test_load_with_unsupported_checkpoint_format(self, tmp_path):
+        config_path = tmp_path / "pipeline.yml"
+        config_path.write_text(
+            "checkpoint_format: unknown\n" + FAKES_CONFIG.read_text(encoding="utf-8"), encoding="utf-8")
+
+        with pytest.raises(ValueError, match="Unsupported checkpoint format: unknown"):
+            Patee.load_from(config_path, steps_builder=FakeStepsBuilder())
+
     def test_patee_can_remove_steps(self):
         builder = FakeStepsBuilder()
         patee = Patee.load_from(FAKES_CONFIG, steps_builder=builder)
@@ -35,7 +109,7 @@ class TestPatee:
         result = patee.run(source)
 
         assert result.status == "succeeded"
-        assert result.executed_steps == frozenset()
+        assert result.executed_steps == frozenset({"00_extract", "01_process"})
         assert result.skipped_steps == frozenset()
         assert result.non_succeeded_reason is None
 
@@ -50,6 +124,286 @@ class TestPatee:
         result = patee.run(source, OUT_DIR)
 
         assert result.status == "succeeded"
-        assert result.executed_steps == frozenset()
+        assert result.executed_steps == frozenset({"00_extract", "01_process"})
         assert result.skipped_steps == frozenset()
-        assert result.non_succeeded_reason is None
\ No newline at end of file
+        assert result.non_succeeded_reason is None
+
+    def test_patee_can_resume_from_last_checkpoint(self, tmp_path):
+        builder = FakeStepsBuilder()
+        patee = Patee.load_from(FAKES_CONFIG, steps_builder=builder)
+
+        source = get_existing_monolingual_single_file_pair()
+
+        first_result = patee.run(source, tmp_path, resume=True)
+        second_result = patee.run(source, tmp_path, resume=True)
+
+        assert first_result.status == "succeeded"
+        assert first_result.executed_steps == frozenset({"00_extract", "01_process"})
+        assert second_result.status == "succeeded"
+        assert second_result.executed_steps == frozenset()
+        assert second_result.skipped_steps == frozenset({"00_extract", "01_process"})
+        # Only the output of the last completed step is loaded
+        assert [metrics.name for metrics in second_result.step_metrics] == ["01_process"]
+
+    def test_patee_resumes_after_last_completed_step(self, tmp_path):
+        builder = FakeStepsBuilder()
+        patee = Patee.load_from(FAKES_CONFIG, steps_builder=builder)
+
+        source = get_existing_monolingual_single_file_pair()
+
+        patee.run(source, tmp_path, resume=True)
+        # Written again by another source with a document of the same name
+        (tmp_path / "01_process" / "GUIA-PDDD.txt").write_text("other source", encoding="utf-8")
+
+        result = patee.run(source, tmp_path, resume=True)
+
+        assert result.status == "succeeded"
+        assert result.executed_steps == frozenset({"01_process"})
+        assert result.skipped_steps == frozenset({"00_extract"})
+
+    def test_patee_resumes_only_the_changed_step_and_the_steps_after_it(self, tmp_path):
+        def write_config(first_option: int, second_option: int) -> Path:
+            config_path = tmp_path / "pipeline.yml"
+            config_path.write_text(
+                "version: 1.0\n"
+                "steps:\n"
+                "  - type: extract_fake\n"
+                "    name: extract\n"
+                "  - type: text_fake\n"
+                "    name: first\n"
+                f"    config: {{option: {first_option}}}\n"
+                "  - type: text_fake\n"
+                "    name: second\n"
+                f"    config: {{option: {second_option}}}\n",
+                encoding="utf-8")
+            return config_path
+
+        out_dir = tmp_path / "out"
+        out_dir.mkdir()
+        source = get_existing_monolingual_single_file_pair()
+
+        Patee.load_from(write_config(1, 1), steps_builder=FakeStepsBuilder()).run(source, out_dir, resume=True)
+        first_changed = Patee.load_from(write_config(2, 1), steps_builder=FakeStepsBuilder()).run(
+            source, out_dir, resume=True)
+        second_changed = Patee.load_from(write_config(2, 2), steps_builder=FakeStepsBuilder()).run(
+            source, out_dir, resume=True)
+
+        assert first_changed.executed_steps == frozenset({"01_first", "02_second"})
+        assert first_changed.skipped_steps == frozenset({"00_extract"})
+        assert second_changed.executed_steps == frozenset({"02_second"})
+        assert second_changed.skipped_steps == frozenset({"00_extract", "01_first"})
+
+    def test_patee_does_not_reuse_the_result_of_a_reverted_config(self, tmp_path):
+        def write_config(suffix: str) -> Path:
+            config_path = tmp_path / "pipeline.yml"
+            config_path.write_text(
+                "version: 1.0\n"
+                "steps:\n"
+                "  - type: extract_fake\n"
+                "    name: extract\n"
+                "  - type: text_fake\n"
+                "    name: process\n"
+                f"    config: {{suffix: ' {suffix}'}}\n",
+                encoding="utf-8")
+            return config_path
+
+        out_dir = tmp_path / "out"
+        out_dir.mkdir()
+        source = get_existing_monolingual_single_file_pair()
+
+        Patee.load_from(write_config("a"), steps_builder=FakeStepsBuilder()).run(source, out_dir, resume=True)
+        Patee.load_from(write_config("b"), steps_builder=FakeStepsBuilder()).run(source, out_dir, resume=True)
+        result = Patee.load_from(write_config("a"), steps_builder=FakeStepsBuilder()).run(
+            source, out_dir, resume=True)
+
+        assert result.executed_steps == frozenset({"01_process"})
+        assert result.skipped_steps == frozenset({"00_extract"})
+        assert (out_dir / "01_process" / "GUIA-PDDD.txt").read_text(encoding="utf-8") == "fake text 2 a"
+
+    def test_patee_chains_step_keys_after_removing_a_step(self):
+        patee = Patee.load_from(FAKES_CONFIG, steps_builder=FakeStepsBuilder())
+        _, chained_metadata = patee._steps[1]
+
+        patee.remove_step("00_extract")
+        _, metadata = patee._steps[0]
+
+        assert chained_metadata.upstream_key != ""
+        assert metadata.upstream_key == ""
+        assert metadata.digest() != chained_metadata.digest()
+
+    def test_patee_cannot_resume_without_out_dir(self):
+        builder = FakeStepsBuilder()
+        patee = Patee.load_from(FAKES_CONFIG, steps_builder=builder)
+
+        source = get_existing_monolingual_single_file_pair()
+
+        with pytest.raises(ValueError, match="output directory is required"):
+            patee.run(source, resume=True)
+
+    def test_patee_can_process_as_a_stream(self):
+        patee = Patee.load_from(STREAMING_FAKES_CONFIG, steps_builder=FakeStepsBuilder())
+
+        source = get_existing_monolingual_single_file_pair()
+
+        result = patee.run(source)
+
+        assert result.status == "succeeded"
+        assert result.executed_steps == frozenset({"00_extract", "01_stream", "02_stream_again"})
+        assert [metrics.output_blocks for metrics in result.step_metrics] == [2, 2, 2]
+
+    def test_patee_can_process_as_a_stream_with_out_dir(self, tmp_path):
+        patee = Patee.load_from(STREAMING_FAKES_CONFIG, steps_builder=FakeStepsBuilder())
+
+        source = get_existing_monolingual_single_file_pair()
+
+        first_result = patee.run(source, tmp_path, resume=True)
+        second_result = patee.run(source, tmp_path, resume=True)
+
+        assert first_result.status == "succeeded"
+        assert (tmp_path / "02_stream_again" / "GUIA-PDDD.txt").read_text() == "fake text 2 stream stream"
+        assert second_result.executed_steps == frozenset()
+        assert [metrics.name for metrics in second_result.step_metrics] == ["02_stream_again"]
+
+    def test_patee_reports_step_metrics(self):
+        builder = FakeStepsBuilder()
+        patee = Patee.load_from(FAKES_CONFIG, steps_builder=builder)
+
+        source = get_existing_monolingual_single_file_pair()
+
+        result = patee.run(source)
+
+        extract_metrics, process_metrics = result.step_metrics
+        assert extract_metrics.name == "00_extract"
+        assert extract_metrics.input_blocks == 0
+        assert extract_metrics.output_blocks == 2
+        assert extract_metrics.output_bytes == len("fake text 1") + len("fake text 2")
+        assert process_metrics.name == "01_process"
+        assert process_metrics.input_blocks == 2
+        assert process_metrics.output_bytes == extract_metrics.output_bytes + 2 * len(" fake")
+        assert all(metrics.wall_time_seconds >= 0 for metrics in result.step_metrics)
+        assert all(metrics.cpu_time_seconds >= 0 for metrics in result.step_metrics)
+        assert not any(metrics.skipped for metrics in result.step_metrics)
+
+    def test_patee_can_run_many_in_process(self):
+        builder = FakeStepsBuilder()
+        patee = Patee.load_from(FAKES_CONFIG, steps_builder=builder)
+
+        sources = [get_existing_monolingual_single_file_pair() for _ in range(3)]
+
+        result = patee.run_many(sources, workers=1)
+
+        assert len(result.results) == 3
+        assert all(run_result.status == "succeeded" for run_result in result.results)
+        assert result.processed_pages == 3 * 2 * 2
+        assert result.sources_per_second > 0
+        assert result.pages_per_second > 0
+
+    def test_patee_closes_the_steps_after_run_many(self):
+        builder = FakeStepsBuilder()
+        patee = Patee.load_from(FAKES_CONFIG, steps_builder=builder)
+        _, processor = patee.steps
+
+        patee.run_many([get_existing_monolingual_single_file_pair()], workers=1)
+
+        assert processor.was_called
+        assert processor.was_closed
+
+    def test_count_source_pages_of_open_ended_page_ranges(self):
+        pdf_pages_1 = count_pdf_pages(PDF_ES_FILE)
+        pdf_pages_2 = count_pdf_pages(PDF_CA_FILE)
+        whole_documents = MonolingualSingleFilePair(
+            document_1=MonolingualSingleFile(document_path=PDF_ES_FILE, iso2_language="es"),
+            document_2=MonolingualSingleFile(document_path=PDF_CA_FILE, iso2_language="ca"),
+        )
+        from_page_2 = MonolingualSingleFilePair(
+            document_1=MonolingualSingleFile(document_path=PDF_ES_FILE, iso2_language="es"),
+            document_2=MonolingualSingleFile(document_path=PDF_CA_FILE, iso2_language="ca"),
+            shared_config=PageInfo(start_page=2, pages_to_exclude={3}),
+        )
+        multilingual_file = MultilingualSingleFile(document_path=TSV_FILE, iso2_languages=["en", "es"])
+
+        assert count_source_pages(whole_documents) == pdf_pages_1 + pdf_pages_2
+        assert count_source_pages(from_page_2) == pdf_pages_1 + pdf_pages_2 - 4
+        assert count_source_pages(multilingual_file) == 0
+
+    def test_patee_can_run_many_with_worker_processes(self):
+        builder = FakeStepsBuilder()
+        patee = Patee.load_from(FAKES_CONFIG, steps_builder=builder)
+
+        sources = [get_existing_monolingual_single_file_pair() for _ in range(4)]
+
+        OUT_DIR.mkdir(parents=True, exist_ok=True)
+
+        result = patee.run_many(sources, OUT_DIR, workers=2)
+
+        assert len(result.results) == 4
+        assert all(run_result.status == "succeeded" for run_result in result.results)
+
+    def test_patee_can_iter_run_many_from_a_stream(self):
+        builder = FakeStepsBuilder()
+        patee = Patee.load_from(FAKES_CONFIG, steps_builder=builder)
+
+        sources = (get_existing_monolingual_single_file_pair() for _ in range(10))
+
+        results = list(patee.iter_run_many(sources, workers=2))
+
+        assert sorted(idx for idx, _, _ in results) == list(range(10))
+        assert all(run_result.status == "succeeded" for _, _, run_result in results)
+
+    def test_patee_can_run_async_steps_synchronously(self):
+        patee = Patee.load_from(ASYNC_FAKES_CONFIG, steps_builder=FakeStepsBuilder())
+        source = get_existing_monolingual_single_file_pair()
+
+        result = patee.run(source)
+
+        assert result.status == "succeeded"
+        assert result.executed_steps == {"00_extract", "01_async_process", "02_process"}
+
+    def test_patee_can_run_async_steps_synchronously_from_a_running_event_loop(self):
+        patee = Patee.load_from(ASYNC_FAKES_CONFIG, steps_builder=FakeStepsBuilder())
+        source = get_existing_monolingual_single_file_pair()
+
+        async def run_in_event_loop():
+            return patee.run(source)
+
+        result = asyncio.run(run_in_event_loop())
+
+        assert result.status == "succeeded"
+        assert result.executed_steps == {"00_extract", "01_async_process", "02_process"}
+
+    def test_patee_can_arun_with_out_dir(self, tmp_path):
+        patee = Patee.load_from(ASYNC_FAKES_CONFIG, steps_builder=FakeStepsBuilder())
+        source = get_existing_monolingual_single_file_pair()
+
+        result = asyncio.run(patee.arun(source, tmp_path))
+
+        assert result.status == "succeeded"
+        assert result.executed_steps == {"00_extract", "01_async_process", "02_process"}
+        assert (tmp_path / "01_async_process" / "GUIA-PDDD.txt").read_text() == "fake text 2 async"
+        assert (tmp_path / "02_process" / "GUIA-PDDD.txt").read_text() == "fake text 2 async fake"
+
+    def test_patee_can_arun_resuming(self, tmp_path):
+        patee = Patee.load_from(ASYNC_FAKES_CONFIG, steps_builder=FakeStepsBuilder())
+        source = get_existing_monolingual_single_file_pair()
+
+        asyncio.run(patee.arun(source, tmp_path, resume=True))
+        result = asyncio.run(patee.arun(source, tmp_path, resume=True))
+
+        assert result.status == "succeeded"
+        assert result.executed_steps == frozenset()
+        assert result.skipped_steps == {"00_extract", "01_async_process", "02_process"}
+
+    def test_patee_arun_keeps_many_runs_in_flight(self):
+        patee = Patee.load_from(ASYNC_FAKES_CONFIG, steps_builder=FakeStepsBuilder())
+        sources = [get_existing_monolingual_single_file_pair() for _ in range(20)]
+
+        async def run_all():
+            return await asyncio.gather(*(patee.arun(source) for source in sources))
+
+        start = time.perf_counter()
+        results = asyncio.run(run_all())
+        elapsed_seconds = time.perf_counter() - start
+
+        assert all(result.status == "succeeded" for result in results)
+        # Every run awaits 0.2 seconds in its async step, so they must have been awaited at the same time
+        assert elapsed_seconds < 20 * 0.2 / 2
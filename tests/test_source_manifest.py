@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+from patee.input_types import MonolingualSingleFilePair, MultilingualSingleFile, PageInfo
+from patee.source_manifest import iter_source_records, count_source_records, parse_source
+from tests.utils.mothers.sources import SOURCES_DIR, TXT_ES_FILE, TSV_FILE
+
+
+class TestSourceManifest:
+    def test_parse_monolingual_pair(self):
+        record = json.dumps({
+            "document_1": {"document_path": TXT_ES_FILE.name, "iso2_language": "es"},
+            "document_2": {"document_path": "GUIA-PDDD.txt", "iso2_language": "ca"},
+            "shared_config": {"start_page": 2, "end_page": 5, "pages_to_exclude": [3]},
+        })
+
+        source = parse_source(record, SOURCES_DIR)
+
+        assert isinstance(source, MonolingualSingleFilePair)
+        assert source.document_1.document_path == TXT_ES_FILE
+        assert source.document_2.iso2_language == "ca"
+        assert source.shared_config == PageInfo(start_page=2, end_page=5, pages_to_exclude={3})
+
+    def test_parse_multilingual_file(self):
+        record = json.dumps({"document_path": str(TSV_FILE), "iso2_languages": ["en", "es"]})
+
+        source = parse_source(record, SOURCES_DIR.parent)
+
+        assert isinstance(source, MultilingualSingleFile)
+        assert source.document_path == TSV_FILE
+        assert source.iso2_languages == ["en", "es"]
+
+    @pytest.mark.parametrize("record, message", [
+        ("not json", "invalid JSON"),
+        ("[]", "must be a JSON object"),
+        ('{"document_path": "idioms_sentences.tsv"}', "missing field"),
+        ('{"document_path": "missing.tsv", "iso2_languages": ["en", "es"]}', "not found"),
+        ('{"document_path": "idioms_sentences.tsv", "iso2_languages": ["en", "es"], "page_info": {"first": 1}}',
+         "unexpected keyword"),
+    ])
+    def test_parse_invalid_source(self, record, message):
+        with pytest.raises(ValueError, match=message):
+            parse_source(record, SOURCES_DIR)
+
+    def test_iter_source_records_skips_blank_lines(self, tmp_path):
+        manifest_path = tmp_path / "sources.jsonl"
+        manifest_path.write_text('{"a": 1}\n\n  \n{"b": 2}\n', encoding="utf-8")
+
+        assert list(iter_source_records(manifest_path)) == [(1, '{"a": 1}\n'), (4, '{"b": 2}\n')]
+        assert count_source_records(manifest_path) == 2
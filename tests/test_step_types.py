@@ -141,6 +141,15 @@ class TestDocumentContext:
         assert loaded_context.text_blocks == original_text_blocks
         assert loaded_context.extra == {}  # Should be empty since no extra file
 
+    def test_load_from_with_extra(self, tmp_path):
+        source = DocumentSource(Path("document.pdf"), "en")
+        doc_context = DocumentContext(source, ["Original text"], {"metadata": "test metadata"})
+        doc_context.dump_to(tmp_path)
+
+        loaded_context = DocumentContext.load_from(source, tmp_path)
+
+        assert loaded_context.extra == {"metadata": "test metadata"}
+
     def test_load_from_invalid_dir(self):
         original_source = DocumentSource(Path("document.pdf"), "en")
 
@@ -213,6 +222,23 @@ class TestDocumentPairContext:
         assert loaded_pair.document_1.extra == {}
         assert loaded_pair.document_2.extra == {}
 
+    def test_iter_block_pairs(self):
+        doc1 = DocumentContext(DocumentSource(Path("doc1.pdf"), "en"), ["one", "two"], {})
+        doc2 = DocumentContext(DocumentSource(Path("doc2.pdf"), "es"), ["uno"], {})
+
+        pair = DocumentPairContext(doc1, doc2)
+
+        assert list(pair.iter_block_pairs()) == [("one", "uno"), ("two", None)]
+
+    def test_from_block_pairs(self):
+        source1 = DocumentSource(Path("doc1.pdf"), "en")
+        source2 = DocumentSource(Path("doc2.pdf"), "es")
+
+        pair = DocumentPairContext.from_block_pairs(source1, source2, [("one", "uno"), ("two", None)])
+
+        assert pair.document_1 == DocumentContext(source1, ["one", "two"], {})
+        assert pair.document_2 == DocumentContext(source2, ["uno"], {})
+
     def test_read_from_invalid_dir(self):
         source1 = DocumentSource(Path("doc1.pdf"), "en")
         source2 = DocumentSource(Path("doc2.pdf"), "es")
@@ -1,6 +1,12 @@
+from pathlib import Path
+
+from patee.checkpoint_formats import MappedBinaryCheckpointFormat
+from patee.checkpoint_manifest import CheckpointManifest, STOPPED_STATUS
 from patee.step_types import (
     StepResult,
     DocumentPairContext,
+    DocumentContext,
+    DocumentSource,
     StepMetadata,
     TEXT_BLOCK_SEPARATOR
 )
@@ -8,8 +14,9 @@ from patee.steps_executor import (
     NonPersistentStepsExecutor,
     PersistentStepsExecutor,
     IntelligentPersistenceStepsExecutor,
+    _count_blocks_and_bytes,
 )
-from tests.utils.fakes.step_fakes import FakeExtractor, FakeProcessor
+from tests.utils.fakes.step_fakes import FakeExtractor, FakeProcessor, FakeStreamingProcessor
 from tests.utils.mothers.sources import get_existing_monolingual_single_file_pair, get_existing_document_pair_context, \
     get_default_text_blocks
 from utils.mothers.contexts import get_pipeline_context, get_run_context
@@ -42,6 +49,11 @@ class TestNonPersistentStepsExecutor:
         assert not result.should_stop_pipeline
         assert not result.skipped
 
+        metrics, = executor.step_metrics
+        assert metrics.name == "extract_test"
+        assert not metrics.skipped
+        assert metrics.output_blocks == 2
+
     def test_process_step_execution(self):
         # Setup
         pipeline_context = get_pipeline_context()
@@ -71,6 +83,35 @@ class TestNonPersistentStepsExecutor:
         assert not result.skipped
 
 
+    def test_streaming_steps_execution(self):
+        # Setup
+        pipeline_context = get_pipeline_context()
+        run_context = get_run_context(output_dir=None)
+        executor = NonPersistentStepsExecutor(pipeline_context, run_context)
+        events = []
+        steps = [
+            (FakeStreamingProcessor("stream_1", pipeline_context, events),
+             StepMetadata(name="stream_1", type="stream_fake", idx=1, config_hash=123456)),
+            (FakeStreamingProcessor("stream_2", pipeline_context, events),
+             StepMetadata(name="stream_2", type="stream_fake", idx=2, config_hash=123456)),
+        ]
+
+        source = get_existing_document_pair_context()
+
+        # Execute
+        result = executor.execute_streaming_steps(steps, source)
+
+        # Verify
+        default_text_blocks = [text + " stream stream" for text in get_default_text_blocks()]
+        assert result.context.document_1.text_blocks == default_text_blocks
+        assert result.context.document_2.text_blocks == default_text_blocks
+        # Every pair of blocks goes through the whole chain before the next one is produced
+        assert events == ["stream_1:0", "stream_2:0", "stream_1:1", "stream_2:1"]
+        assert [metrics.name for metrics in executor.step_metrics] == ["stream_1", "stream_2"]
+        assert executor.step_metrics[0].input_blocks == 4
+        assert executor.step_metrics[1].output_bytes == sum(len(text.encode("utf-8")) for text in default_text_blocks) * 2
+
+
 class TestPersistentStepsExecutor:
     def test_extract_step_execution(self, tmp_path):
         # Setup
@@ -138,6 +179,56 @@ class TestPersistentStepsExecutor:
         assert (step_dir / "GUIA-PDDD_ES.txt").read_text().split(TEXT_BLOCK_SEPARATOR) == default_text_blocks
         assert (step_dir / "GUIA-PDDD.txt").read_text().split(TEXT_BLOCK_SEPARATOR) == default_text_blocks
 
+    def test_extract_step_execution_with_binary_checkpoints(self, tmp_path):
+        # Setup
+        pipeline_context = get_pipeline_context(checkpoint_format="binary")
+        run_context = get_run_context(output_dir=tmp_path)
+        executor = PersistentStepsExecutor(pipeline_context, run_context)
+        extract_step = FakeExtractor("extract_test", pipeline_context)
+        metadata = StepMetadata(
+            name="extract_test",
+            type="extract_fake",
+            idx=0,
+            config_hash=123456,
+        )
+        source = get_existing_monolingual_single_file_pair()
+
+        # Execute
+        executor.execute_step(extract_step, metadata, source)
+
+        # Check files were written
+        step_dir = tmp_path / "extract_test"
+        assert (step_dir / "GUIA-PDDD_ES.ptc").exists()
+        assert (step_dir / "GUIA-PDDD.ptc").exists()
+        assert not (step_dir / "GUIA-PDDD_ES.txt").exists()
+
+    def test_streaming_steps_execution(self, tmp_path):
+        # Setup
+        pipeline_context = get_pipeline_context(checkpoint_format="mapped_binary")
+        run_context = get_run_context(output_dir=tmp_path)
+        executor = PersistentStepsExecutor(pipeline_context, run_context)
+        steps = [
+            (FakeStreamingProcessor("stream_1", pipeline_context),
+             StepMetadata(name="stream_1", type="stream_fake", idx=1, config_hash=123456)),
+            (FakeStreamingProcessor("stream_2", pipeline_context),
+             StepMetadata(name="stream_2", type="stream_fake", idx=2, config_hash=123456)),
+        ]
+
+        source = get_existing_document_pair_context()
+
+        # Execute
+        result = executor.execute_streaming_steps(steps, source)
+
+        # Verify
+        default_text_blocks = [text + " stream stream" for text in get_default_text_blocks()]
+        assert result.context.document_1.text_blocks == default_text_blocks
+        assert result.context.document_2.text_blocks == default_text_blocks
+
+        # Only the result of the last step is written
+        assert not (tmp_path / "stream_1" / "GUIA-PDDD.ptc").exists()
+        assert (tmp_path / "stream_2" / "GUIA-PDDD_ES.ptc").exists()
+        assert (tmp_path / "stream_2" / "GUIA-PDDD.ptc").exists()
+
     def test_stop_pipeline_no_files_written(self, tmp_path):
         # Setup
         pipeline_context = get_pipeline_context()
@@ -213,12 +304,10 @@ class TestIntelligentPersistenceStepsExecutor:
             config_hash=123456,
         )
 
-        # Create marker files
-        main_marker = tmp_path / ".patee"
-        main_marker.write_text(f"{source_hash}\n")
-        step_marker = step_dir / ".patee"
-        source_step_hash = f"{source_hash}--{hash(metadata)}"
-        step_marker.write_text(f"{source_step_hash}\n")
+        # Register the previous execution in the checkpoint manifest
+        manifest = CheckpointManifest(tmp_path)
+        manifest.register_source(source_hash)
+        manifest.save_checkpoint(source_hash, "process_test", metadata.digest())
 
         # Create result files
         (step_dir / "GUIA-PDDD_ES.txt").write_text("Previously processed text")
@@ -246,3 +335,100 @@ class TestIntelligentPersistenceStepsExecutor:
         assert isinstance(result.context, DocumentPairContext)
         assert result.context.document_1.text_blocks == ["Previously processed text"]
         assert result.context.document_2.text_blocks == ["Previously processed text"]
+        assert [metrics.skipped for metrics in executor.step_metrics] == [True]
+
+    def test_stopped_step_is_not_checkpointed(self, tmp_path):
+        # Setup
+        pipeline_context = get_pipeline_context()
+        run_context = get_run_context(output_dir=tmp_path, source_hash="test_hash")
+        executor = IntelligentPersistenceStepsExecutor(pipeline_context, run_context)
+        extract_step = FakeExtractor("extract_test", pipeline_context, should_stop=True)
+        metadata = StepMetadata(
+            name="extract_test",
+            type="extract_fake",
+            idx=0,
+            config_hash=123456,
+        )
+        source = get_existing_monolingual_single_file_pair()
+
+        # Execute
+        result = executor.execute_step(extract_step, metadata, source)
+
+        # Verify
+        assert result.should_stop_pipeline
+        assert not executor.has_checkpoint(extract_step, metadata)
+        assert CheckpointManifest(tmp_path).has_checkpoint(
+            "test_hash", "extract_test", metadata.digest(), STOPPED_STATUS)
+
+    def test_load_checkpoint(self, tmp_path):
+        # Setup
+        pipeline_context = get_pipeline_context()
+        run_context = get_run_context(output_dir=tmp_path, source_hash="test_hash")
+        executor = IntelligentPersistenceStepsExecutor(pipeline_context, run_context)
+        extract_step = FakeExtractor("extract_test", pipeline_context)
+        metadata = StepMetadata(
+            name="extract_test",
+            type="extract_fake",
+            idx=0,
+            config_hash=123456,
+        )
+        source = get_existing_monolingual_single_file_pair()
+
+        assert not executor.has_checkpoint(extract_step, metadata)
+        executor.execute_step(extract_step, metadata, source)
+        assert executor.has_checkpoint(extract_step, metadata)
+
+        # Execute
+        result = executor.load_checkpoint(extract_step, metadata, source)
+
+        # Verify
+        assert result.skipped
+        assert result.context.document_1.text_blocks == ["fake text 1"]
+        assert result.context.document_2.text_blocks == ["fake text 2"]
+
+    def test_load_checkpoint_with_binary_checkpoints(self, tmp_path):
+        # Setup
+        pipeline_context = get_pipeline_context(checkpoint_format="binary")
+        run_context = get_run_context(output_dir=tmp_path, source_hash="test_hash")
+        executor = IntelligentPersistenceStepsExecutor(pipeline_context, run_context)
+        extract_step = FakeExtractor("extract_test", pipeline_context)
+        metadata = StepMetadata(
+            name="extract_test",
+            type="extract_fake",
+            idx=0,
+            config_hash=123456,
+        )
+        source = get_existing_monolingual_single_file_pair()
+        executor.execute_step(extract_step, metadata, source)
+
+        # Execute
+        result = executor.load_checkpoint(extract_step, metadata, source)
+
+        # Verify
+        assert result.context.document_1.text_blocks == ["fake text 1"]
+        assert result.context.document_2.text_blocks == ["fake text 2"]
+
+
+class TestCountBlocksAndBytes:
+    def test_mapped_blocks_are_counted_in_the_same_unit(self, tmp_path):
+        # Setup
+        blocks = ["Texto con ñ y €", "Otro bloque"]
+        context = DocumentPairContext(
+            document_1=DocumentContext(DocumentSource(Path("document_1.pdf"), "es"), blocks, {}),
+            document_2=DocumentContext(DocumentSource(Path("document_2.pdf"), "es"), blocks, {}),
+        )
+        checkpoint_format = MappedBinaryCheckpointFormat()
+        checkpoint_format.dump(context.document_1, tmp_path)
+        checkpoint_format.dump(context.document_2, tmp_path)
+        mapped_context = DocumentPairContext(
+            document_1=checkpoint_format.load(context.document_1.source, tmp_path),
+            document_2=checkpoint_format.load(context.document_2.source, tmp_path),
+        )
+
+        # Execute
+        counts = _count_blocks_and_bytes(context)
+        mapped_counts = _count_blocks_and_bytes(mapped_context)
+
+        # Verify
+        assert counts == (4, 2 * sum(len(block.encode("utf-8")) for block in blocks))
+        assert mapped_counts == counts
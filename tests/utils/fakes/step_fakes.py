@@ -1,4 +1,5 @@
-from typing import Union
+import asyncio
+from typing import Union, Iterator
 
 from patee.core_types import PipelineContext
 from patee.input_types import MonolingualSingleFilePair, MultilingualSingleFile
@@ -9,6 +10,9 @@ from patee.step_types import (
     DocumentSource,
     StepContext,
     ParallelProcessStep,
+    AsyncParallelProcessStep,
+    StreamingProcessStep,
+    BlockPair,
     DocumentContext,
     DocumentPairContext,
 )
@@ -17,7 +21,7 @@ from patee.steps_builder.default_steps_builder import DefaultStepsBuilder
 
 class FakeStepsBuilder(DefaultStepsBuilder):
     def get_supported_step_types(self) -> set[str]:
-        return super().get_supported_step_types().union({"extract_fake", "text_fake"})
+        return super().get_supported_step_types().union({"extract_fake", "text_fake", "stream_fake", "async_fake"})
 
     def build(self, step_type: str, step_name: str, pipeline_context: PipelineContext, **kwargs) -> Step:
         try:
@@ -26,7 +30,11 @@ class FakeStepsBuilder(DefaultStepsBuilder):
             if step_type == "extract_fake":
                 return FakeExtractor(step_name, pipeline_context)
             elif step_type == "text_fake":
-                return FakeProcessor(step_name, pipeline_context)
+                return FakeProcessor(step_name, pipeline_context, **kwargs)
+            elif step_type == "stream_fake":
+                return FakeStreamingProcessor(step_name, pipeline_context)
+            elif step_type == "async_fake":
+                return FakeAsyncProcessor(step_name, pipeline_context, **kwargs)
 
         raise ValueError(f"Unsupported step name: {step_type}")
 
@@ -88,24 +96,72 @@ class FakeExtractor(ParallelExtractStep):
 
 
 class FakeProcessor(ParallelProcessStep):
-    def __init__(self, name: str, pipeline_context: PipelineContext):
+    def __init__(self, name: str, pipeline_context: PipelineContext, suffix: str = " fake", **kwargs):
         super().__init__(name, pipeline_context)
         self.was_called = False
+        self.was_closed = False
+        self.suffix = suffix
+
+    def close(self) -> None:
+        self.was_closed = True
 
     def process(self, context: StepContext, source: DocumentPairContext) -> StepResult:
         self.was_called = True
         context = DocumentPairContext(
             document_1=DocumentContext(
                 source=source.document_1.source,
-                text_blocks=[text + " fake" for text in source.document_1.text_blocks],
+                text_blocks=[text + self.suffix for text in source.document_1.text_blocks],
+                extra={},
+            ),
+            document_2=DocumentContext(
+                source=source.document_2.source,
+                text_blocks=[text + self.suffix for text in source.document_2.text_blocks],
+                extra={},
+            ),
+        )
+        return StepResult(
+            context=context,
+        )
+
+
+class FakeStreamingProcessor(StreamingProcessStep):
+    def __init__(self, name: str, pipeline_context: PipelineContext, events: list[str] = None):
+        super().__init__(name, pipeline_context)
+        self.was_called = False
+        self.events = events if events is not None else []
+
+    def process_blocks(self, context: StepContext, document_1: DocumentSource, document_2: DocumentSource,
+                       blocks: Iterator[BlockPair]) -> Iterator[BlockPair]:
+        self.was_called = True
+        for idx, (block_1, block_2) in enumerate(blocks):
+            self.events.append(f"{self.name}:{idx}")
+            yield (
+                block_1 + " stream" if block_1 is not None else None,
+                block_2 + " stream" if block_2 is not None else None,
+            )
+
+
+class FakeAsyncProcessor(AsyncParallelProcessStep):
+    def __init__(self, name: str, pipeline_context: PipelineContext, delay_seconds: float = 0.0):
+        super().__init__(name, pipeline_context)
+        self.calls = 0
+        self.delay_seconds = delay_seconds
+
+    async def aprocess(self, context: StepContext, source: DocumentPairContext) -> StepResult:
+        self.calls += 1
+        await asyncio.sleep(self.delay_seconds)
+        context = DocumentPairContext(
+            document_1=DocumentContext(
+                source=source.document_1.source,
+                text_blocks=[text + " async" for text in source.document_1.text_blocks],
                 extra={},
             ),
             document_2=DocumentContext(
                 source=source.document_2.source,
-                text_blocks=[text + " fake" for text in source.document_2.text_blocks],
+                text_blocks=[text + " async" for text in source.document_2.text_blocks],
                 extra={},
             ),
         )
         return StepResult(
             context=context,
-        )
\ No newline at end of file
+        )
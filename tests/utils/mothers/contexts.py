@@ -8,10 +8,11 @@ PIPELINES_DIR = SAMPLES_DIR / "pipelines"
 SOURCES_DIR = SAMPLES_DIR / "sources"
 
 
-def get_pipeline_context():
+def get_pipeline_context(checkpoint_format: str = "text"):
     return PipelineContext(
         config_path=PIPELINES_DIR / "pdf.yml",
         execution_path=SAMPLES_DIR.parent / "tests",
+        checkpoint_format=checkpoint_format,
     )
 
 def get_run_context(output_dir: Union[Path, None], source_hash: str = "123456"):
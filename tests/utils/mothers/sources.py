@@ -11,6 +11,7 @@ PDF_ES_FILE = SOURCES_DIR / "GUIA-PDDD_ES.pdf"
 PDF_CA_FILE = SOURCES_DIR / "GUIA-PDDD.pdf"
 TXT_ES_FILE = SOURCES_DIR / "GUIA-PDDD_ES.txt"
 TXT_CA_FILE = SOURCES_DIR / "GUIA-PDDD.txt"
+TSV_FILE = SOURCES_DIR / "idioms_sentences.tsv"
 
 def get_existing_pdf_file() -> Path:
     return PDF_ES_FILE